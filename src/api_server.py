@@ -0,0 +1,351 @@
+"""小梦课程表HTTP/JSON接口
+
+只读接口，供局域网内的其他设备（如信息屏、宿舍显示屏）查询课程表：
+
+    GET /api/semesters
+    GET /api/semesters/<学期ID|current>
+    GET /api/semesters/<学期ID|current>/weeks/<周数>
+    GET /api/semesters/<学期ID|current>/days/<YYYY-MM-DD>
+    GET /api/semesters/<学期ID|current>/free?date=YYYY-MM-DD 或 ?week=<周数>
+    GET /api/semesters/<学期ID|current>/stats
+    GET /api/semesters/<学期ID|current>/overview
+
+用法：python src/api_server.py --host 0.0.0.0 --port 8765
+"""
+import argparse
+import json
+import re
+import sqlite3
+import threading
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qsl
+from logger_config import logger
+
+
+class NotFound(Exception):
+    """请求的资源不存在"""
+
+
+def _course_json(course) -> dict:
+    """课程的接口字段"""
+    return {
+        "id": course.id,
+        "name": course.name,
+        "teacher": course.teacher,
+        "location": course.location,
+        "start_week": course.start_week,
+        "end_week": course.end_week,
+        "day_of_week": course.day_of_week,
+        "weekday": course.weekday_name,
+        "start_time": course.start_time,
+        "end_time": course.end_time,
+        "color": course.color,
+        "course_type": course.course_type,
+        "is_special": course.is_special,
+    }
+
+
+def _semester_json(semester) -> dict:
+    """学期的接口字段"""
+    return {"id": semester[0], "name": semester[1], "start_date": semester[2], "end_date": semester[3]}
+
+
+def _parse_date(text: str) -> datetime:
+    """解析YYYY-MM-DD日期，无效时抛出ValueError"""
+    try:
+        return datetime.strptime(text, "%Y-%m-%d")
+    except ValueError:
+        raise ValueError(f"日期格式应为YYYY-MM-DD: {text}")
+
+
+class ResponseCache:
+    """按数据版本号缓存的响应
+
+    条目记录生成时CourseManager的data_version，版本号变化后自动视为失效；
+    ETag由版本号和响应内容校验和组成，客户端可用If-None-Match得到304。
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        """读取(etag, body)，未命中或已过期时返回None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1], entry[2]
+
+    def set(self, key, version, body: bytes):
+        """保存响应，返回(etag, body)"""
+        etag = f'"{version}-{zlib.crc32(body):08x}"'
+        with self._lock:
+            self._entries[key] = (version, etag, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return etag, body
+
+
+class CourseAPI:
+    """接口路由和数据查询，所有请求共用一个CourseManager"""
+
+    def __init__(self, manager):
+        self.manager = manager
+        self.cache = ResponseCache()
+        # 检测外部修改专用的连接和上次看到的data_version，所有工作线程共用
+        self._version_lock = threading.Lock()
+        self._version_conn = None
+        self._data_version = None
+        self.routes = [
+            (re.compile(r"^/api/semesters/?$"), self.semesters),
+            (re.compile(r"^/api/semesters/(\w+)/?$"), self.semester),
+            (re.compile(r"^/api/semesters/(\w+)/weeks/(\d+)/?$"), self.week_courses),
+            (re.compile(r"^/api/semesters/(\w+)/days/([\d-]+)/?$"), self.day_courses),
+            (re.compile(r"^/api/semesters/(\w+)/free/?$"), self.free_time),
+            (re.compile(r"^/api/semesters/(\w+)/stats/?$"), self.statistics),
+            (re.compile(r"^/api/semesters/(\w+)/overview/?$"), self.overview),
+        ]
+
+    def check_external_changes(self):
+        """其他进程（如桌面应用）写入数据库后丢弃缓存
+
+        PRAGMA data_version只在其他连接提交后变化，且只能与同一连接上次的值比较，
+        因此用一个专用连接在锁内检查：外部修改只触发一次reload，
+        之后任何线程处理请求时都已看到丢弃缓存后的状态。
+        """
+        with self._version_lock:
+            if self._version_conn is None:
+                self._version_conn = sqlite3.connect(self.manager.db_path, check_same_thread=False)
+            version = self._version_conn.execute("PRAGMA data_version").fetchone()[0]
+            last, self._data_version = self._data_version, version
+            if last is not None and last != version:
+                logger.info("检测到数据库被其他进程修改，已丢弃缓存")
+                self.manager.reload()
+
+    def close(self):
+        """关闭检测外部修改用的连接"""
+        with self._version_lock:
+            if self._version_conn is not None:
+                self._version_conn.close()
+                self._version_conn = None
+
+    def respond(self, path: str, query: str):
+        """返回(etag, body)，资源不存在时抛出NotFound，参数无效时抛出ValueError"""
+        self.check_external_changes()
+        params = dict(parse_qsl(query))
+        # 当前周、今天的空闲时间等默认值随日期变化，日期也作为缓存键的一部分
+        key = (path, tuple(sorted(params.items())), datetime.now().date())
+        version = self.manager.data_version
+        cached = self.cache.get(key, version)
+        if cached is not None:
+            return cached
+        for pattern, handler in self.routes:
+            match = pattern.match(path)
+            if match:
+                data = handler(params, *match.groups())
+                body = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+                return self.cache.set(key, version, body)
+        raise NotFound(path)
+
+    def _semester(self, semester_id: str):
+        """按ID或current查找学期"""
+        if semester_id == "current":
+            semester = self.manager.get_current_semester()
+        elif semester_id.isdigit():
+            semester = self.manager.get_semester(int(semester_id))
+        else:
+            semester = None
+        if semester is None:
+            raise NotFound(f"学期不存在: {semester_id}")
+        return semester
+
+    def semesters(self, params):
+        """学期列表"""
+        current = self.manager.get_current_semester()
+        current_id = current[0] if current else None
+        return [dict(_semester_json(s), current=s[0] == current_id) for s in self.manager.get_semesters()]
+
+    def semester(self, params, semester_id):
+        """学期信息和周数"""
+        semester = self._semester(semester_id)
+        calendar = self.manager.get_calendar(semester)
+        return dict(_semester_json(semester), total_weeks=calendar.total_weeks,
+                    current_week=calendar.current_week())
+
+    def week_courses(self, params, semester_id, week):
+        """某周课程"""
+        semester = self._semester(semester_id)
+        week = int(week)
+        courses = self.manager.get_courses_by_week(week, semester[0])
+        return {"semester_id": semester[0], "week": week, "courses": [_course_json(c) for c in courses]}
+
+    def day_courses(self, params, semester_id, date_text):
+        """某天课程"""
+        semester = self._semester(semester_id)
+        target_date = _parse_date(date_text)
+        week = self.manager.get_calendar(semester).week_of(target_date)
+        day = target_date.weekday() + 1
+        courses = self.manager.get_courses_by_day(day, week, semester[0])
+        return {"semester_id": semester[0], "date": date_text, "week": week, "day_of_week": day,
+                "courses": [_course_json(c) for c in courses]}
+
+    def free_time(self, params, semester_id):
+        """某天或某周的空闲时间"""
+        semester = self._semester(semester_id)
+        if "week" in params:
+            week = int(params["week"])
+            slots = self.manager.get_week_free_time_slots(week, semester[0])
+            return {"semester_id": semester[0], "week": week,
+                    "free_hours": self.manager.get_free_hours(week, semester[0]),
+                    "free_days": self.manager.get_free_days(week, semester[0]),
+                    "days": {day: [f"{s}-{e}" for s, e in slots.get(day, [])]
+                             for day in range(1, 8)}}
+        target_date = _parse_date(params.get("date") or datetime.now().strftime("%Y-%m-%d"))
+        week = self.manager.get_calendar(semester).week_of(target_date)
+        day = target_date.weekday() + 1
+        return {"semester_id": semester[0], "date": target_date.strftime("%Y-%m-%d"), "week": week,
+                "free_hours": self.manager.get_free_hours(week, semester[0], day),
+                "free_slots": [f"{s}-{e}" for s, e in self.manager.get_free_time_slots(day, week, semester[0])]}
+
+    def statistics(self, params, semester_id):
+        """学习统计"""
+        semester = self._semester(semester_id)
+        return self.manager.get_study_statistics(semester[0])
+
+    def overview(self, params, semester_id):
+        """课程数量概况"""
+        semester = self._semester(semester_id)
+        return self.manager.get_stats_overview(semester[0])
+
+
+class APIRequestHandler(BaseHTTPRequestHandler):
+    """JSON请求处理，支持长连接和ETag/304"""
+
+    protocol_version = "HTTP/1.1"
+    timeout = 10  # 空闲长连接的超时时间，避免占住工作线程
+    disable_nagle_algorithm = True  # 响应头和内容分开写出，避免长连接上的延迟确认等待
+    api = None
+
+    def do_GET(self):
+        """处理GET请求"""
+        url = urlsplit(self.path)
+        try:
+            etag, body = self.api.respond(url.path, url.query)
+        except NotFound as e:
+            self._send_json(404, {"error": f"资源不存在: {str(e)}"})
+            return
+        except ValueError as e:
+            self._send_json(400, {"error": str(e)})
+            return
+        except Exception as e:
+            logger.error(f"处理接口请求失败: {self.path}: {str(e)}")
+            self._send_json(500, {"error": "服务器内部错误"})
+            return
+
+        if etag in [tag.strip() for tag in self.headers.get("If-None-Match", "").split(",")]:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self._send_body(200, body, etag)
+
+    def _send_json(self, status: int, data):
+        """发送JSON数据"""
+        self._send_body(status, json.dumps(data, ensure_ascii=False).encode("utf-8"))
+
+    def _send_body(self, status: int, body: bytes, etag: str = None):
+        """发送响应内容"""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Access-Control-Allow-Origin", "*")
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """访问日志只在调试级别记录，避免高并发时写日志成为瓶颈"""
+        logger.debug(f"{self.address_string()} - {format % args}")
+
+
+class PooledHTTPServer(HTTPServer):
+    """用固定大小线程池处理连接的HTTP服务器
+
+    工作线程复用各自的数据库连接，不会为每个请求新建线程和连接。
+    """
+
+    def __init__(self, address, handler_class, max_workers: int = 16):
+        super().__init__(address, handler_class)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="APIWorker")
+
+    def process_request(self, request, client_address):
+        """把连接交给线程池处理"""
+        self._pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        """在工作线程中处理连接"""
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        """关闭监听并等待工作线程结束"""
+        super().server_close()
+        self._pool.shutdown(wait=True)
+        api = getattr(self.RequestHandlerClass, "api", None)
+        if api is not None:
+            api.close()
+
+
+def create_server(manager, host: str = "127.0.0.1", port: int = 8765, max_workers: int = 16) -> PooledHTTPServer:
+    """创建接口服务器，所有工作线程共用manager"""
+    handler = type("BoundAPIRequestHandler", (APIRequestHandler,), {"api": CourseAPI(manager)})
+    return PooledHTTPServer((host, port), handler, max_workers)
+
+
+def main(argv=None):
+    """命令行入口"""
+    from database import DB_PATH
+    from profiles import ProfileRegistry, DEFAULT_PROFILE
+
+    parser = argparse.ArgumentParser(description="小梦课程表HTTP/JSON接口")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址，局域网访问使用0.0.0.0")
+    parser.add_argument("--port", type=int, default=8765, help="监听端口")
+    parser.add_argument("--workers", type=int, default=16, help="工作线程数")
+    parser.add_argument("--db", default=DB_PATH, help="默认档案的数据库路径")
+    parser.add_argument("--profile", default=DEFAULT_PROFILE, help="提供数据的档案")
+    args = parser.parse_args(argv)
+
+    registry = ProfileRegistry(args.db)
+    try:
+        manager = registry.acquire(args.profile)
+    except ValueError as e:
+        parser.error(str(e))
+    server = create_server(manager, args.host, args.port, args.workers)
+    logger.info(f"接口服务已启动: http://{args.host}:{args.port}/api/semesters")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        registry.close()
+        logger.info("接口服务已停止")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from database import DB_PATH
+from logger_config import logger
+
+# 导出格式 -> 文件扩展名
+FORMAT_EXTENSIONS = {"image": "png", "pdf": "pdf"}
+
+# 工作进程内的课程管理器，由_init_worker创建
+_worker_manager = None
+
+
+def _init_worker(db_path: str):
+    """工作进程初始化：每个进程只打开一次数据库"""
+    global _worker_manager
+    from course_manager import CourseManager
+
+    _worker_manager = CourseManager(db_path)
+
+
+def _render_item(semester_id: int, week: int, format: str, base_path: str) -> dict:
+    """在工作进程中渲染一周课程表，返回该项的结果和耗时"""
+    started = time.perf_counter()
+    courses = _worker_manager.get_courses_by_week(week, semester_id)
+    if format == "image":
+        ok = _worker_manager._export_to_image(courses, base_path, "week")
+    else:
+        ok = _worker_manager._export_to_pdf(courses, base_path)
+    return {
+        "semester_id": semester_id,
+        "week": week,
+        "format": format,
+        "courses": len(courses),
+        "ok": bool(ok),
+        "seconds": round(time.perf_counter() - started, 4),
+    }
+
+
+def batch_export(output_path: str, db_path: str = DB_PATH, semester_ids=None, formats=("image", "pdf"),
+                 weeks=None, max_workers: int = None, progress=None) -> dict:
+    """并行导出多个学期、多周的课程表并打包为zip，返回清单
+
+    每个(学期, 周, 格式)是一个独立任务，由ProcessPoolExecutor分给各CPU核心，
+    复用CourseManager的图片/PDF导出；结果文件和manifest.json写入同一个zip。
+    semester_ids为空时导出当前学期，weeks为空时导出学期的全部周；
+    progress(已完成数, 总数, 该项结果)在主进程中调用。
+    """
+    from course_manager import CourseManager
+
+    for format in formats:
+        if format not in FORMAT_EXTENSIONS:
+            raise ValueError(f"不支持批量导出的格式: {format}")
+
+    manager = CourseManager(db_path)
+    try:
+        if semester_ids:
+            semesters = [manager.get_semester(int(s)) for s in semester_ids]
+            if None in semesters:
+                raise ValueError("指定的学期不存在")
+        else:
+            current = manager.get_current_semester() or (manager.get_semesters() or [None])[0]
+            if current is None:
+                raise ValueError("没有学期数据，请先创建学期")
+            semesters = [current]
+        tasks = []
+        for semester in semesters:
+            calendar = manager.get_calendar(semester)
+            for week in (weeks or range(1, calendar.total_weeks + 1)):
+                for format in formats:
+                    folder = re.sub(r'[\\/:*?"<>|]', "_", semester[1])
+                    arcname = f"{folder}/第{week:02d}周.{FORMAT_EXTENSIONS[format]}"
+                    tasks.append((semester[0], week, format, arcname))
+    finally:
+        manager.close()
+
+    max_workers = max_workers or os.cpu_count() or 1
+    work_dir = tempfile.mkdtemp(prefix="batch_export_")
+    started = time.perf_counter()
+    items = []
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                 initargs=(db_path,)) as pool:
+            futures = {}
+            for index, (semester_id, week, format, arcname) in enumerate(tasks):
+                base_path = os.path.join(work_dir, str(index))
+                future = pool.submit(_render_item, semester_id, week, format, base_path)
+                futures[future] = (arcname, f"{base_path}.{FORMAT_EXTENSIONS[format]}")
+
+            with zipfile.ZipFile(output_path, "w") as archive:
+                for future in as_completed(futures):
+                    arcname, path = futures[future]
+                    try:
+                        item = future.result()
+                    except Exception as e:
+                        logger.error(f"批量导出{arcname}失败: {str(e)}")
+                        item = {"ok": False, "error": str(e)}
+                    item["file"] = arcname
+                    if item["ok"] and os.path.exists(path):
+                        # PNG本身已压缩，直接存储
+                        compression = zipfile.ZIP_STORED if path.endswith(".png") else zipfile.ZIP_DEFLATED
+                        archive.write(path, arcname, compress_type=compression)
+                        os.remove(path)
+                    else:
+                        item["ok"] = False
+                    items.append(item)
+                    if progress:
+                        progress(len(items), len(tasks), item)
+
+                items.sort(key=lambda item: item["file"])
+                manifest = {
+                    "created": datetime.now().isoformat(timespec="seconds"),
+                    "database": os.path.abspath(db_path),
+                    "workers": max_workers,
+                    "total": len(tasks),
+                    "succeeded": sum(1 for item in items if item["ok"]),
+                    "seconds": round(time.perf_counter() - started, 3),
+                    "items": items,
+                }
+                archive.writestr("manifest.json", json.dumps(manifest, ensure_ascii=False, indent=2))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    logger.info(f"批量导出完成: {output_path}，成功{manifest['succeeded']}/{manifest['total']}项，"
+                f"用时{manifest['seconds']}秒")
+    return manifest
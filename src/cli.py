@@ -0,0 +1,363 @@
+"""小梦课程表命令行工具
+
+不创建窗口、不启动提醒服务，直接使用CourseManager查询和导出，
+适合在服务器上批量处理课程表。用法示例：
+
+    python src/cli.py semesters
+    python src/cli.py week 3
+    python src/cli.py day --date 2024-09-10
+    python src/cli.py stats --json
+    python src/cli.py export pdf --week 3 -o week3
+"""
+import argparse
+import json
+import logging
+import sys
+from datetime import datetime
+
+EXPORT_FORMATS = ["excel", "csv", "json", "ndjson", "pdf", "image", "ics"]
+# 逐门课程写出的格式，可直接从数据库游标读取并写到标准输出
+STREAM_FORMATS = ["csv", "json", "ndjson"]
+# 同样从游标逐行读取、但只能写入文件的格式
+FILE_STREAM_FORMATS = ["excel"]
+SEARCH_TYPES = ["name", "teacher", "location"]
+
+
+def _parse_date(text: str) -> datetime:
+    """解析YYYY-MM-DD日期"""
+    try:
+        return datetime.strptime(text, "%Y-%m-%d")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"日期格式应为YYYY-MM-DD: {text}")
+
+
+def _parse_month(text: str) -> datetime:
+    """解析YYYY-MM月份"""
+    try:
+        return datetime.strptime(text, "%Y-%m")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"月份格式应为YYYY-MM: {text}")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """构建命令行参数解析器"""
+    parser = argparse.ArgumentParser(prog="cli.py", description="小梦课程表命令行工具")
+    parser.add_argument("--db", help="默认档案的数据库路径（默认courses.db）")
+    parser.add_argument("--profile", help="使用的档案名")
+    parser.add_argument("-v", "--verbose", action="store_true", help="在终端输出运行日志")
+    # 各子命令共用的选项，写在子命令之后
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--semester", help="学期ID或名称，默认为当前学期")
+    common.add_argument("--json", action="store_true", help="以JSON格式输出")
+    commands = parser.add_subparsers(dest="command", metavar="命令")
+    commands.required = True
+
+    commands.add_parser("semesters", help="列出所有学期", parents=[common])
+
+    courses = commands.add_parser("courses", help="列出学期课程", parents=[common])
+    courses.add_argument("--search", help="搜索关键字")
+    courses.add_argument("--by", choices=SEARCH_TYPES, default="name", help="搜索字段")
+
+    week = commands.add_parser("week", help="查询某周课程", parents=[common])
+    week.add_argument("week", type=int, nargs="?", help="周数，默认为本周")
+
+    day = commands.add_parser("day", help="查询某天课程", parents=[common])
+    day.add_argument("--date", type=_parse_date, help="日期YYYY-MM-DD，默认为今天")
+
+    free = commands.add_parser("free", help="查询空闲时间", parents=[common])
+    free.add_argument("--date", type=_parse_date, help="日期YYYY-MM-DD，默认为今天")
+
+    stats = commands.add_parser("stats", help="学习统计", parents=[common])
+    stats.add_argument("--overview", action="store_true", help="只输出课程数量概况")
+
+    export = commands.add_parser("export", help="导出课程", parents=[common])
+    export.add_argument("format", choices=EXPORT_FORMATS, help="导出格式")
+    export.add_argument("-o", "--output",
+                        help="输出文件名（不含扩展名），csv/json/ndjson格式可用-表示标准输出")
+    scope = export.add_mutually_exclusive_group()
+    scope.add_argument("--week", type=int, help="只导出某周课程")
+    scope.add_argument("--date", type=_parse_date, help="只导出某天课程")
+    scope.add_argument("--month", type=_parse_month, help="只导出某月课程，格式YYYY-MM")
+    export.add_argument("--sheet-by", choices=["semester", "week"], default="semester",
+                        help="Excel按学期或按周分表")
+    export.add_argument("--pandas", action="store_true", help="Excel改用pandas导出")
+    batch = commands.add_parser("batch", help="并行导出每周的图片/PDF并打包为zip", parents=[common])
+    batch.add_argument("-o", "--output", required=True, help="输出zip文件路径")
+    batch.add_argument("--formats", nargs="+", choices=["image", "pdf"], default=["image", "pdf"],
+                       help="导出格式")
+    batch.add_argument("--weeks", type=int, nargs="+", help="只导出指定周，默认全部周")
+    batch.add_argument("--all-semesters", action="store_true", help="导出全部学期")
+    batch.add_argument("--workers", type=int, help="进程数，默认为CPU核心数")
+
+    site = commands.add_parser("site", help="生成学期课程表静态网站", parents=[common])
+    site.add_argument("-o", "--output", default="site", help="站点目录，默认为site")
+    return parser
+
+
+def _configure_logging(verbose: bool):
+    """命令行默认只在终端输出警告和错误，完整日志仍写入app.log"""
+    from logger_config import logger
+
+    for handler in logger.handlers:
+        if type(handler) is logging.StreamHandler:
+            handler.setLevel(logging.INFO if verbose else logging.WARNING)
+
+
+def _open_manager(args):
+    """按参数打开课程管理器"""
+    from database import DB_PATH
+    from profiles import ProfileRegistry, DEFAULT_PROFILE
+
+    registry = ProfileRegistry(args.db or DB_PATH)
+    return registry, registry.acquire(args.profile or DEFAULT_PROFILE)
+
+
+def _resolve_semester(manager, value):
+    """按ID或名称查找学期，未指定时使用当前学期"""
+    if value is None:
+        semester = manager.get_current_semester()
+        if semester is None:
+            semesters = manager.get_semesters()
+            semester = semesters[0] if semesters else None
+        if semester is None:
+            raise ValueError("没有学期数据，请先创建学期")
+        return semester
+    for semester in manager.get_semesters():
+        if str(semester[0]) == value or semester[1] == value:
+            return semester
+    raise ValueError(f"找不到学期: {value}")
+
+
+def _course_dict(course) -> dict:
+    """课程的输出字段"""
+    return {
+        "id": course.id,
+        "name": course.name,
+        "teacher": course.teacher,
+        "location": course.location,
+        "weeks": f"{course.start_week}-{course.end_week}",
+        "day_of_week": course.weekday_name,
+        "time": course.time_range,
+        "course_type": course.course_type,
+    }
+
+
+def _print_courses(courses, as_json: bool):
+    """输出课程列表"""
+    rows = [_course_dict(course) for course in courses]
+    if as_json:
+        print(json.dumps(rows, ensure_ascii=False, indent=2))
+        return
+    for row in rows:
+        print("\t".join(str(value) for value in row.values()))
+    print(f"共{len(rows)}门课程")
+
+
+def _print_data(data, as_json: bool):
+    """输出字典数据"""
+    if as_json:
+        print(json.dumps(data, ensure_ascii=False, indent=2))
+        return
+    for key, value in data.items():
+        print(f"{key}: {value}")
+
+
+def _day_args(manager, semester, target_date):
+    """日期对应的(星期, 周数)"""
+    calendar = manager.get_calendar(semester)
+    return target_date.weekday() + 1, calendar.week_of(target_date)
+
+
+class _Counted:
+    """统计迭代过的元素个数"""
+
+    def __init__(self, iterable):
+        self.iterable = iterable
+        self.count = 0
+
+    def __iter__(self):
+        for item in self.iterable:
+            self.count += 1
+            yield item
+
+
+def cmd_semesters(manager, args):
+    """列出所有学期，*为当前学期"""
+    semesters = manager.get_semesters()
+    current = manager.get_current_semester()
+    current_id = current[0] if current else None
+    if args.json:
+        print(json.dumps([{"id": s[0], "name": s[1], "start_date": s[2], "end_date": s[3],
+                           "current": s[0] == current_id} for s in semesters],
+                         ensure_ascii=False, indent=2))
+        return
+    for s in semesters:
+        marker = "*" if s[0] == current_id else " "
+        print(f"{marker} {s[0]}\t{s[1]}\t{s[2]} ~ {s[3]}")
+
+
+def cmd_courses(manager, args):
+    """列出或搜索学期课程"""
+    semester = _resolve_semester(manager, args.semester)
+    if args.search:
+        courses = manager.search_courses(args.search, args.by, semester[0])
+    else:
+        courses = manager.get_courses(semester[0])
+    _print_courses(courses, args.json)
+
+
+def cmd_week(manager, args):
+    """查询某周课程"""
+    semester = _resolve_semester(manager, args.semester)
+    week = args.week or manager.get_calendar(semester).current_week()
+    _print_courses(manager.get_courses_by_week(week, semester[0]), args.json)
+
+
+def cmd_day(manager, args):
+    """查询某天课程"""
+    semester = _resolve_semester(manager, args.semester)
+    day, week = _day_args(manager, semester, args.date or datetime.now())
+    _print_courses(manager.get_courses_by_day(day, week, semester[0]), args.json)
+
+
+def cmd_free(manager, args):
+    """查询某天的空闲时间段"""
+    semester = _resolve_semester(manager, args.semester)
+    day, week = _day_args(manager, semester, args.date or datetime.now())
+    slots = manager.get_free_time_slots(day, week, semester[0])
+    if args.json:
+        print(json.dumps([f"{start}-{end}" for start, end in slots], ensure_ascii=False))
+        return
+    for start, end in slots:
+        print(f"{start}-{end}")
+
+
+def cmd_stats(manager, args):
+    """输出学习统计"""
+    semester = _resolve_semester(manager, args.semester)
+    if args.overview:
+        _print_data(manager.get_stats_overview(semester[0]), args.json)
+    else:
+        _print_data(manager.get_study_statistics(semester[0]), args.json)
+
+
+def _export_weeks(manager, semester, args):
+    """导出范围涉及的周，未限定范围时返回None"""
+    if args.week:
+        return range(args.week, args.week + 1)
+    if args.date:
+        week = _day_args(manager, semester, args.date)[1]
+        return range(week, week + 1)
+    if args.month:
+        return manager.get_calendar(semester).month_weeks(args.month.year, args.month.month)
+    return None
+
+
+def cmd_export(manager, args):
+    """按范围导出课程"""
+    semester = _resolve_semester(manager, args.semester)
+    weeks = _export_weeks(manager, semester, args)
+    view_type, target_date = "week", None
+    streaming = args.format in STREAM_FORMATS or (args.format in FILE_STREAM_FORMATS and not args.pandas)
+    if args.output == "-" and args.format not in STREAM_FORMATS:
+        raise ValueError(f"{args.format}格式不能输出到标准输出")
+    if streaming and not args.month:
+        # 直接从游标分批读取，课程再多内存占用也不变
+        day = week = None
+        if args.date:
+            day, week = _day_args(manager, semester, args.date)
+        courses = _Counted(manager.iter_courses(semester[0], week=args.week or week, day=day))
+        output = sys.stdout if args.output == "-" else args.output
+        if not manager.export_courses(courses, args.format, output, group_by=args.sheet_by, weeks=weeks):
+            raise RuntimeError("导出失败，详情见app.log")
+        print(f"已导出{courses.count}门课程", file=sys.stderr if output is sys.stdout else sys.stdout)
+        return
+    if args.week:
+        courses = manager.get_courses_by_week(args.week, semester[0])
+    elif args.date:
+        day, week = _day_args(manager, semester, args.date)
+        courses = manager.get_courses_by_day(day, week, semester[0])
+        view_type, target_date = "day", args.date
+    elif args.month:
+        target_date = args.month
+        courses = manager.get_courses_by_month(target_date.year, target_date.month, semester[0])
+        view_type = "month"
+    else:
+        courses = manager.get_courses(semester[0])
+
+    if not courses:
+        raise ValueError("没有可导出的课程")
+    if not manager.export_courses(courses, args.format, args.output, view_type, target_date,
+                                  group_by=args.sheet_by, use_pandas=args.pandas, weeks=weeks):
+        raise RuntimeError("导出失败，详情见app.log")
+    print(f"已导出{len(courses)}门课程")
+
+
+def cmd_batch(manager, args):
+    """并行批量导出并打包"""
+    from batch_export import batch_export
+
+    if args.all_semesters:
+        semester_ids = [s[0] for s in manager.get_semesters()]
+    else:
+        semester_ids = [_resolve_semester(manager, args.semester)[0]]
+
+    def progress(done, total, item):
+        status = "完成" if item["ok"] else "失败"
+        print(f"[{done}/{total}] {item['file']} {status} {item.get('seconds', 0):.2f}s", file=sys.stderr)
+
+    manifest = batch_export(args.output, manager.db_path, semester_ids, args.formats,
+                            args.weeks, args.workers, progress)
+    print(f"已导出{manifest['succeeded']}/{manifest['total']}项到{args.output}，"
+          f"用时{manifest['seconds']}秒（{manifest['workers']}个进程）")
+    if manifest['succeeded'] < manifest['total']:
+        raise RuntimeError("部分项目导出失败，详情见app.log")
+
+
+def cmd_site(manager, args):
+    """生成静态网站，只写入内容变化的文件"""
+    from site_generator import generate_site
+
+    semester = _resolve_semester(manager, args.semester)
+    result = generate_site(manager, args.output, semester[0])
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False))
+        return
+    print(f"站点已生成到{args.output}：写入{result['written']}个文件，"
+          f"未变化{result['unchanged']}个，删除{result['removed']}个")
+
+
+COMMANDS = {
+    "semesters": cmd_semesters,
+    "courses": cmd_courses,
+    "week": cmd_week,
+    "day": cmd_day,
+    "free": cmd_free,
+    "stats": cmd_stats,
+    "export": cmd_export,
+    "batch": cmd_batch,
+    "site": cmd_site,
+}
+
+
+def main(argv=None) -> int:
+    """命令行入口，返回退出码"""
+    args = build_parser().parse_args(argv)
+    _configure_logging(args.verbose)
+    try:
+        registry, manager = _open_manager(args)
+    except ValueError as e:
+        print(f"错误: {str(e)}", file=sys.stderr)
+        return 1
+    try:
+        COMMANDS[args.command](manager, args)
+        return 0
+    except (ValueError, RuntimeError) as e:
+        print(f"错误: {str(e)}", file=sys.stderr)
+        return 1
+    finally:
+        registry.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+from bisect import bisect_left, bisect_right
+from typing import List
+from models import Course
+
+
+class CourseConflictError(ValueError):
+    """课程时间冲突，conflicts为发生冲突的已有课程"""
+
+    def __init__(self, message: str, conflicts: List[Course] = None):
+        super().__init__(message)
+        self.conflicts = conflicts or []
+
+
+def describe_course(course: Course) -> str:
+    """冲突提示中的课程描述，如 高等数学（周一 08:00-09:40，第1-16周）"""
+    return f"{course.name}（{course.weekday_name} {course.time_range}，第{course.start_week}-{course.end_week}周）"
+
+
+class _DayIntervals:
+    """单个星期的课程时间区间
+
+    区间按(开始分钟, 结束分钟, 课程ID)排序，并维护结束时间的前缀最大值，
+    查询时用二分找到开始早于查询结束、且前缀最大结束晚于查询开始的范围，
+    再逐个过滤该范围内的候选。
+    增删为有序列表插入/删除，O(n)；前缀最大值只标记失效位置，
+    在下一次查询时从该位置起重算，连续写入只重算一次。
+    查询为O(log n)加上候选范围长度，候选范围可能包含不重叠的课程。
+    每个学期每个星期的课程通常只有几十门，线性部分实际开销很小。
+    """
+
+    def __init__(self):
+        self.keys = []
+        self.courses = []
+        self._max_end = []
+        self._dirty = None  # 前缀最大值需要从该位置开始重算
+
+    def _mark(self, index: int):
+        """标记前缀最大值从index开始失效"""
+        self._dirty = index if self._dirty is None else min(self._dirty, index)
+
+    def add(self, course: Course):
+        """插入课程区间"""
+        key = (course.start_minute, course.end_minute, course.id)
+        index = bisect_left(self.keys, key)
+        self.keys.insert(index, key)
+        self.courses.insert(index, course)
+        self._mark(index)
+
+    def remove(self, course: Course):
+        """删除课程区间"""
+        key = (course.start_minute, course.end_minute, course.id)
+        index = bisect_left(self.keys, key)
+        if index < len(self.keys) and self.keys[index] == key:
+            del self.keys[index]
+            del self.courses[index]
+            self._mark(index)
+
+    def _prefix_max_end(self) -> list:
+        """结束时间前缀最大值，按需增量重算"""
+        if self._dirty is not None:
+            del self._max_end[self._dirty:]
+            running = self._max_end[-1] if self._max_end else -1
+            for course in self.courses[len(self._max_end):]:
+                running = max(running, course.end_minute)
+                self._max_end.append(running)
+            self._dirty = None
+        return self._max_end
+
+    def overlapping(self, start_minute: int, end_minute: int) -> List[Course]:
+        """时间与[start_minute, end_minute)重叠的课程"""
+        stop = bisect_left(self.keys, (end_minute,))
+        first = bisect_right(self._prefix_max_end(), start_minute, 0, stop)
+        return [course for course in self.courses[first:stop] if course.end_minute > start_minute]
+
+    def __len__(self):
+        return len(self.keys)
+
+
+class ConflictIndex:
+    """课程时间冲突区间索引
+
+    按星期分组保存课程时间区间，查询用二分缩小候选范围后线性过滤，
+    再按周数范围过滤，复杂度见_DayIntervals。课程增删时按差量维护。
+    """
+
+    def __init__(self):
+        self._days = {}
+
+    def apply(self, course: Course, sign: int = 1):
+        """加入(sign=1)或移除(sign=-1)一门课程"""
+        intervals = self._days.get(course.day_of_week)
+        if sign > 0:
+            if intervals is None:
+                intervals = self._days[course.day_of_week] = _DayIntervals()
+            intervals.add(course)
+        elif intervals is not None:
+            intervals.remove(course)
+            if not intervals:
+                del self._days[course.day_of_week]
+
+    def find(self, day: int, start_minute: int, end_minute: int,
+             start_week: int, end_week: int, exclude_ids=()) -> List[Course]:
+        """查找与给定星期、时间和周数范围冲突的课程"""
+        intervals = self._days.get(day)
+        if intervals is None:
+            return []
+        return [course for course in intervals.overlapping(start_minute, end_minute)
+                if course.start_week <= end_week and start_week <= course.end_week
+                and course.id not in exclude_ids]
+
+    def find_course(self, course: Course, exclude_ids=()) -> List[Course]:
+        """查找与课程冲突的其他课程"""
+        return self.find(course.day_of_week, course.start_minute, course.end_minute,
+                         course.start_week, course.end_week, exclude_ids)
@@ -1,315 +1,575 @@
 import sqlite3
-from datetime import datetime,timedelta
-from typing import List, Tuple
+from datetime import datetime
+from typing import Iterable, Iterator, List, Tuple
 from logger_config import logger
+from database import ConnectionManager, DB_PATH
+from memory_mirror import MemoryMirror
+from migrations import migrate
+from query_cache import QueryCache, ALL_SEMESTERS
+from semester_calendar import SemesterCalendar
+from stats_store import StatsStore, SemesterStats, statistics_equal
+from free_time_index import FreeTimeIndex, FREE_SLOTS, FREE_TENTHS, slot_mask
+from conflicts import ConflictIndex, CourseConflictError, describe_course
+from models import Course, time_to_minutes
 import re
-import time
 class CourseManager:
-    def __init__(self):
+    TIME_PATTERN = re.compile(r"^\d{2}:\d{2}$")
+
+    INSERT_COURSE_SQL = '''
+        INSERT INTO courses (name, teacher, location, start_week, end_week, 
+                        day_of_week, start_time, end_time, color, course_type, is_special, semester_id,
+                        start_minute, end_minute, duration_minutes)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    '''
+
+    UPDATE_COURSE_SQL = '''
+        UPDATE courses SET name=?, teacher=?, location=?, start_week=?, end_week=?,
+                    day_of_week=?, start_time=?, end_time=?, color=?, course_type=?,
+                    is_special=?, semester_id=?, start_minute=?, end_minute=?, duration_minutes=?
+        WHERE id=?
+    '''
+
+    def __init__(self, db_path: str = DB_PATH, in_memory: bool = False):
+        # in_memory为True时读取全部走内存镜像，写操作在后台批量写回磁盘
+        self.db_path = db_path
+        self.db = MemoryMirror(db_path) if in_memory else ConnectionManager(db_path)
         self.init_database()
-        self._cache = {}
-        self._cache_timeout = 300
+        self._cache = QueryCache()
+        self._calendars = {}
+        self._stats = StatsStore()
     
     def init_database(self):
-        """初始化数据库"""
+        """初始化数据库，按需执行结构迁移"""
         try:
-            with sqlite3.connect('courses.db') as conn:
-                cursor = conn.cursor()
-                cursor.executescript('''
-                    CREATE TABLE IF NOT EXISTS semesters (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        name TEXT NOT NULL,
-                        start_date TEXT NOT NULL,
-                        end_date TEXT NOT NULL,
-                        current INTEGER DEFAULT 0
-                    );
-                    
-                    CREATE TABLE IF NOT EXISTS courses (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        name TEXT NOT NULL,
-                        teacher TEXT NOT NULL,
-                        location TEXT NOT NULL,
-                        start_week INTEGER NOT NULL,
-                        end_week INTEGER NOT NULL,
-                        day_of_week INTEGER NOT NULL,
-                        start_time TEXT NOT NULL,
-                        end_time TEXT NOT NULL,
-                        color TEXT NOT NULL,
-                        course_type TEXT NOT NULL,
-                        is_special INTEGER NOT NULL,
-                        semester_id INTEGER NOT NULL,
-                        reminder_enabled INTEGER DEFAULT 0,
-                        reminder_minutes INTEGER DEFAULT 15,
-                        reminder_type TEXT DEFAULT 'popup',
-                        FOREIGN KEY (semester_id) REFERENCES semesters (id)
-                    );
-                ''')
-                conn.commit()
-                logger.info("数据库初始化成功")
+            version = migrate(self.db.get_connection())
+            logger.info(f"数据库初始化成功，结构版本: v{version}")
         except sqlite3.Error as e:
             logger.error(f"数据库初始化失败: {str(e)}")
             raise
-    def _get_cache_key(self, method_name, *args):
-        """生成缓存键"""
-        return f"{method_name}:{'_'.join(map(str, args))}"
 
-    def _is_cache_valid(self, cache_key):
-        """检查缓存是否有效"""
-        if cache_key not in self._cache:
-            return False
-        timestamp, _ = self._cache[cache_key]
-        return (time.time() - timestamp) < self._cache_timeout
-
-    def _get_from_cache(self, cache_key):
-        """从缓存获取数据"""
-        if self._is_cache_valid(cache_key):
-            _, data = self._cache[cache_key]
-            return data
-        return None
-
-    def _set_cache(self, cache_key, data):
-        """设置缓存"""
-        self._cache[cache_key] = (time.time(), data)
+    def close(self):
+        """关闭数据库连接"""
+        self.db.close_all()
+
+    def _cache_partition(self, semester_id):
+        """获取学期对应的缓存分区"""
+        return ALL_SEMESTERS if semester_id is None else int(semester_id)
+
+    def _cached_query(self, method_name, semester_id, params, loader):
+        """按学期分区缓存查询结果，写操作会使对应分区失效"""
+        partition = self._cache_partition(semester_id)
+        key = (method_name,) + tuple(params)
+        cached_data = self._cache.get(partition, key)
+        if cached_data is not None:
+            return cached_data
+        version = self._cache.partition_version(partition)
+        data = loader()
+        self._cache.set(partition, key, data, version)
+        return data
+
+    def _invalidate_cache(self, *semester_ids):
+        """数据写入后递增版本号，未指定学期时使全部缓存失效"""
+        if not semester_ids:
+            self._cache.invalidate()
+            return
+        for semester_id in set(int(s) for s in semester_ids if s is not None):
+            self._cache.invalidate(semester_id)
+
+    @property
+    def data_version(self) -> int:
+        """数据版本号，每次写操作递增"""
+        return self._cache.data_version
+
+    def cache_stats(self) -> dict:
+        """获取查询缓存统计"""
+        return self._cache.stats()
+
+    def reload(self):
+        """数据库被其他进程修改后，丢弃全部查询缓存和统计聚合"""
+        with self._stats.lock:
+            self._stats.drop()
+            self._invalidate_cache()
+
+    def _get_course(self, course_id: int):
+        """按ID获取课程，不存在时返回None"""
+        row = self.db.fetchone('SELECT * FROM courses WHERE id = ?', (course_id,))
+        return Course.from_row(row) if row else None
+
+    def _course_from_data(self, course_id: int, data: Tuple) -> Course:
+        """由校验后的课程数据构建课程记录"""
+        return Course.from_row((course_id,) + tuple(data[:12]) + (0, 15, 'popup') + tuple(data[12:]))
+
     def add_semester(self, name, start_date, end_date):
         """添加学期"""
-        conn = sqlite3.connect('courses.db')
-        cursor = conn.cursor()
-        cursor.execute('''
+        self.db.write('''
             INSERT INTO semesters (name, start_date, end_date)
             VALUES (?, ?, ?)
         ''', (name, start_date, end_date))
-        conn.commit()
-        conn.close()
+        # 学期信息不影响课程查询结果，只递增数据版本号
+        self._cache.touch()
 
     def get_semesters(self):
         """获取所有学期"""
-        conn = sqlite3.connect('courses.db')
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM semesters ORDER BY start_date')
-        semesters = cursor.fetchall()
-        conn.close()
-        return semesters
+        return self.db.fetchall('SELECT * FROM semesters ORDER BY start_date')
 
     def get_current_semester(self):
         """获取当前学期"""
-        conn = sqlite3.connect('courses.db')
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM semesters WHERE current = 1')
-        semester = cursor.fetchone()
-        conn.close()
-        return semester
+        return self.db.fetchone('SELECT * FROM semesters WHERE current = 1')
+
+    def get_semester(self, semester_id):
+        """获取指定学期"""
+        return self.db.fetchone('SELECT * FROM semesters WHERE id = ?', (semester_id,))
+
+    def get_calendar(self, semester) -> SemesterCalendar:
+        """获取学期日历，semester可以是学期记录或学期ID
+
+        同一学期（ID和起止日期均相同）只构建一次。
+        """
+        if semester is None:
+            return None
+        if not isinstance(semester, (tuple, list)):
+            semester = self.get_semester(semester)
+            if semester is None:
+                return None
+        key = (semester[0], semester[2], semester[3])
+        calendar = self._calendars.get(key)
+        if calendar is None:
+            calendar = SemesterCalendar.from_semester(semester)
+            self._calendars[key] = calendar
+        return calendar
+
+    def _current_semester_id(self):
+        """获取当前学期ID，没有当前学期时返回None"""
+        semester = self.get_current_semester()
+        return semester[0] if semester else None
 
     def set_current_semester(self, semester_id):
         """设置当前学期"""
-        conn = sqlite3.connect('courses.db')
-        cursor = conn.cursor()
-        cursor.execute('UPDATE semesters SET current = 0')
-        cursor.execute('UPDATE semesters SET current = 1 WHERE id = ?', (semester_id,))
-        conn.commit()
-        conn.close()
+        with self.db.transaction() as conn:
+            conn.execute('UPDATE semesters SET current = 0')
+            conn.execute('UPDATE semesters SET current = 1 WHERE id = ?', (semester_id,))
+        self._cache.touch()
     
-    def add_course(self, course_data: Tuple) -> None:
-        """添加课程"""
+    def _prepare_course_data(self, course_data: Tuple) -> Tuple:
+        """校验课程数据并转换类型，数据无效时抛出ValueError"""
+        if len(course_data) < 12:
+            raise ValueError(f"课程数据字段不完整: {course_data}")
+        name, teacher, location = (str(v).strip() for v in course_data[:3])
+        if not (name and teacher and location):
+            raise ValueError("课程名称、任课老师和上课地点不能为空")
+        try:
+            start_week, end_week, day_of_week = (int(v) for v in course_data[3:6])
+            is_special = int(course_data[10])
+            semester_id = int(course_data[11])
+        except (TypeError, ValueError):
+            raise ValueError(f"{name}: 周数、星期和学期必须是整数")
+        if start_week < 1 or start_week > end_week:
+            raise ValueError(f"{name}: 周数范围无效 {start_week}-{end_week}")
+        if not 1 <= day_of_week <= 7:
+            raise ValueError(f"{name}: 星期必须在1-7之间")
+        start_time, end_time = course_data[6], course_data[7]
+        if not (self.TIME_PATTERN.match(str(start_time)) and self.TIME_PATTERN.match(str(end_time))):
+            raise ValueError(f"{name}: 时间格式应为HH:MM")
+        start_minute, end_minute = time_to_minutes(start_time), time_to_minutes(end_time)
+        if start_minute >= end_minute:
+            raise ValueError(f"{name}: 结束时间必须晚于开始时间")
+        return (name, teacher, location, start_week, end_week, day_of_week,
+                start_time, end_time, course_data[8], course_data[9], is_special, semester_id,
+                start_minute, end_minute, end_minute - start_minute)
+
+    def _prepare_batch(self, courses_data) -> List[Tuple]:
+        """校验整批课程数据，任意一条无效时整批拒绝"""
+        prepared, errors = [], []
+        for index, course_data in enumerate(courses_data, 1):
+            try:
+                prepared.append(self._prepare_course_data(course_data))
+            except ValueError as e:
+                errors.append(f"第{index}条: {str(e)}")
+        if errors:
+            raise ValueError("\n".join(errors))
+        return prepared
+
+    def find_conflicts(self, semester_id: int, day: int, start_time: str, end_time: str,
+                       start_week: int, end_week: int, exclude_ids=()) -> List[Course]:
+        """查找学期内与给定星期、时间和周数范围冲突的课程"""
+        # 冲突索引的前缀最大值在查询时惰性重建，需与写操作互斥
+        with self._stats.lock:
+            return self._get_semester_stats(semester_id).conflicts.find(
+                int(day), time_to_minutes(start_time), time_to_minutes(end_time),
+                int(start_week), int(end_week), set(exclude_ids))
+
+    def _check_conflicts(self, prepared, exclude_ids=()):
+        """检查待写入课程与已有课程、以及彼此之间的时间冲突
+
+        exclude_ids为本次将被覆盖的课程ID，有冲突时抛出CourseConflictError。
+        """
+        exclude_ids = set(exclude_ids)
+        batch_indexes = {}
+        messages, conflicts = [], []
+        for index, data in enumerate(prepared, 1):
+            # 批内课程尚无ID，使用负数占位
+            course = self._course_from_data(-index, data)
+            batch = batch_indexes.setdefault(course.semester_id, ConflictIndex())
+            found = (self._get_semester_stats(course.semester_id).conflicts.find_course(course, exclude_ids)
+                     + batch.find_course(course))
+            if found:
+                messages.append(f"{describe_course(course)} 与 {'、'.join(map(describe_course, found))} 时间冲突")
+                conflicts.extend(found)
+            batch.apply(course)
+        if messages:
+            raise CourseConflictError("\n".join(messages), conflicts)
+
+    def add_course(self, course_data: Tuple, allow_conflicts: bool = False) -> None:
+        """添加课程，与已有课程时间冲突时抛出CourseConflictError"""
         try:
-            conn = sqlite3.connect('courses.db')
-            cursor = conn.cursor()
-            # 将周数和星期转换为整数
-            processed_data = (
-                course_data[0],  # name
-                course_data[1],  # teacher
-                course_data[2],  # location
-                int(course_data[3]),  # start_week
-                int(course_data[4]),  # end_week
-                int(course_data[5]),  # day_of_week
-                course_data[6],  # start_time
-                course_data[7],  # end_time
-                course_data[8],  # color
-                course_data[9],  # course_type
-                course_data[10], # is_special
-                course_data[11]  # semester_id
-            )
-            cursor.execute('''
-                INSERT INTO courses (name, teacher, location, start_week, end_week, 
-                                day_of_week, start_time, end_time, color, course_type, is_special, semester_id)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', processed_data)
-            conn.commit()
+            processed_data = self._prepare_course_data(course_data)
+            with self._stats.lock:
+                if not allow_conflicts:
+                    self._check_conflicts([processed_data])
+                cursor = self.db.write(self.INSERT_COURSE_SQL, processed_data)
+                self._invalidate_cache(processed_data[11])
+                self._stats.add(self._course_from_data(cursor.lastrowid, processed_data))
             logger.info(f"成功添加课程: {course_data[0]},保存课程时使用的学期ID: {course_data[11]}")
         except Exception as e:
             logger.error(f"添加课程失败: {str(e)}")
             raise
-        finally:
-            conn.close()
-    
-    def get_courses(self) -> List[Tuple]:
-        cache_key = self._get_cache_key("get_courses")
-        cached_data = self._get_from_cache(cache_key)
-        if cached_data is not None:
-            return cached_data
 
-        try:
-            conn = sqlite3.connect('courses.db')
-            cursor = conn.cursor()
-            cursor.execute('SELECT * FROM courses ORDER BY semester_id, day_of_week, start_time')
-            courses = cursor.fetchall()
-            
-            valid_courses = []
-            for c in courses:
-                try:
-                    processed_course = (
-                        c[0], c[1], c[2], c[3], int(c[4]), int(c[5]), 
-                        int(c[6]), c[7], c[8], c[9], c[10], c[11], 
-                        c[12], c[13], c[14], c[15]
-                    )
-                    if self._is_valid_course(processed_course):
-                        valid_courses.append(processed_course)
-                except (ValueError, TypeError):
+    def add_courses_bulk(self, courses_data, allow_conflicts: bool = False) -> int:
+        """批量添加课程
+
+        先校验整批数据和时间冲突，再在同一个事务中用executemany写入，
+        写入完成后只使缓存失效一次。返回写入的课程数。
+        """
+        prepared = self._prepare_batch(courses_data)
+        if not prepared:
+            return 0
+        with self._stats.lock:
+            if not allow_conflicts:
+                self._check_conflicts(prepared)
+            try:
+                with self.db.transaction() as conn:
+                    last_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM courses').fetchone()[0]
+                    conn.executemany(self.INSERT_COURSE_SQL, prepared)
+                    # 读回新写入的课程，统计和索引需要真实的课程ID
+                    rows = conn.execute('SELECT * FROM courses WHERE id > ? ORDER BY id', (last_id,)).fetchall()
+            except Exception as e:
+                logger.error(f"批量添加课程失败: {str(e)}")
+                raise
+            self._invalidate_cache(*{data[11] for data in prepared})
+            for row in rows:
+                self._stats.add(Course.from_row(row))
+        logger.info(f"成功批量添加课程: {len(prepared)}门")
+        return len(prepared)
+
+    def update_courses_bulk(self, updates, allow_conflicts: bool = False) -> int:
+        """批量更新课程
+
+        updates为(course_id, course_data)序列，整批校验数据和时间冲突后在同一个事务中写入。
+        同一课程出现多次时只保留最后一次更新，与逐条执行的结果一致。返回更新的课程数。
+        """
+        latest = {}
+        for course_id, course_data in updates:
+            course_id = int(course_id)
+            latest.pop(course_id, None)
+            latest[course_id] = course_data
+        prepared = self._prepare_batch(list(latest.values()))
+        if not prepared:
+            return 0
+        course_ids = list(latest)
+        with self._stats.lock:
+            if not allow_conflicts:
+                self._check_conflicts(prepared, course_ids)
+            old_courses = self._get_courses_by_ids(course_ids)
+            try:
+                self.db.write_many(self.UPDATE_COURSE_SQL,
+                                   [data + (course_id,) for data, course_id in zip(prepared, course_ids)])
+            except Exception as e:
+                logger.error(f"批量更新课程失败: {str(e)}")
+                raise
+            self._invalidate_cache(*{course.semester_id for course in old_courses.values()},
+                                   *{data[11] for data in prepared})
+            for data, course_id in zip(prepared, course_ids):
+                old_course = old_courses.pop(course_id, None)
+                if old_course is None:
                     continue
-            
-            self._set_cache(cache_key, valid_courses)
-            return valid_courses
+                self._stats.remove(old_course)
+                self._stats.add(self._course_from_data(course_id, data))
+        logger.info(f"成功批量更新课程: {len(prepared)}门")
+        return len(prepared)
+
+    def _get_courses_by_ids(self, course_ids) -> dict:
+        """按ID批量获取课程，返回{课程ID: 课程}"""
+        courses = {}
+        # 分批查询，避免超过SQLite参数数量上限
+        for start in range(0, len(course_ids), 500):
+            chunk = course_ids[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self.db.fetchall(f'SELECT * FROM courses WHERE id IN ({placeholders})', chunk)
+            courses.update((course.id, course) for course in map(Course.from_row, rows))
+        return courses
+
+    def get_courses(self, semester_id: int = None) -> List[Course]:
+        """获取课程列表，指定学期时只查询该学期"""
+        def load():
+            if semester_id is None:
+                rows = self.db.fetchall('SELECT * FROM courses ORDER BY semester_id, day_of_week, start_time')
+            else:
+                rows = self.db.fetchall('''
+                    SELECT * FROM courses WHERE semester_id = ?
+                    ORDER BY day_of_week, start_time
+                ''', (int(semester_id),))
+            return self._process_rows(rows)
+
+        try:
+            return self._cached_query("get_courses", semester_id, (), load)
         except Exception as e:
             logger.error(f"获取课程列表失败: {str(e)}")
             return []
+
+    def iter_courses(self, semester_id: int = None, week: int = None, day: int = None,
+                     batch_size: int = 1000) -> Iterator[Course]:
+        """按游标分批读取课程，不缓存也不一次性载入内存，用于大批量导出
+
+        可按学期、周和星期过滤，无效课程会被跳过。
+        """
+        conditions, params = [], []
+        if semester_id is not None:
+            conditions.append("semester_id = ?")
+            params.append(int(semester_id))
+        if week is not None:
+            conditions.append("start_week <= ? AND end_week >= ?")
+            params.extend([week, week])
+        if day is not None:
+            conditions.append("day_of_week = ?")
+            params.append(day)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        cursor = self.db.execute(
+            f"SELECT * FROM courses {where} ORDER BY semester_id, day_of_week, start_time", params)
+        try:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from self._process_rows(rows)
         finally:
-            conn.close()
+            cursor.close()
+
+    def _process_rows(self, rows) -> List[Course]:
+        """将数据库行转换为课程记录并过滤无效课程"""
+        valid_courses = []
+        for row in rows:
+            try:
+                course = Course.from_row(row)
+            except (ValueError, TypeError, IndexError) as e:
+                logger.error(f"课程数据验证失败: {row}, 错误: {e}")
+                continue
+            if self._is_valid_course(course):
+                valid_courses.append(course)
+        return valid_courses
 
-    def _is_valid_course(self, course: Tuple) -> bool:
+    def _is_valid_course(self, course: Course) -> bool:
         """验证课程数据是否有效"""
-        try:
-            # 检查必要字段是否存在且非空
-            required_fields = [
-                course[1],  # name
-                course[2],  # teacher
-                course[3],  # location
-                course[4],  # start_week
-                course[5],  # end_week
-                course[6],  # day_of_week
-                course[7],  # start_time
-                course[8],  # end_time
-            ]
-            
-            # 验证数据类型
-            int(course[4])  # start_week
-            int(course[5])  # end_week
-            int(course[6])  # day_of_week
-            
-            # 验证所有必要字段
-            is_valid = all(required_fields)
-            if not is_valid:
-                logger.warning(f"无效课程数据: {course}")
-                return is_valid
-                
-            return True
-                
-        except (ValueError, TypeError, IndexError) as e:
-            logger.error(f"课程数据验证失败: {course}, 错误: {e}")
+        # 检查必要字段是否存在且非空
+        required_fields = [
+            course.name,
+            course.teacher,
+            course.location,
+            course.start_week,
+            course.end_week,
+            course.day_of_week,
+            course.start_time,
+            course.end_time,
+        ]
+        if not all(required_fields):
+            logger.warning(f"无效课程数据: {course}")
             return False
+        return True
 
     def delete_course(self, course_id: int) -> None:
         """删除课程"""
-        conn = sqlite3.connect('courses.db')
-        cursor = conn.cursor()
-        cursor.execute('DELETE FROM courses WHERE id = ?', (course_id,))
-        conn.commit()
-        conn.close()
+        with self._stats.lock:
+            course = self._get_course(course_id)
+            self.db.write('DELETE FROM courses WHERE id = ?', (course_id,))
+            if course is None:
+                return
+            self._invalidate_cache(course.semester_id)
+            self._stats.remove(course)
     
-    def get_courses_by_week(self, week: int) -> List[Tuple]:
-        """获取指定周的课程"""
-        courses = self.get_courses()
-        return [c for c in courses if int(c[4]) <= week <= int(c[5])]
+    def get_courses_by_month(self, year: int, month: int, semester_id: int) -> List[Course]:
+        """获取某月涉及各周上课的课程，每门课程只出现一次"""
+        calendar = self.get_calendar(semester_id)
+        if calendar is None:
+            return []
+        weeks = calendar.month_weeks(year, month)
+
+        def load():
+            rows = self.db.fetchall('''
+                SELECT * FROM courses
+                WHERE semester_id = ? AND start_week <= ? AND end_week >= ?
+                ORDER BY day_of_week, start_time
+            ''', (int(semester_id), weeks.stop - 1, weeks.start))
+            return self._process_rows(rows)
+
+        try:
+            return self._cached_query("get_courses_by_month", semester_id, (year, month), load)
+        except Exception as e:
+            logger.error(f"获取月课程失败: {str(e)}")
+            return []
+
+    def get_courses_by_week(self, week: int, semester_id: int = None) -> List[Course]:
+        """获取指定周的课程，指定学期时只查询该学期"""
+        def load():
+            if semester_id is None:
+                rows = self.db.fetchall('''
+                    SELECT * FROM courses WHERE start_week <= ? AND end_week >= ?
+                    ORDER BY semester_id, day_of_week, start_time
+                ''', (week, week))
+            else:
+                rows = self.db.fetchall('''
+                    SELECT * FROM courses
+                    WHERE semester_id = ? AND start_week <= ? AND end_week >= ?
+                    ORDER BY day_of_week, start_time
+                ''', (int(semester_id), week, week))
+            return self._process_rows(rows)
+
+        try:
+            return self._cached_query("get_courses_by_week", semester_id, (week,), load)
+        except Exception as e:
+            logger.error(f"获取周课程失败: {str(e)}")
+            return []
     
-    def get_courses_by_day(self, day: int, week: int) -> List[Tuple]:
-        """获取指定周指定日的课程"""
-        courses = self.get_courses()
-        return [c for c in courses if int(c[6]) == day and int(c[4]) <= week <= int(c[5])]
+    def get_courses_by_day(self, day: int, week: int, semester_id: int = None) -> List[Course]:
+        """获取指定周指定日的课程，指定学期时只查询该学期"""
+        def load():
+            if semester_id is None:
+                rows = self.db.fetchall('''
+                    SELECT * FROM courses
+                    WHERE day_of_week = ? AND start_week <= ? AND end_week >= ?
+                    ORDER BY semester_id, start_time
+                ''', (day, week, week))
+            else:
+                rows = self.db.fetchall('''
+                    SELECT * FROM courses
+                    WHERE semester_id = ? AND day_of_week = ? AND start_week <= ? AND end_week >= ?
+                    ORDER BY start_time
+                ''', (int(semester_id), day, week, week))
+            return self._process_rows(rows)
+
+        try:
+            return self._cached_query("get_courses_by_day", semester_id, (day, week), load)
+        except Exception as e:
+            logger.error(f"获取日课程失败: {str(e)}")
+            return []
     
-    def update_course(self, course_id: int, course_data: Tuple) -> None:
-        """更新课程信息"""
-        conn = sqlite3.connect('courses.db')
-        cursor = conn.cursor()
-        cursor.execute('''
-            UPDATE courses SET name=?, teacher=?, location=?, start_week=?, end_week=?,
-                        day_of_week=?, start_time=?, end_time=?, color=?, course_type=?,
-                        is_special=?, semester_id=?
-            WHERE id=?
-        ''', course_data + (course_id,))
-        conn.commit()
-        conn.close()
+    def update_course(self, course_id: int, course_data: Tuple, allow_conflicts: bool = False) -> None:
+        """更新课程信息，与其他课程时间冲突时抛出CourseConflictError"""
+        processed_data = self._prepare_course_data(course_data)
+        with self._stats.lock:
+            if not allow_conflicts:
+                self._check_conflicts([processed_data], [int(course_id)])
+            old_course = self._get_course(course_id)
+            self.db.write(self.UPDATE_COURSE_SQL, processed_data + (course_id,))
+            if old_course is None:
+                return
+            self._invalidate_cache(old_course.semester_id, processed_data[11])
+            self._stats.remove(old_course)
+            self._stats.add(self._course_from_data(course_id, processed_data))
     def update_semester(self, semester_id: int, name: str, start_date: str, end_date: str) -> None:
         """更新学期信息"""
-        conn = sqlite3.connect('courses.db')
-        cursor = conn.cursor()
-        cursor.execute('''
+        self.db.write('''
             UPDATE semesters 
             SET name=?, start_date=?, end_date=?
             WHERE id=?
         ''', (name, start_date, end_date, semester_id))
-        conn.commit()
-        conn.close()
-    def search_courses(self, keyword: str, search_type: str = "name") -> List[Tuple]:
+        # 学期周数可能变化，统计聚合需要按新的周数重建
+        self._stats.drop(int(semester_id))
+        self._invalidate_cache(semester_id)
+    def search_courses(self, keyword: str, search_type: str = "name", semester_id: int = None) -> List[Course]:
         """搜索课程
         Args:
             keyword: 搜索关键词
             search_type: 搜索类型 ("name", "teacher", "location")
+            semester_id: 学期ID，为空时搜索所有学期
         Returns:
-            List[Tuple]: 匹配的课程列表
+            List[Course]: 匹配的课程列表
         """
-        courses = self.get_courses()
+        courses = self.get_courses(semester_id)
         if search_type == "name":
-            return [c for c in courses if keyword.lower() in c[1].lower()]
+            return [c for c in courses if keyword.lower() in c.name.lower()]
         elif search_type == "teacher":
-            return [c for c in courses if keyword.lower() in c[2].lower()]
+            return [c for c in courses if keyword.lower() in c.teacher.lower()]
         elif search_type == "location":
-            return [c for c in courses if keyword.lower() in c[3].lower()]
+            return [c for c in courses if keyword.lower() in c.location.lower()]
         return []
-    def export_courses(self, courses: List[Tuple], format: str = "excel", filename: str = None, view_type: str = "week", target_date: datetime = None) -> bool:
-        """导出课程数据"""
+    def export_courses(self, courses: Iterable[Course], format: str = "excel", filename=None, view_type: str = "week",
+                       target_date: datetime = None, group_by: str = "semester", use_pandas: bool = False,
+                       weeks=None) -> bool:
+        """导出课程数据
+
+        csv/json/ndjson/excel逐门课程写出，courses可以是iter_courses返回的生成器，
+        csv/json/ndjson的filename也可以是可写的文本流。
+        Excel按group_by（semester/week）分表，按周分表时weeks限定写出哪些周（导出范围），
+        use_pandas为True时改用pandas导出。
+        """
         try:
             if not filename:
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                if view_type == "month":  # 为本月课程添加特殊命名
-                    filename = f"month_courses_{target_date.strftime('%Y%m')}"
-                else:
-                    filename = f"courses_{timestamp}"
-                    
+                filename = self.default_export_name(view_type, target_date)
+
             if format == "excel":
-                return self._export_to_excel(courses, filename)
+                return self._export_to_excel(courses, filename, group_by, use_pandas, weeks)
             elif format == "csv":
                 return self._export_to_csv(courses, filename)
             elif format == "json":
                 return self._export_to_json(courses, filename)
+            elif format == "ndjson":
+                return self._export_to_ndjson(courses, filename)
             elif format == "pdf":
                 return self._export_to_pdf(courses, filename)
             elif format == "image":
                 return self._export_to_image(courses, filename, view_type, target_date)
+            elif format == "ics":
+                return self._export_to_ics(courses, filename)
             else:
                 raise ValueError(f"不支持的导出格式: {format}")
         except Exception as e:
             logger.error(f"导出课程失败: {str(e)}")
             return False
 
-    def _export_to_excel(self, courses: List[Tuple], filename: str) -> bool:
-        """导出为Excel格式"""
+    @staticmethod
+    def default_export_name(view_type: str = "week", target_date: datetime = None) -> str:
+        """未指定文件名时的默认导出文件名（不含扩展名）"""
+        if view_type == "month":  # 为本月课程添加特殊命名
+            return f"month_courses_{target_date.strftime('%Y%m')}"
+        return f"courses_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+
+    def _export_to_excel(self, courses: Iterable[Course], filename: str, group_by: str = "semester",
+                         use_pandas: bool = False, weeks=None) -> bool:
+        """导出为Excel格式，按学期或按周分表，逐行写入工作簿"""
+        if use_pandas:
+            return self._export_to_excel_pandas(courses, filename)
+        try:
+            from excel_export import write_workbook
+
+            def sheet_title(key):
+                if group_by == "week":
+                    return f"第{key}周"
+                semester = self.get_semester(key)
+                return semester[1] if semester else f"学期{key}"
+
+            count = write_workbook(courses, f"{filename}.xlsx", group_by, sheet_title, weeks)
+            logger.info(f"成功导出Excel文件: {filename}.xlsx，共{count}门课程")
+            return True
+        except Exception as e:
+            logger.error(f"导出Excel失败: {str(e)}")
+            return False
+
+    def _export_to_excel_pandas(self, courses: Iterable[Course], filename: str) -> bool:
+        """使用pandas导出为Excel格式，仅在显式指定时使用"""
         try:
             import pandas as pd
-            
-            # 转换数据格式
-            df_data = []
-            for course in courses:
-                df_data.append({
-                    "课程名称": course[1],
-                    "任课老师": course[2],
-                    "上课地点": course[3],
-                    "开始周数": course[4],
-                    "结束周数": course[5],
-                    "星期": self._get_weekday(course[6]),
-                    "上课时间": f"{course[7]}-{course[8]}",
-                    "课程类型": course[10],
-                    "学期": course[12]
-                })
-            
-            df = pd.DataFrame(df_data)
+            from stream_export import CSV_HEADERS, course_to_row
+
+            df = pd.DataFrame([course_to_row(course) for course in courses], columns=CSV_HEADERS)
             df.to_excel(f"{filename}.xlsx", index=False)
             logger.info(f"成功导出Excel文件: {filename}.xlsx")
             return True
@@ -317,90 +577,73 @@ class CourseManager:
             logger.error(f"导出Excel失败: {str(e)}")
             return False
 
-    def _export_to_csv(self, courses: List[Tuple], filename: str) -> bool:
+    def _export_to_csv(self, courses: Iterable[Course], filename: str) -> bool:
         """导出为CSV格式"""
+        return self._export_stream(courses, "csv", filename, "CSV", encoding='utf-8-sig')
+
+    def _export_to_json(self, courses: Iterable[Course], filename: str) -> bool:
+        """导出为JSON格式"""
+        return self._export_stream(courses, "json", filename, "JSON")
+
+    def _export_to_ndjson(self, courses: Iterable[Course], filename: str) -> bool:
+        """导出为NDJSON格式，每行一门课程"""
+        return self._export_stream(courses, "ndjson", filename, "NDJSON")
+
+    def _export_stream(self, courses: Iterable[Course], format: str, target, label: str,
+                       encoding: str = 'utf-8') -> bool:
+        """逐门课程写出，target为文件名（不含扩展名）或可写的文本流"""
         try:
-            import csv
-            
-            with open(f"{filename}.csv", 'w', newline='', encoding='utf-8-sig') as f:
-                writer = csv.writer(f)
-                writer.writerow(["课程名称", "任课老师", "上课地点", "开始周数", "结束周数", 
-                            "星期", "上课时间", "课程类型", "学期"])
-                for course in courses:
-                    writer.writerow([
-                        course[1], course[2], course[3], course[4], course[5],
-                        self._get_weekday(course[6]), f"{course[7]}-{course[8]}",
-                        course[10], course[12]
-                    ])
-            logger.info(f"成功导出CSV文件: {filename}.csv")
+            from stream_export import write_courses
+
+            if hasattr(target, "write"):
+                count = write_courses(courses, format, target)
+                logger.info(f"成功导出{label}数据，共{count}门课程")
+            else:
+                with open(f"{target}.{format}", 'w', newline='', encoding=encoding) as f:
+                    count = write_courses(courses, format, f)
+                logger.info(f"成功导出{label}文件: {target}.{format}，共{count}门课程")
             return True
         except Exception as e:
-            logger.error(f"导出CSV失败: {str(e)}")
+            logger.error(f"导出{label}失败: {str(e)}")
             return False
 
-    def _export_to_json(self, courses: List[Tuple], filename: str) -> bool:
-        """导出为JSON格式"""
+    def _export_to_ics(self, courses: List[Course], filename: str) -> bool:
+        """导出为iCalendar格式，每门课程一个按周重复的日程"""
         try:
-            import json
-            
-            data = []
-            for course in courses:
-                data.append({
-                    "name": course[1],
-                    "teacher": course[2],
-                    "location": course[3],
-                    "start_week": course[4],
-                    "end_week": course[5],
-                    "day_of_week": self._get_weekday(course[6]),
-                    "time": f"{course[7]}-{course[8]}",
-                    "course_type": course[10],
-                    "semester": course[12]
-                })
-            
-            with open(f"{filename}.json", 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            logger.info(f"成功导出JSON文件: {filename}.json")
+            from ics_export import IcsWriter
+
+            calendars = {}
+            with open(f"{filename}.ics", 'w', encoding='utf-8', newline='') as f:
+                writer = IcsWriter(f)
+                writer.begin()
+                for course in courses:
+                    if course.semester_id not in calendars:
+                        calendars[course.semester_id] = self.get_calendar(course.semester_id)
+                    calendar = calendars[course.semester_id]
+                    if calendar is None:
+                        logger.warning(f"课程所在学期不存在，跳过: {course.name}")
+                        continue
+                    writer.write_course(course, calendar)
+                writer.end()
+            logger.info(f"成功导出iCalendar文件: {filename}.ics，共{writer.count}门课程")
             return True
         except Exception as e:
-            logger.error(f"导出JSON失败: {str(e)}")
+            logger.error(f"导出iCalendar失败: {str(e)}")
             return False
-    def _export_to_pdf(self, courses: List[Tuple], filename: str) -> bool:
+
+    def _export_to_pdf(self, courses: List[Course], filename: str) -> bool:
         """导出为PDF格式"""
         try:
             from reportlab.lib import colors
-            from reportlab.lib.pagesizes import letter, A4
+            from reportlab.lib.pagesizes import A4
             from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph
-            from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-            from reportlab.pdfbase import pdfmetrics
-            from reportlab.pdfbase.ttfonts import TTFont
-            import os
-            
-            # 注册中文字体
-            font_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'fonts', 'simsun.ttc')
-            try:
-                pdfmetrics.registerFont(TTFont('SimSun', font_path))
-                font_name = 'SimSun'
-            except:
-                try:
-                    # 尝试使用系统字体
-                    pdfmetrics.registerFont(TTFont('SimSun', 'C:/Windows/Fonts/simsun.ttc'))
-                    font_name = 'SimSun'
-                except:
-                    logger.warning("未找到中文字体，使用默认字体")
-                    font_name = 'Helvetica'
-            
+            from export_resources import resources
+
+            # 中文字体和样式表每个进程只注册、创建一次
+            font_name = resources.pdf_font()
+            styles = resources.pdf_styles()
+
             doc = SimpleDocTemplate(f"{filename}.pdf", pagesize=A4)
-            styles = getSampleStyleSheet()
-            
-            # 创建中文字体样式
-            styles.add(ParagraphStyle(name='ChineseTitle',
-                                    parent=styles['Title'],
-                                    fontName=font_name,
-                                    fontSize=16))
-            styles.add(ParagraphStyle(name='ChineseNormal',
-                                    parent=styles['Normal'],
-                                    fontName=font_name,
-                                    fontSize=10))
             
             story = []
             
@@ -413,9 +656,9 @@ class CourseManager:
                     "星期", "上课时间", "课程类型"]]
             for course in courses:
                 data.append([
-                    course[1], course[2], course[3], course[4], course[5],
-                    self._get_weekday(course[6]), f"{course[7]}-{course[8]}",
-                    course[10]
+                    course.name, course.teacher, course.location, course.start_week, course.end_week,
+                    course.weekday_name, course.time_range,
+                    course.course_type
                 ])
             
             # 创建表格
@@ -441,146 +684,63 @@ class CourseManager:
         except Exception as e:
             logger.error(f"导出PDF失败: {str(e)}")
             return False
-    def _export_to_image(self, courses: List[Tuple], filename: str, view_type: str = "week", target_date: datetime = None) -> bool:
-        """导出为图片格式"""
+    def _export_to_image(self, courses: List[Course], filename: str, view_type: str = "week", target_date: datetime = None) -> bool:
+        """导出为图片格式，内容未变化的课程表直接使用缓存的PNG"""
         try:
-            from PIL import Image, ImageDraw, ImageFont
-            import os
-            
-            # 创建图片
-            width, height = 1200, 800
-            image = Image.new('RGB', (width, height), color='white')
-            draw = ImageDraw.Draw(image)
-            
-            # 尝试使用中文字体
-            try:
-                font_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'fonts', 'simsun.ttc')
-                font_title = ImageFont.truetype(font_path, 24)
-                font_content = ImageFont.truetype(font_path, 16)
-            except:
-                try:
-                    # 尝试使用系统字体
-                    font_title = ImageFont.truetype("C:/Windows/Fonts/simsun.ttc", 24)
-                    font_content = ImageFont.truetype("C:/Windows/Fonts/simsun.ttc", 16)
-                except:
-                    logger.warning("未找到中文字体，使用默认字体")
-                    font_title = ImageFont.load_default()
-                    font_content = ImageFont.load_default()
-            
-            # 绘制标题
-            title = "课程表" if view_type == "week" else f"{target_date.strftime('%Y年%m月%d日')}课程安排"
-            draw.text((width//2 - 100, 20), title, fill='black', font=font_title)
-            
-            # 绘制表格
-            if view_type == "week":
-                # 周视图布局
-                start_y = 80
-                cell_height = 100
-                cell_width = 150
-                
-                # 绘制表头
-                headers = ["时间"] + ["周一", "周二", "周三", "周四", "周五", "周六", "周日"]
-                for i, header in enumerate(headers):
-                    x = i * cell_width
-                    draw.rectangle([x, start_y, x + cell_width, start_y + 40], outline='black')
-                    draw.text((x + 10, start_y + 10), header, fill='black', font=font_content)
-                
-                # 绘制时间行和课程
-                time_slots = [
-                    ("07:35", "07:45"), ("08:00", "09:40"), ("10:00", "11:40"),
-                    ("14:00", "15:40"), ("16:00", "17:40"), ("19:00", "20:40")
-                ]
-                
-                for i, (start, end) in enumerate(time_slots):
-                    y = start_y + 40 + i * cell_height
-                    # 绘制时间列
-                    draw.rectangle([0, y, cell_width, y + cell_height], outline='black')
-                    draw.text((10, y + 40), f"{start}\n{end}", fill='black', font=font_content)
-                    
-                    # 绘制课程
-                    for j in range(7):
-                        x = (j + 1) * cell_width
-                        draw.rectangle([x, y, x + cell_width, y + cell_height], outline='black')
-                        
-                        # 查找对应课程
-                        for course in courses:
-                            if (course[6] == j + 1 and  # 星期几
-                                course[7] == start and course[8] == end):  # 时间匹配
-                                # 绘制课程信息
-                                text = f"{course[1]}\n{course[3]}\n{course[2]}"
-                                draw.text((x + 10, y + 10), text, fill='black', font=font_content)
-                                break
-            else:
-                # 日视图布局
-                start_y = 80
-                cell_height = 80
-                current_day = target_date.weekday() + 1
-                
-                # 筛选当天课程
-                day_courses = [c for c in courses if int(c[6]) == current_day]
-                
-                # 绘制课程列表
-                for i, course in enumerate(day_courses):
-                    y = start_y + i * cell_height
-                    draw.rectangle([50, y, width - 50, y + cell_height], outline='black')
-                    text = f"{course[1]} - {course[2]}\n地点：{course[3]}\n时间：{course[7]}-{course[8]}"
-                    draw.text((60, y + 10), text, fill='black', font=font_content)
-            
-            # 保存图片
-            image.save(f"{filename}.png")
+            from image_render import renderer
+
+            data = renderer.render(courses, view_type, target_date)
+            with open(f"{filename}.png", 'wb') as f:
+                f.write(data)
             logger.info(f"成功导出图片文件: {filename}.png")
             return True
         except Exception as e:
             logger.error(f"导出图片失败: {str(e)}")
             return False
-    def _get_weekday(self, day: int) -> str:
-        """将数字星期转换为文字"""
-        weekdays = ["周一", "周二", "周三", "周四", "周五", "周六", "周日"]
-        return weekdays[day - 1] if 1 <= day <= 7 else "未知"
-    
-    def get_free_time_slots(self, day: int, week: int) -> List[Tuple]:
-        """获取指定日期的空闲时间段"""
+
+    def _free_time_index(self, semester_id: int) -> FreeTimeIndex:
+        """获取学期空闲时间位图索引，调用方需持有self._stats.lock"""
+        return self._get_semester_stats(semester_id).free_time
+
+    def get_free_hours(self, week: int, semester_id: int, day: int = None) -> float:
+        """获取指定日期或整周（day为None）的空闲时长（小时）"""
+        with self._stats.lock:
+            index = self._free_time_index(semester_id)
+            return index.week_free_hours(week) if day is None else index.free_hours(week, day)
+
+    def get_free_time_slots(self, day: int, week: int, semester_id: int = None) -> List[Tuple]:
+        """获取指定日期的空闲时间段，未指定学期时使用当前学期"""
         try:
-            # 获取当天的课程
-            day_courses = self.get_courses_by_day(day, week)
-            
-            # 获取所有时间段
-            time_slots = [
-                ("07:35", "07:45"), ("08:00", "09:40"), ("10:00", "11:40"),
-                ("14:00", "15:40"), ("16:00", "17:40"), ("19:00", "20:40")
-            ]
-            
-            # 找出已被占用的时间段
-            occupied_slots = []
-            for course in day_courses:
-                start_time = course[7]
-                end_time = course[8]
-                occupied_slots.append((start_time, end_time))
-            
-            # 找出空闲时间段
-            free_slots = []
-            for slot in time_slots:
-                if slot not in occupied_slots:
-                    free_slots.append(slot)
-            
-            return free_slots
+            if semester_id is None:
+                semester_id = self._current_semester_id()
+            if semester_id is not None:
+                with self._stats.lock:
+                    return self._free_time_index(semester_id).free_slots(week, day)
+            # 没有学期时按当天全部课程计算占用掩码
+            mask = 0
+            for course in self.get_courses_by_day(day, week):
+                mask |= slot_mask(course.start_minute, course.end_minute)
+            return list(FREE_SLOTS[mask])
         except Exception as e:
             logger.error(f"获取空闲时间失败: {str(e)}")
             return []
-    def get_week_free_time_slots(self, week: int) -> dict:
-        """获取一周的空闲时间段"""
+    def get_week_free_time_slots(self, week: int, semester_id: int = None) -> dict:
+        """获取一周的空闲时间段，未指定学期时使用当前学期"""
         try:
-            week_free_slots = {}
-            for day in range(1, 8):  # 1-7 代表周一到周日
-                day_free_slots = self.get_free_time_slots(day, week)
-                week_free_slots[day] = day_free_slots
-            return week_free_slots
+            if semester_id is None:
+                semester_id = self._current_semester_id()
+            if semester_id is None:
+                return {day: self.get_free_time_slots(day, week) for day in range(1, 8)}
+            with self._stats.lock:
+                index = self._free_time_index(semester_id)
+                # 1-7 代表周一到周日
+                return {day: index.free_slots(week, day) for day in range(1, 8)}
         except Exception as e:
             logger.error(f"获取周空闲时间失败: {str(e)}")
             return {}
 
-    def get_month_free_time_slots(self, year: int, month: int) -> dict:
-        """获取月份的空闲时间段统计"""
+    def get_month_free_time_slots(self, year: int, month: int, semester_id: int = None) -> dict:
+        """获取月份的空闲时间段统计，未指定学期时使用当前学期"""
         try:
             month_free_stats = {
                 'total_free_time': 0.0,
@@ -588,53 +748,32 @@ class CourseManager:
                 'days': {}
             }
             
-            # 获取当前学期
-            current_semester = self.get_current_semester()
+            # 获取学期
+            if semester_id is None:
+                current_semester = self.get_current_semester()
+            else:
+                current_semester = self.get_semester(semester_id)
             if not current_semester:
                 return month_free_stats
                 
-            # 获取月份的第一天和最后一天
-            first_day = datetime(year, month, 1)
-            last_day = datetime(year, month + 1, 1) - timedelta(days=1) if month < 12 else datetime(year, 12, 31)
-            
-            # 计算月份的第一天和最后一天对应的周数
-            start_week = ((first_day - datetime.strptime(current_semester[2], "%Y-%m-%d")).days // 7) + 1
-            end_week = ((last_day - datetime.strptime(current_semester[2], "%Y-%m-%d")).days // 7) + 1
-            
-            # 定义所有时间段
-            all_time_slots = [
-                ("07:35", "07:45"), ("08:00", "09:40"), ("10:00", "11:40"),
-                ("14:00", "15:40"), ("16:00", "17:40"), ("19:00", "20:40")
-            ]
-            
-            # 计算每天的总时间
-            daily_total_time = sum(self._calculate_duration(start, end) for start, end in all_time_slots)
-            
-            # 遍历月份中的每一天
-            current_day = first_day
-            while current_day <= last_day:
-                day_of_week = current_day.weekday() + 1
-                week_num = ((current_day - datetime.strptime(current_semester[2], "%Y-%m-%d")).days // 7) + 1
-                
-                # 获取当天的空闲时间
-                free_slots = self.get_free_time_slots(day_of_week, week_num)
-                # 使用 _calculate_duration 方法计算每个时间段的时长
-                day_free_time = sum(self._calculate_duration(start, end) for start, end in free_slots)
-                
-                # 更新统计信息
-                month_free_stats['total_free_time'] += day_free_time
-                month_free_stats['total_occupied_time'] += (daily_total_time - day_free_time)
+            calendar = self.get_calendar(current_semester)
+            with self._stats.lock:
+                index = self._free_time_index(current_semester[0])
+                masks = [(current_day, index.mask(week_num, day_of_week))
+                         for current_day, day_of_week, week_num in calendar.month_days(year, month)]
+
+            # 按0.1小时累计，避免逐日浮点累加误差
+            total_free, days = 0, 0
+            for current_day, mask in masks:
+                total_free += FREE_TENTHS[mask]
+                days += 1
                 month_free_stats['days'][current_day.day] = {
-                    'free_time': day_free_time,
-                    'free_slots': free_slots
+                    'free_time': FREE_TENTHS[mask] / 10,
+                    'free_slots': list(FREE_SLOTS[mask])
                 }
-                
-                current_day += timedelta(days=1)
-            
-            # 最后对总时间进行一次舍入
-            month_free_stats['total_free_time'] = round(month_free_stats['total_free_time'], 1)
-            month_free_stats['total_occupied_time'] = round(month_free_stats['total_occupied_time'], 1)
-                
+
+            month_free_stats['total_free_time'] = total_free / 10
+            month_free_stats['total_occupied_time'] = (FREE_TENTHS[0] * days - total_free) / 10
             return month_free_stats
         except Exception as e:
             logger.error(f"获取月空闲时间失败: {str(e)}")
@@ -643,105 +782,69 @@ class CourseManager:
                 'total_occupied_time': 0.0,
                 'days': {}
             }
-    def _calculate_duration(self, start_time: str, end_time: str) -> float:
-        """计算时间段长度（小时）"""
-        try:
-            start = datetime.strptime(start_time, "%H:%M")
-            end = datetime.strptime(end_time, "%H:%M")
-            # 先计算分钟数，再转换为小时，避免浮点数精度问题
-            minutes = int((end - start).total_seconds() / 60)
-            hours = minutes / 60
-            return round(hours, 1)  # 转换为小时并保留一位小数
-        except Exception as e:
-            logger.error(f"计算时间段长度失败: {str(e)}")
-            return 0.0
+    def get_occupancy(self, semester_id: int):
+        """获取学期课程占用张量，同一数据版本内只构建一次"""
+        from occupancy import OccupancyTensor
+
+        def load():
+            calendar = self.get_calendar(semester_id)
+            return OccupancyTensor(self.get_courses(semester_id),
+                                   calendar.total_weeks if calendar else 0)
+
+        return self._cached_query('get_occupancy', semester_id, (), load)
+
+    def _get_semester_stats(self, semester_id: int) -> SemesterStats:
+        """获取学期统计聚合，首次访问时由课程列表构建"""
+        semester_id = int(semester_id)
+
+        def load():
+            calendar = self.get_calendar(semester_id)
+            return SemesterStats.from_courses(semester_id, self.get_courses(semester_id),
+                                              calendar.total_weeks if calendar else 0)
+
+        return self._stats.get(semester_id, load)
+
+    def get_stats_overview(self, semester_id: int) -> dict:
+        """获取学期课程数量统计（总数、正常课程、课程种类、各类型数量）"""
+        with self._stats.lock:
+            return self._get_semester_stats(semester_id).overview()
+
+    def get_free_days(self, week: int, semester_id: int) -> int:
+        """获取指定周没有任何课程的天数"""
+        with self._stats.lock:
+            return self._free_time_index(semester_id).free_days(week)
+
     def get_study_statistics(self, semester_id: int) -> dict:
         """获取学期学习统计数据"""
         try:
-            stats = {
-                'total_courses': 0,
-                'total_hours': 0.0,
-                'course_types': {},
-                'weekly_hours': {},
-                'daily_hours': {},
-                'time_distribution': {},
-                'monthly_hours': {},  # 新增：月度学时分布
-                'course_density': {},  # 新增：课程密度分析
-                'study_patterns': {}  # 新增：学习模式分析
-            }
-            
-            # 获取学期所有课程
-            courses = [c for c in self.get_courses() if str(c[12]) == str(semester_id)]
-            stats['total_courses'] = len(courses)
-            
-            # 计算总学习时长
-            for course in courses:
-                # 计算单次课程时长
-                duration = self._calculate_duration(course[7], course[8])
-                # 计算总周数
-                weeks = int(course[5]) - int(course[4]) + 1
-                # 计算该课程总时长
-                total_hours = duration * weeks
-                stats['total_hours'] += total_hours
-                
-                # 统计课程类型分布
-                course_type = course[10]
-                if course_type not in stats['course_types']:
-                    stats['course_types'][course_type] = {'count': 0, 'hours': 0.0}
-                stats['course_types'][course_type]['count'] += 1
-                stats['course_types'][course_type]['hours'] += total_hours
-                
-                # 统计每周学习时长
-                for week in range(int(course[4]), int(course[5]) + 1):
-                    if week not in stats['weekly_hours']:
-                        stats['weekly_hours'][week] = 0.0
-                    stats['weekly_hours'][week] += duration
-                    
-                    # 新增：月度统计
-                    month = ((week - 1) // 4) + 1  # 假设每月4周
-                    if month not in stats['monthly_hours']:
-                        stats['monthly_hours'][month] = 0.0
-                    stats['monthly_hours'][month] += duration
-                
-                # 统计每日学习时长
-                day = int(course[6])
-                if day not in stats['daily_hours']:
-                    stats['daily_hours'][day] = 0.0
-                stats['daily_hours'][day] += total_hours
-                
-                # 统计时间段分布
-                time_slot = f"{course[7]}-{course[8]}"
-                if time_slot not in stats['time_distribution']:
-                    stats['time_distribution'][time_slot] = 0.0
-                stats['time_distribution'][time_slot] += total_hours
-                
-                # 新增：课程密度分析
-                week_day = f"{int(course[4])}-{int(course[6])}"  # 开始周-星期
-                if week_day not in stats['course_density']:
-                    stats['course_density'][week_day] = 0
-                stats['course_density'][week_day] += 1
-                
-                # 新增：学习模式分析
-                time_period = self._get_time_period(course[7])
-                if time_period not in stats['study_patterns']:
-                    stats['study_patterns'][time_period] = 0.0
-                stats['study_patterns'][time_period] += total_hours
-            
-            return stats
+            if self._stats.needs_verify(int(semester_id)):
+                self.verify_statistics(semester_id)
+            # 统计在持锁时计算，写操作不会在遍历计数器的过程中修改它们
+            with self._stats.lock:
+                stats = self._get_semester_stats(semester_id)
+                return self._cached_query('get_study_statistics', semester_id, (), stats.statistics)
         except Exception as e:
             logger.error(f"获取学习统计数据失败: {str(e)}")
             return {}
-    def _get_time_period(self, time_str: str) -> str:
-        """根据时间获取时间段分类"""
-        hour = int(time_str.split(':')[0])
-        if hour < 12:
-            return "上午"
-        elif hour < 14:
-            return "中午"
-        elif hour < 18:
-            return "下午"
-        else:
-            return "晚上"
+
+    def verify_statistics(self, semester_id: int) -> bool:
+        """用占用张量完整重算学期统计，与差量维护的聚合比对
+
+        不一致时记录警告并重建聚合，返回聚合是否一致。
+        """
+        semester_id = int(semester_id)
+        with self._stats.lock:
+            stats = self._get_semester_stats(semester_id)
+            expected = self.get_occupancy(semester_id).statistics()
+            if statistics_equal(stats.statistics(), expected):
+                stats.changes = 0
+                return True
+            logger.warning(f"学期{semester_id}的统计聚合与完整重算结果不一致，已重建")
+            self._stats.drop(semester_id)
+            self._invalidate_cache(semester_id)
+            self._get_semester_stats(semester_id)
+            return False
+
 class SpecialCourse:
     TYPES = {
         "早签": {"color": "#ffc107", "duration": 30},
@@ -0,0 +1,131 @@
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from logger_config import logger
+
+DB_PATH = 'courses.db'
+
+
+class ConnectionManager:
+    """SQLite连接管理器
+
+    每个线程持有一个长连接，启用WAL日志和调优后的PRAGMA配置，
+    遇到数据库锁定时按退避策略重试。
+    """
+
+    # 连接建立后执行的PRAGMA配置
+    PRAGMAS = (
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        "PRAGMA temp_store=MEMORY",
+        "PRAGMA cache_size=-8000",  # 约8MB页缓存
+        "PRAGMA mmap_size=67108864",  # 64MB内存映射
+    )
+
+    def __init__(self, db_path: str = DB_PATH, busy_timeout: float = 5.0,
+                 max_retries: int = 5, cached_statements: int = 256):
+        self.db_path = db_path
+        self.busy_timeout = busy_timeout
+        self.max_retries = max_retries
+        self.cached_statements = cached_statements
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def get_connection(self) -> sqlite3.Connection:
+        """获取当前线程的连接，不存在时创建"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _connect(self) -> sqlite3.Connection:
+        """创建新连接并应用PRAGMA配置"""
+        conn = sqlite3.connect(self.db_path,
+                               timeout=self.busy_timeout,
+                               cached_statements=self.cached_statements,
+                               check_same_thread=False)
+        for pragma in self.PRAGMAS:
+            try:
+                conn.execute(pragma)
+            except sqlite3.Error as e:
+                logger.warning(f"设置{pragma}失败: {str(e)}")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout * 1000)}")
+        logger.info(f"已为线程 {threading.current_thread().name} 创建数据库连接: {self.db_path}")
+        return conn
+
+    def _retry(self, func, *args):
+        """数据库锁定时重试"""
+        delay = 0.05
+        for attempt in range(self.max_retries + 1):
+            try:
+                return func(*args)
+            except sqlite3.OperationalError as e:
+                message = str(e).lower()
+                if ("locked" not in message and "busy" not in message) or attempt == self.max_retries:
+                    raise
+                logger.warning(f"数据库繁忙，第{attempt + 1}次重试: {str(e)}")
+                time.sleep(delay)
+                delay = min(delay * 2, 1.0)
+
+    def execute(self, sql: str, params=()) -> sqlite3.Cursor:
+        """执行单条语句（不提交）"""
+        conn = self.get_connection()
+        return self._retry(conn.execute, sql, params)
+
+    def fetchall(self, sql: str, params=()) -> list:
+        """查询并返回所有结果"""
+        return self._retry(lambda: self.get_connection().execute(sql, params).fetchall())
+
+    def fetchone(self, sql: str, params=()):
+        """查询并返回第一条结果"""
+        return self._retry(lambda: self.get_connection().execute(sql, params).fetchone())
+
+    def write(self, sql: str, params=()) -> sqlite3.Cursor:
+        """执行写操作并提交"""
+        with self.transaction() as conn:
+            return conn.execute(sql, params)
+
+    def write_many(self, sql: str, seq_of_params) -> sqlite3.Cursor:
+        """批量执行写操作并提交"""
+        with self.transaction() as conn:
+            return conn.executemany(sql, seq_of_params)
+
+    @contextmanager
+    def transaction(self):
+        """事务上下文，成功提交，异常回滚"""
+        conn = self.get_connection()
+        self._retry(conn.execute, "BEGIN IMMEDIATE")
+        try:
+            yield conn
+            self._retry(conn.commit)
+        except BaseException:
+            # 包括重试后仍提交失败的情况，回滚以释放写锁，连接不会停留在未结束的事务中
+            conn.rollback()
+            raise
+
+    def close_thread_connection(self):
+        """关闭当前线程的连接"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            with self._lock:
+                if conn in self._connections:
+                    self._connections.remove(conn)
+            conn.close()
+            self._local.conn = None
+
+    def close_all(self):
+        """关闭所有连接"""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error as e:
+                logger.warning(f"关闭数据库连接失败: {str(e)}")
+        self._local = threading.local()
+        logger.info("数据库连接已全部关闭")
@@ -0,0 +1,128 @@
+import itertools
+import queue
+import threading
+from concurrent.futures import Future
+from logger_config import logger
+
+
+class DBWorker:
+    """后台数据库工作线程
+
+    所有提交的请求在同一个工作线程中按顺序执行，界面线程不会因SQLite阻塞。
+    结果通过Future返回；指定回调时，回调由root.after轮询在Tk主线程中执行。
+    同一channel只保留最新请求：排队中的旧请求直接取消，已完成的旧结果被丢弃。
+    """
+
+    def __init__(self, root=None, on_exit=None, busy_poll_ms: int = 15, idle_poll_ms: int = 100):
+        self.root = root
+        self.on_exit = on_exit
+        self.busy_poll_ms = busy_poll_ms
+        self.idle_poll_ms = idle_poll_ms
+        self._tasks = queue.Queue()
+        self._results = queue.Queue()
+        self._latest = {}
+        self._tokens = itertools.count(1)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._poll_id = None
+        self._thread = threading.Thread(target=self._run, name="DBWorker", daemon=True)
+
+    def start(self):
+        """启动工作线程和结果轮询"""
+        self._thread.start()
+        if self.root is not None:
+            self._poll_id = self.root.after(self.idle_poll_ms, self._poll)
+        logger.info("数据库工作线程已启动")
+
+    def stop(self, timeout: float = 5.0):
+        """处理完已排队的请求后停止工作线程"""
+        if self._poll_id is not None:
+            try:
+                self.root.after_cancel(self._poll_id)
+            except Exception:
+                pass
+            self._poll_id = None
+        if self._thread.is_alive():
+            self._tasks.put(None)
+            self._thread.join(timeout)
+        logger.info("数据库工作线程已停止")
+
+    def submit(self, func, *args, channel=None, callback=None, error_callback=None, **kwargs) -> Future:
+        """提交请求，返回Future
+
+        callback(result)和error_callback(exception)在Tk主线程中调用；
+        指定channel时，只有该channel最新请求的结果会触发回调。
+        """
+        future = Future()
+        token = None
+        if channel is not None:
+            with self._lock:
+                token = next(self._tokens)
+                self._latest[channel] = token
+        if callback is not None or error_callback is not None:
+            with self._lock:
+                self._pending += 1
+        self._tasks.put((future, func, args, kwargs, channel, token, callback, error_callback))
+        return future
+
+    def is_current(self, channel, token) -> bool:
+        """请求是否仍是该channel的最新请求"""
+        return token is None or self._latest.get(channel) == token
+
+    def _run(self):
+        """工作线程主循环"""
+        try:
+            while True:
+                task = self._tasks.get()
+                if task is None:
+                    break
+                self._execute(*task)
+        finally:
+            if self.on_exit is not None:
+                try:
+                    self.on_exit()
+                except Exception as e:
+                    logger.error(f"数据库工作线程退出清理失败: {str(e)}")
+
+    def _execute(self, future, func, args, kwargs, channel, token, callback, error_callback):
+        """执行单个请求并把结果交给主线程"""
+        has_callback = callback is not None or error_callback is not None
+        if not self.is_current(channel, token) or not future.set_running_or_notify_cancel():
+            # 排队期间已被同一channel的新请求取代，或已被调用方取消
+            future.cancel()
+            if has_callback:
+                self._results.put((None, None, None))
+            return
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            future.set_exception(e)
+            if error_callback is None:
+                logger.error(f"后台数据库请求失败: {str(e)}")
+            if has_callback:
+                self._results.put((error_callback, e, (channel, token)))
+            return
+        future.set_result(result)
+        if has_callback:
+            self._results.put((callback, result, (channel, token)))
+
+    def _poll(self):
+        """在Tk主线程中执行已完成请求的回调"""
+        while True:
+            try:
+                callback, value, request = self._results.get_nowait()
+            except queue.Empty:
+                break
+            with self._lock:
+                self._pending -= 1
+            if callback is None:
+                continue
+            if request is not None and not self.is_current(*request):
+                # 用户已切换到其他周或日期，丢弃过期结果
+                continue
+            try:
+                callback(value)
+            except Exception as e:
+                logger.error(f"处理数据库请求结果失败: {str(e)}")
+        interval = self.busy_poll_ms if self._pending else self.idle_poll_ms
+        self._poll_id = self.root.after(interval, self._poll)
@@ -1,9 +1,12 @@
+import json
+import os
 import ttkbootstrap as tb
 from ttkbootstrap.constants import *
 from tkinter import messagebox
-from datetime import datetime, timedelta
+from datetime import datetime
 from logger_config import logger
 from course_manager import SpecialCourse  # 添加这行导入语句
+from conflicts import CourseConflictError, describe_course
 import matplotlib.pyplot as plt
 import numpy as np
 class AddCourseDialog:
@@ -48,6 +51,9 @@ class AddCourseDialog:
         
         # 星期设置
         self.create_day_section(parent)
+
+        # 时间冲突提示
+        self.create_conflict_section(parent)
         
         # 提醒设置
         self.create_reminder_section(parent)
@@ -141,17 +147,22 @@ class AddCourseDialog:
         week_input_frame = tb.Frame(week_frame)
         week_input_frame.pack(side=LEFT, padx=(10, 0))
         
-        self.start_week = tb.Spinbox(week_input_frame, from_=1, to=20, 
-                                width=5, font=("Helvetica", 10))
+        total_weeks = self.app.total_weeks
+        self.start_week = tb.Spinbox(week_input_frame, from_=1, to=total_weeks, 
+                                width=5, font=("Helvetica", 10),
+                                command=self.check_conflicts)
         self.start_week.set(1)
         self.start_week.pack(side=LEFT)
+        self.start_week.bind("<KeyRelease>", self.check_conflicts)
         
         tb.Label(week_input_frame, text=" 至 ").pack(side=LEFT)
         
-        self.end_week = tb.Spinbox(week_input_frame, from_=1, to=20, 
-                                width=5, font=("Helvetica", 10))
-        self.end_week.set(16)
+        self.end_week = tb.Spinbox(week_input_frame, from_=1, to=total_weeks, 
+                                width=5, font=("Helvetica", 10),
+                                command=self.check_conflicts)
+        self.end_week.set(min(16, total_weeks))
         self.end_week.pack(side=LEFT)
+        self.end_week.bind("<KeyRelease>", self.check_conflicts)
         
         tb.Label(week_input_frame, text=" 周").pack(side=LEFT)
     def create_type_color_section(self, parent):
@@ -260,7 +271,14 @@ class AddCourseDialog:
         
         for frame, value, text in days_config:
             tb.Radiobutton(frame, text=text, variable=self.day_var, 
-                         value=value, width=6).pack(side=LEFT, padx=2)
+                         value=value, width=6,
+                         command=self.check_conflicts).pack(side=LEFT, padx=2)
+
+    def create_conflict_section(self, parent):
+        """创建时间冲突提示部分"""
+        self.conflict_label = tb.Label(parent, text="", font=("Helvetica", 9),
+                                       wraplength=540, justify="left")
+        self.conflict_label.pack(fill=X, pady=(0, 3))
 
     def create_button_area(self, parent):
         """创建按钮区域"""
@@ -286,6 +304,83 @@ class AddCourseDialog:
             start_time, end_time = self.app.time_slots[time_index]
             preview_text = f"上课时间: {start_time} - {end_time}"
             self.time_preview.config(text=preview_text, bootstyle=SUCCESS)
+        self.check_conflicts()
+
+    def _conflict_exclude_ids(self):
+        """冲突检查时排除的课程ID"""
+        return ()
+
+    def _conflict_query(self):
+        """当前表单对应的冲突查询参数，表单未填完整时返回None"""
+        if not self.app.current_semester:
+            return None
+        time_index = self.start_time.current()
+        if time_index < 0:
+            return None
+        try:
+            start_week = int(self.start_week.get())
+            end_week = int(self.end_week.get())
+        except ValueError:
+            return None
+        if start_week > end_week:
+            return None
+        start_time, end_time = self.app.time_slots[time_index]
+        return (self.app.current_semester[0], self.day_var.get(), start_time, end_time,
+                start_week, end_week, self._conflict_exclude_ids())
+
+    def check_conflicts(self, event=None):
+        """实时检查时间冲突，查询在后台执行，完成后更新提示"""
+        query = self._conflict_query()
+        if query is None:
+            self._show_conflicts([])
+            return
+        # 连续修改表单时只显示最后一次检查的结果
+        self.app.db_worker.submit(self.app.course_manager.find_conflicts, *query,
+                                  channel="conflict_check", callback=self._show_conflicts,
+                                  error_callback=lambda e: logger.error(f"检查课程冲突失败: {str(e)}"))
+
+    def _show_conflicts(self, conflicts):
+        """更新冲突提示"""
+        if not self.dialog.winfo_exists():
+            return
+        if conflicts:
+            text = "⚠ 时间冲突: " + "、".join(describe_course(c) for c in conflicts[:3])
+            if len(conflicts) > 3:
+                text += f" 等{len(conflicts)}门课程"
+            self.conflict_label.config(text=text, bootstyle=DANGER)
+        elif self.start_time.current() >= 0:
+            self.conflict_label.config(text="✓ 该时间段没有冲突", bootstyle=SUCCESS)
+        else:
+            self.conflict_label.config(text="")
+
+    def _save_with_conflict_check(self, save, name, action):
+        """在后台执行保存，时间冲突时询问是否仍然保存
+
+        save(allow_conflicts, callback, error_callback)提交写操作，
+        完成后关闭对话框并提示，action为"添加"或"更新"。
+        """
+        if getattr(self, "_saving", False):
+            return
+        self._saving = True
+
+        def on_saved(count):
+            self._saving = False
+            self.dialog.destroy()
+            logger.info(f"课程{action}成功: {name}")
+            messagebox.showinfo("成功", f"课程{action}成功！")
+
+        def on_error(e):
+            self._saving = False
+            if isinstance(e, CourseConflictError):
+                logger.warning(f"课程时间冲突: {str(e)}")
+                if messagebox.askyesno("时间冲突", f"{str(e)}\n\n是否仍然保存？", parent=self.dialog):
+                    self._saving = True
+                    save(True, on_saved, on_error)
+                return
+            logger.error(f"{action}课程失败: {str(e)}")
+            messagebox.showerror("错误", f"{action}课程失败: {str(e)}", parent=self.dialog)
+
+        save(False, on_saved, on_error)
 
     def update_type_preview(self):
         """更新类型预览"""
@@ -330,8 +425,9 @@ class AddCourseDialog:
         try:
             start_week = int(self.start_week.get())
             end_week = int(self.end_week.get())
-            if start_week < 1 or end_week > 20:
-                errors.append("周数范围应在1-20周之间")
+            total_weeks = self.app.total_weeks
+            if start_week < 1 or end_week > total_weeks:
+                errors.append(f"周数范围应在1-{total_weeks}周之间")
             if start_week > end_week:
                 errors.append("起始周不能大于结束周")
         except ValueError:
@@ -384,17 +480,11 @@ class AddCourseDialog:
             )
 
             logger.info(f"准备保存课程: {course_data[0]}")
-            # 保存到数据库
-            self.app.course_manager.add_course(course_data)
-            
-            # 更新界面
-            self.app.load_courses()
-            self.app.update_display()
-            
-            # 关闭对话框并提示成功
-            self.dialog.destroy()
-            logger.info(f"课程保存成功: {course_data[0]}")
-            messagebox.showinfo("成功", "课程添加成功！")
+            # 在后台保存到数据库，完成后刷新界面并关闭对话框
+            self._save_with_conflict_check(
+                lambda allow_conflicts, callback, error_callback: self.app.add_courses(
+                    [course_data], allow_conflicts, callback, error_callback),
+                course_data[0], "添加")
 
         except Exception as e:
             logger.error(f"添加课程失败: {str(e)}")
@@ -501,22 +591,33 @@ class AddSemesterDialog:
             if start_date >= end_date:
                 raise ValueError("结束日期必须晚于开始日期")
                     
-            self.app.course_manager.add_semester(name, start, end)
-            self.app.semesters = self.app.course_manager.get_semesters()
-            # 更新当前学期为新建的学期
-            new_semester = self.app.semesters[-1]
-            self.app.course_manager.set_current_semester(new_semester[0])
-            self.app.current_semester = new_semester
-            
-            # 重新加载课程并更新显示
-            self.app.load_courses()
-            self.app.update_display()
-            
-            self.dialog.destroy()
-            messagebox.showinfo("成功", "学期创建成功！")
+            manager = self.app.course_manager
+
+            def save():
+                """在数据库工作线程中创建学期，并设为当前学期"""
+                manager.add_semester(name, start, end)
+                semesters = manager.get_semesters()
+                manager.set_current_semester(semesters[-1][0])
+                return semesters
+
+            self.app.db_worker.submit(save, callback=self._on_saved,
+                                      error_callback=lambda e: messagebox.showerror("错误", f"创建学期失败: {str(e)}"))
             
         except ValueError as ve:
             messagebox.showerror("错误", str(ve))
+
+    def _on_saved(self, semesters):
+        """学期创建完成后更新当前学期并刷新界面"""
+        self.app.semesters = semesters
+        # 更新当前学期为新建的学期
+        self.app.current_semester = semesters[-1]
+        self.app.refresh_week_range()
+        
+        # 重新加载课程并更新显示
+        self.app.load_courses(self.app.update_display)
+        
+        self.dialog.destroy()
+        messagebox.showinfo("成功", "学期创建成功！")
 class EditCourseDialog(AddCourseDialog):
     def __init__(self, parent, app, course):
         self.course = course
@@ -524,26 +625,30 @@ class EditCourseDialog(AddCourseDialog):
         self.dialog.title("编辑课程")
         self.load_course_data()
 
+    def _conflict_exclude_ids(self):
+        """编辑时排除课程自身"""
+        return (self.course.id,)
+
     def load_course_data(self):
         """加载课程数据到表单"""
         try:
             # 基本信息
-            self.name_entry.insert(0, self.course[1])
-            self.teacher_entry.insert(0, self.course[2])
-            self.location_entry.insert(0, self.course[3])
+            self.name_entry.insert(0, self.course.name)
+            self.teacher_entry.insert(0, self.course.teacher)
+            self.location_entry.insert(0, self.course.location)
             
             # 时间设置
-            time_str = f"{self.course[7]}-{self.course[8]}"
+            time_str = self.course.time_range
             self.start_time.set(time_str)
-            self.start_week.set(self.course[4])
-            self.end_week.set(self.course[5])
+            self.start_week.set(self.course.start_week)
+            self.end_week.set(self.course.end_week)
             
             # 星期设置
-            self.day_var.set(self.course[6])
+            self.day_var.set(self.course.day_of_week)
             
             # 课程类型和颜色
-            self.type_var.set("调休" if self.course[11] else "正常")
-            self.color_var.set(self.course[9])
+            self.type_var.set("调休" if self.course.is_special else "正常")
+            self.color_var.set(self.course.color)
             
             # 更新预览
             self.update_time_preview()
@@ -597,17 +702,11 @@ class EditCourseDialog(AddCourseDialog):
             )
 
             logger.info(f"准备更新课程: {course_data[0]}")
-            # 更新数据库
-            self.app.course_manager.update_course(self.course[0], course_data)
-            
-            # 更新界面
-            self.app.load_courses()
-            self.app.update_display()
-            
-            # 关闭对话框并提示成功
-            self.dialog.destroy()
-            logger.info(f"课程更新成功: {course_data[0]}")
-            messagebox.showinfo("成功", "课程更新成功！")
+            # 在后台更新数据库，完成后刷新界面并关闭对话框
+            self._save_with_conflict_check(
+                lambda allow_conflicts, callback, error_callback: self.app.update_courses(
+                    [(self.course.id, course_data)], allow_conflicts, callback, error_callback),
+                course_data[0], "更新")
 
         except Exception as e:
             logger.error(f"更新课程失败: {str(e)}")
@@ -734,36 +833,41 @@ class EditSemesterDialog:
             if start_date >= end_date:
                 raise ValueError("结束日期必须晚于开始日期")
                     
-            # 更新数据库
-            self.app.course_manager.update_semester(
-                self.current_semester[0],  # semester_id
-                name,  # name
-                start,  # start_date
-                end     # end_date
-            )
-            
-            # 更新本地数据
-            self.app.semesters = self.app.course_manager.get_semesters()
-            if self.current_semester[0] == self.app.current_semester[0]:
-                self.app.current_semester = (
-                    self.current_semester[0],
-                    name,
-                    start,
-                    end,
-                    self.current_semester[4]
-                )
-            
-            # 重新加载课程并更新显示
-            self.app.load_courses()
-            self.app.update_display()
-            
-            self.dialog.destroy()
-            messagebox.showinfo("成功", "学期修改成功！")
+            manager = self.app.course_manager
+            semester_id = self.current_semester[0]
+
+            def save():
+                """在数据库工作线程中更新学期"""
+                manager.update_semester(semester_id, name, start, end)
+                return manager.get_semesters()
+
+            self.app.db_worker.submit(save, callback=lambda semesters: self._on_saved(semesters, name, start, end),
+                                      error_callback=lambda e: messagebox.showerror("错误", f"修改学期失败: {str(e)}"))
             
         except ValueError as ve:
             messagebox.showerror("错误", str(ve))
         except Exception as e:
             messagebox.showerror("错误", f"修改学期失败: {str(e)}")
+
+    def _on_saved(self, semesters, name, start, end):
+        """学期修改完成后更新本地数据并刷新界面"""
+        self.app.semesters = semesters
+        if self.current_semester[0] == self.app.current_semester[0]:
+            self.app.current_semester = (
+                self.current_semester[0],
+                name,
+                start,
+                end,
+                self.current_semester[4]
+            )
+            # 起止日期可能改变学期周数
+            self.app.refresh_week_range()
+        
+        # 重新加载课程并更新显示
+        self.app.load_courses(self.app.update_display)
+        
+        self.dialog.destroy()
+        messagebox.showinfo("成功", "学期修改成功！")
 class ShareDialog:
     def __init__(self, parent, app):
         self.parent = parent
@@ -774,7 +878,7 @@ class ShareDialog:
         """创建分享对话框"""
         self.dialog = tb.Toplevel(self.parent)
         self.dialog.title("分享课程")
-        self.dialog.geometry("400x480")
+        self.dialog.geometry("400x510")
         self.dialog.transient(self.parent)
         self.dialog.grab_set()
 
@@ -803,7 +907,8 @@ class ShareDialog:
         self.export_format = tb.StringVar(value="image")
         formats = [
             ("图片 (.png)", "image"),
-            ("PDF文件 (.pdf)", "pdf")
+            ("PDF文件 (.pdf)", "pdf"),
+            ("日历文件 (.ics)", "ics")
         ]
         
         for text, value in formats:
@@ -833,47 +938,49 @@ class ShareDialog:
             export_format = self.export_format.get()
             filename = self.filename_entry.get().strip()
             
-            # 获取当前显示的课程
+            # 获取当前显示的课程的查询
+            manager = self.app.course_manager
+            semester_id = self.app.current_semester[0]
             if share_type == "week":
-                courses = self.app.course_manager.get_courses_by_week(self.app.current_week)
+                query = (manager.get_courses_by_week, self.app.current_week, semester_id)
                 target_date = None
             elif share_type == "month":  # 添加本月课程处理
                 current_date = self.app.month_view.current_date
-                year, month = current_date.year, current_date.month
-                # 获取月份的第一天和最后一天
-                first_day = datetime(year, month, 1)
-                last_day = datetime(year, month + 1, 1) - timedelta(days=1) if month < 12 else datetime(year, 12, 31)
-                # 计算月份的第一天和最后一天对应的周数
-                start_week = ((first_day - datetime.strptime(self.app.current_semester[2], "%Y-%m-%d")).days // 7) + 1
-                end_week = ((last_day - datetime.strptime(self.app.current_semester[2], "%Y-%m-%d")).days // 7) + 1
-                # 获取该月份的所有课程
-                courses = []
-                for week in range(start_week, end_week + 1):
-                    week_courses = self.app.course_manager.get_courses_by_week(week)
-                    courses.extend([c for c in week_courses if str(c[12]) == str(self.app.current_semester[0])])
+                # 获取该月份的所有课程，跨多周的课程只计一次，日历导出时UID不会重复
+                query = (manager.get_courses_by_month, current_date.year, current_date.month, semester_id)
                 target_date = current_date
             else:
                 current_date = datetime.now()
                 if self.app.current_view == "month":
                     current_date = self.app.month_view.current_date
                 day = current_date.weekday() + 1
-                week = ((current_date - datetime.strptime(self.app.current_semester[2], "%Y-%m-%d")).days // 7) + 1
-                courses = self.app.course_manager.get_courses_by_day(day, week)
+                week = self.app.calendar.week_of(current_date)
+                query = (manager.get_courses_by_day, day, week, semester_id)
                 target_date = current_date
-            
-            if not courses:
-                messagebox.showwarning("提示", "没有可分享的课程")
-                return
-                
-            # 执行导出
-            if self.app.course_manager.export_courses(courses, export_format, filename, share_type, target_date):
-                messagebox.showinfo("成功", "课程分享成功！")
-                self.dialog.destroy()
-            else:
-                messagebox.showerror("错误", "课程分享失败")
+
+            # 课程在后台查询，完成后提交导出
+            self.app.db_worker.submit(
+                *query, channel="share",
+                callback=lambda courses: self._share(courses, export_format, filename, share_type, target_date),
+                error_callback=self._share_failed)
         except Exception as e:
-            logger.error(f"分享课程失败: {str(e)}")
-            messagebox.showerror("错误", f"分享失败: {str(e)}")
+            self._share_failed(e)
+
+    def _share(self, courses, export_format, filename, share_type, target_date):
+        """用查询到的课程提交分享导出"""
+        if not courses:
+            messagebox.showwarning("提示", "没有可分享的课程")
+            return
+            
+        # 在后台导出，完成后弹出通知
+        self.app.submit_export("分享课程", courses, export_format, filename, share_type, target_date)
+        if self.dialog.winfo_exists():
+            self.dialog.destroy()
+
+    def _share_failed(self, e):
+        """分享失败提示"""
+        logger.error(f"分享课程失败: {str(e)}")
+        messagebox.showerror("错误", f"分享失败: {str(e)}")
 class StudyReportDialog:
     def __init__(self, parent, app):
         self.parent = parent
@@ -899,8 +1006,23 @@ class StudyReportDialog:
         self.generate_report(main_container)
 
     def generate_report(self, parent):
-        """生成报告内容"""
-        stats = self.app.course_manager.get_study_statistics(self.app.current_semester[0])
+        """生成报告内容，统计数据在后台查询，完成前显示加载提示"""
+        loading = tb.Label(parent, text="正在生成学习报告...", font=("Helvetica", 14),
+                           bootstyle=SECONDARY)
+        loading.pack(expand=True)
+
+        def on_loaded(stats):
+            if not self.dialog.winfo_exists():
+                return
+            loading.destroy()
+            self._build_report(parent, stats)
+
+        self.app.db_worker.submit(self.app.course_manager.get_study_statistics, self.app.current_semester[0],
+                                  channel="study_report", callback=on_loaded)
+
+    def _build_report(self, parent, stats):
+        """用查询完成的统计数据生成报告内容"""
+        self.stats = stats
         
         # 创建顶部标题区域
         self.create_header_card(parent, stats)
@@ -950,11 +1072,11 @@ class StudyReportDialog:
                            "小时", INFO, "⏰")
         
         # 平均每周卡片
-        self.create_stat_card(row1, "平均每周", f"{stats['total_hours']/20:.1f}", 
+        self.create_stat_card(row1, "平均每周", f"{stats['total_hours']/stats['total_weeks']:.1f}", 
                            "小时", WARNING, "📅")
         
         # 平均每天卡片
-        self.create_stat_card(row1, "平均每天", f"{stats['total_hours']/140:.1f}", 
+        self.create_stat_card(row1, "平均每天", f"{stats['total_hours']/(stats['total_weeks'] * 7):.1f}", 
                            "小时", DANGER, "📆")
         
         # 第二行详细统计
@@ -1198,8 +1320,8 @@ class StudyReportDialog:
         """格式化时间利用情况"""
         lines = []
         lines.append(f"• 总学习时间: {stats['total_hours']:.1f}小时")
-        lines.append(f"• 平均每周: {stats['total_hours']/20:.1f}小时")
-        lines.append(f"• 平均每天: {stats['total_hours']/140:.1f}小时")
+        lines.append(f"• 平均每周: {stats['total_hours']/stats['total_weeks']:.1f}小时")
+        lines.append(f"• 平均每天: {stats['total_hours']/(stats['total_weeks'] * 7):.1f}小时")
         return "\n".join(lines)
 
     def _generate_suggestions(self, stats):
@@ -1207,7 +1329,7 @@ class StudyReportDialog:
         suggestions = []
         
         # 基于学习时长的建议
-        weekly_avg = stats['total_hours']/20
+        weekly_avg = stats['total_hours']/stats['total_weeks']
         if weekly_avg < 15:
             suggestions.append("• 建议增加学习时间，当前每周学习时间偏低")
         elif weekly_avg > 25:
@@ -1306,31 +1428,24 @@ class StudyReportDialog:
 
     def _create_heatmap(self, ax, stats):
         """创建学习时间分布热力图"""
-        import numpy as np
-        
-        # 准备数据
+        # 准备数据：课程密度矩阵 (星期 × 周)
         days = ['周一', '周二', '周三', '周四', '周五', '周六', '周日']
-        weeks = range(1, 21)
-        data = np.zeros((7, 20))
-        
-        for week_day, count in stats['course_density'].items():
-            week, day = map(int, week_day.split('-'))
-            if week <= 20:
-                data[day-1, week-1] = count
+        data = np.array(stats['course_density'], dtype=float).reshape(7, -1)
+        total_weeks = data.shape[1]
         
         # 绘制热力图
         im = ax.imshow(data, cmap='YlOrRd', aspect='auto', interpolation='nearest')
         
         # 设置样式
-        ax.set_xticks(range(0, 20, 2))
-        ax.set_xticklabels([f'第{w}周' for w in range(1, 21, 2)], rotation=45, fontsize=9)
+        ax.set_xticks(range(0, total_weeks, 2))
+        ax.set_xticklabels([f'第{w}周' for w in range(1, total_weeks + 1, 2)], rotation=45, fontsize=9)
         ax.set_yticks(range(7))
         ax.set_yticklabels(days, fontsize=9)
         ax.set_title('课程密度热力图', pad=20, fontweight='bold', fontsize=12)
         ax.grid(False)
         
         # 添加颜色条
-        cbar = plt.colorbar(im, ax=ax, shrink=0.8, pad=0.02)
+        cbar = ax.figure.colorbar(im, ax=ax, shrink=0.8, pad=0.02)
         cbar.set_label('课程数量', rotation=270, labelpad=15, fontsize=10)
 
     def _create_week_trend(self, ax, stats):
@@ -1374,28 +1489,75 @@ class StudyReportDialog:
                 bootstyle=DANGER).pack(expand=True)
 
     def export_pdf(self):
-        """导出PDF报告"""
-        try:
-            # 实现PDF导出逻辑
-            messagebox.showinfo("成功", "PDF报告导出成功！")
-        except Exception as e:
-            logger.error(f"PDF导出失败: {str(e)}")
-            messagebox.showerror("错误", f"PDF导出失败: {str(e)}")
+        """在后台导出PDF报告，每张图表一页"""
+        self._submit_report_job("导出学习报告PDF", "pdf", self._write_report_pdf)
 
     def export_image(self):
-        """导出图片报告"""
-        try:
-            # 实现图片导出逻辑
-            messagebox.showinfo("成功", "图片报告导出成功！")
-        except Exception as e:
-            logger.error(f"图片导出失败: {str(e)}")
-            messagebox.showerror("错误", f"图片导出失败: {str(e)}")
+        """在后台导出概览图表为图片"""
+        self._submit_report_job("导出学习报告图片", "png", self._write_report_image)
 
     def export_data(self):
-        """导出数据"""
-        try:
-            # 实现数据导出逻辑
-            messagebox.showinfo("成功", "数据导出成功！")
-        except Exception as e:
-            logger.error(f"数据导出失败: {str(e)}")
-            messagebox.showerror("错误", f"数据导出失败: {str(e)}")
\ No newline at end of file
+        """在后台导出统计数据为JSON"""
+        self._submit_report_job("导出学习报告数据", "json", self._write_report_data)
+
+    def _submit_report_job(self, title, extension, write):
+        """提交报告导出任务，取消时删除未写完的文件"""
+        from export_jobs import JobCancelled
+        from ui_components import notify_job_result
+
+        if not self.stats:
+            messagebox.showwarning("提示", "没有可导出的统计数据", parent=self.dialog)
+            return
+        path = os.path.abspath(f"study_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}")
+
+        def run(job, stats):
+            try:
+                write(job, path, stats)
+            except JobCancelled:
+                if os.path.exists(path):
+                    os.remove(path)
+                raise
+            return path
+
+        self.app.export_jobs.submit(title, run, self.stats, on_done=notify_job_result)
+
+    def _build_report_figures(self, stats):
+        """不经过pyplot创建报告图表，可在后台线程中调用"""
+        from matplotlib.figure import Figure
+
+        overview = Figure(figsize=(10, 8), facecolor='white')
+        for index, create in enumerate([self._create_pie_chart, self._create_weekly_chart,
+                                        self._create_daily_chart, self._create_pattern_chart], 1):
+            create(overview.add_subplot(2, 2, index), stats)
+        overview.tight_layout(pad=2.0)
+
+        analysis = Figure(figsize=(12, 6), facecolor='white')
+        self._create_heatmap(analysis.add_subplot(1, 1, 1), stats)
+        analysis.tight_layout()
+
+        trend = Figure(figsize=(12, 6), facecolor='white')
+        self._create_week_trend(trend.add_subplot(1, 2, 1), stats)
+        self._create_month_trend(trend.add_subplot(1, 2, 2), stats)
+        trend.tight_layout()
+        return [overview, analysis, trend]
+
+    def _write_report_pdf(self, job, path, stats):
+        """写出PDF报告"""
+        from matplotlib.backends.backend_pdf import PdfPages
+
+        figures = self._build_report_figures(stats)
+        with PdfPages(path) as pdf:
+            for figure in job.track(figures, every=1):
+                pdf.savefig(figure)
+
+    def _write_report_image(self, job, path, stats):
+        """写出概览图表图片"""
+        figure = self._build_report_figures(stats)[0]
+        job.report(1, 2, "正在写出文件")
+        figure.savefig(path, dpi=150)
+
+    def _write_report_data(self, job, path, stats):
+        """写出统计数据JSON"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(stats, f, ensure_ascii=False, indent=2,
+                      default=lambda value: value.tolist() if hasattr(value, "tolist") else str(value))
\ No newline at end of file
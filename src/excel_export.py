@@ -0,0 +1,116 @@
+import bisect
+import re
+from typing import Callable, Iterable
+from models import Course
+from stream_export import CSV_HEADERS, course_to_row
+
+# 分表方式
+GROUP_BY_SEMESTER = "semester"
+GROUP_BY_WEEK = "week"
+GROUP_OPTIONS = (GROUP_BY_SEMESTER, GROUP_BY_WEEK)
+
+# 各列宽度（字符数），与CSV_HEADERS一一对应
+COLUMN_WIDTHS = [20, 12, 16, 10, 10, 8, 14, 10, 8]
+
+HEADER_COLOR = "4472C4"
+
+# Excel工作表名最长31个字符，且不能包含以下字符
+SHEET_NAME_LIMIT = 31
+INVALID_SHEET_CHARS = re.compile(r'[\[\]:*?/\\]')
+
+
+def sheet_name(title: str, used: set) -> str:
+    """生成合法且不重复的工作表名"""
+    base = INVALID_SHEET_CHARS.sub("_", str(title)).strip("'") or "Sheet"
+    name = base[:SHEET_NAME_LIMIT]
+    index = 2
+    while name.lower() in used:
+        suffix = f"({index})"
+        name = base[:SHEET_NAME_LIMIT - len(suffix)] + suffix
+        index += 1
+    used.add(name.lower())
+    return name
+
+
+class ExcelWriter:
+    """流式写出Excel工作簿
+
+    使用openpyxl的只写模式，每行写入后即刷到临时文件，内存占用与课程数无关；
+    按学期或按周分表，工作表在遇到第一门相应课程时创建，表头带样式并冻结首行。
+    按周分表时一门课程会写入其起止周内的每一张表；指定weeks（如range）时只写这些周，
+    与导出范围一致。
+    """
+
+    def __init__(self, group_by: str = GROUP_BY_SEMESTER, sheet_title: Callable = None, weeks=None):
+        from openpyxl import Workbook
+
+        if group_by not in GROUP_OPTIONS:
+            raise ValueError(f"不支持的分表方式: {group_by}")
+        self.group_by = group_by
+        self.sheet_title = sheet_title or self._default_title
+        self.weeks = weeks
+        self.workbook = Workbook(write_only=True)
+        self.count = 0
+        self._sheets = {}
+        self._used_names = set()
+
+    def _default_title(self, key) -> str:
+        """默认工作表标题"""
+        if self.group_by == GROUP_BY_WEEK:
+            return f"第{key}周"
+        return f"学期{key}"
+
+    def _sheet(self, key):
+        """获取分组对应的工作表，不存在时创建并写入表头"""
+        sheet = self._sheets.get(key)
+        if sheet is None:
+            from openpyxl.cell import WriteOnlyCell
+            from openpyxl.styles import Alignment, Font, PatternFill
+            from openpyxl.utils import get_column_letter
+
+            title = "课程" if key is None else self.sheet_title(key)
+            # 按分组顺序插入，课程不按学期/周排序时工作表顺序也不乱
+            index = bisect.bisect(sorted(k for k in self._sheets if k is not None), key) if key is not None else 0
+            sheet = self.workbook.create_sheet(sheet_name(title, self._used_names), index)
+            # 只写模式下列宽和冻结窗格必须在写入第一行之前设置
+            for index, width in enumerate(COLUMN_WIDTHS, 1):
+                sheet.column_dimensions[get_column_letter(index)].width = width
+            sheet.freeze_panes = "A2"
+            font = Font(bold=True, color="FFFFFF")
+            fill = PatternFill("solid", fgColor=HEADER_COLOR)
+            alignment = Alignment(horizontal="center", vertical="center")
+            header = []
+            for title in CSV_HEADERS:
+                cell = WriteOnlyCell(sheet, value=title)
+                cell.font, cell.fill, cell.alignment = font, fill, alignment
+                header.append(cell)
+            sheet.append(header)
+            self._sheets[key] = sheet
+        return sheet
+
+    def write_course(self, course: Course):
+        """写出一门课程"""
+        row = course_to_row(course)
+        if self.group_by == GROUP_BY_WEEK:
+            for week in range(course.start_week, course.end_week + 1):
+                if self.weeks is None or week in self.weeks:
+                    self._sheet(week).append(row)
+        else:
+            self._sheet(course.semester_id).append(row)
+        self.count += 1
+
+    def save(self, filename: str):
+        """保存工作簿，没有课程时只保留一张带表头的空表"""
+        if not self._sheets:
+            self._sheet(None)
+        self.workbook.save(filename)
+
+
+def write_workbook(courses: Iterable[Course], filename: str, group_by: str = GROUP_BY_SEMESTER,
+                   sheet_title: Callable = None, weeks=None) -> int:
+    """把课程流式写入xlsx文件，返回写出的课程数"""
+    writer = ExcelWriter(group_by, sheet_title, weeks)
+    for course in courses:
+        writer.write_course(course)
+    writer.save(filename)
+    return writer.count
@@ -0,0 +1,253 @@
+import itertools
+import os
+import queue
+import threading
+import time
+from logger_config import logger
+
+# 导出格式 -> 文件扩展名
+EXPORT_EXTENSIONS = {"excel": "xlsx", "csv": "csv", "json": "json", "ndjson": "ndjson",
+                     "pdf": "pdf", "image": "png", "ics": "ics"}
+
+# 任务状态
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+class JobCancelled(BaseException):
+    """导出任务已被取消
+
+    继承BaseException，不会被导出函数里的except Exception当作导出失败吞掉。
+    """
+
+
+class ExportJob:
+    """一个导出任务
+
+    进度和状态由工作线程写入，界面线程只读取；取消只设置标志，
+    工作线程在下一次报告进度时停止。
+    """
+
+    def __init__(self, job_id: int, title: str, func, args, kwargs, on_done=None):
+        self.id = job_id
+        self.title = title
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.on_done = on_done
+        self.status = QUEUED
+        self.progress = 0.0
+        self.message = "等待中"
+        self.result = None
+        self.error = None
+        self.started = None
+        self.finished = None
+        self._cancel = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        """是否已请求取消"""
+        return self._cancel.is_set()
+
+    @property
+    def active(self) -> bool:
+        """任务是否仍在排队或执行"""
+        return self.status in (QUEUED, RUNNING)
+
+    def cancel(self):
+        """请求取消任务"""
+        if self.active:
+            self._cancel.set()
+            self.message = "正在取消"
+
+    def report(self, done: int, total: int = None, message: str = None):
+        """报告进度，任务已取消时抛出JobCancelled"""
+        if self.cancelled:
+            raise JobCancelled(f"{self.title}已取消")
+        if total:
+            self.progress = min(done / total, 1.0)
+        if message is not None:
+            self.message = message
+
+    def track(self, items, total: int = None, every: int = 50):
+        """逐个产出items，并按处理数量报告进度"""
+        if total is None and hasattr(items, "__len__"):
+            total = len(items)
+        count = 0
+        for item in items:
+            if count % every == 0:
+                self.report(count, total, f"已处理{count}项")
+            yield item
+            count += 1
+        self.report(count, total, "正在写出文件")
+
+    @property
+    def seconds(self) -> float:
+        """已用时间（秒）"""
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.perf_counter()) - self.started
+
+
+class ExportJobManager:
+    """后台导出任务队列
+
+    任务由若干工作线程并发执行，界面线程不会因导出大文件卡住。
+    进度通过root.after轮询交给监听器，任务结束时on_done(job)在Tk主线程中调用。
+    工作线程按需启动，退出前调用on_exit清理该线程的数据库连接。
+    """
+
+    def __init__(self, root=None, max_workers: int = 3, on_exit=None, poll_ms: int = 100):
+        self.root = root
+        self.max_workers = max_workers
+        self.on_exit = on_exit
+        self.poll_ms = poll_ms
+        self._tasks = queue.Queue()
+        self._finished = queue.Queue()
+        self._jobs = {}
+        self._ids = itertools.count(1)
+        self._threads = []
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._poll_id = None
+
+    def submit(self, title: str, func, *args, on_done=None, **kwargs) -> ExportJob:
+        """提交任务，func(job, *args, **kwargs)在工作线程中执行，返回值保存在job.result"""
+        job = ExportJob(next(self._ids), title, func, args, kwargs, on_done)
+        with self._lock:
+            self._jobs[job.id] = job
+            active = sum(1 for j in self._jobs.values() if j.active)
+            if active > len(self._threads) and len(self._threads) < self.max_workers:
+                thread = threading.Thread(target=self._run, name=f"ExportJob-{len(self._threads) + 1}",
+                                          daemon=True)
+                self._threads.append(thread)
+                thread.start()
+        self._tasks.put(job)
+        logger.info(f"导出任务已提交: {title}")
+        self._schedule_poll()
+        return job
+
+    def jobs(self) -> list:
+        """所有尚未通知界面结束的任务，按提交顺序排列"""
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id: int):
+        """取消指定任务"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            job.cancel()
+
+    def cancel_all(self):
+        """取消全部未结束的任务"""
+        for job in self.jobs():
+            job.cancel()
+
+    def add_listener(self, listener):
+        """注册监听器，listener(jobs)在Tk主线程中随进度调用"""
+        self._listeners.append(listener)
+
+    def shutdown(self, timeout: float = 5.0):
+        """取消未完成的任务并停止工作线程"""
+        self.cancel_all()
+        if self._poll_id is not None:
+            try:
+                self.root.after_cancel(self._poll_id)
+            except Exception:
+                pass
+            self._poll_id = None
+        for _ in self._threads:
+            self._tasks.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _run(self):
+        """工作线程主循环"""
+        try:
+            while True:
+                job = self._tasks.get()
+                if job is None:
+                    break
+                self._execute(job)
+        finally:
+            if self.on_exit is not None:
+                try:
+                    self.on_exit()
+                except Exception as e:
+                    logger.error(f"导出线程退出清理失败: {str(e)}")
+
+    def _execute(self, job: ExportJob):
+        """执行单个任务"""
+        job.started = time.perf_counter()
+        try:
+            if job.cancelled:
+                raise JobCancelled(f"{job.title}已取消")
+            job.status = RUNNING
+            job.message = "正在导出"
+            job.result = job.func(job, *job.args, **job.kwargs)
+            if job.cancelled:
+                raise JobCancelled(f"{job.title}已取消")
+            job.progress = 1.0
+            job.message = "已完成"
+            job.status = DONE
+        except JobCancelled:
+            job.message = "已取消"
+            job.status = CANCELLED
+            logger.info(f"导出任务已取消: {job.title}")
+        except Exception as e:
+            job.error = e
+            job.message = str(e)
+            job.status = FAILED
+            logger.error(f"导出任务失败: {job.title}: {str(e)}")
+        job.finished = time.perf_counter()
+        self._finished.put(job)
+
+    def _schedule_poll(self):
+        """有任务时启动进度轮询"""
+        if self.root is not None and self._poll_id is None:
+            self._poll_id = self.root.after(self.poll_ms, self._poll)
+
+    def _poll(self):
+        """在Tk主线程中刷新进度并处理已结束的任务"""
+        self._poll_id = None
+        while True:
+            try:
+                job = self._finished.get_nowait()
+            except queue.Empty:
+                break
+            with self._lock:
+                self._jobs.pop(job.id, None)
+            if job.on_done is not None:
+                try:
+                    job.on_done(job)
+                except Exception as e:
+                    logger.error(f"处理导出任务结果失败: {str(e)}")
+        jobs = self.jobs()
+        for listener in self._listeners:
+            try:
+                listener(jobs)
+            except Exception as e:
+                logger.error(f"刷新导出进度失败: {str(e)}")
+        if jobs:
+            self._schedule_poll()
+
+
+def run_export(job: ExportJob, manager, courses, format: str, filename: str = None, view_type: str = "week",
+               target_date=None, **options) -> str:
+    """在导出任务中导出课程，返回输出文件路径；取消时删除未写完的文件"""
+    filename = filename or manager.default_export_name(view_type, target_date)
+    path = f"{filename}.{EXPORT_EXTENSIONS.get(format, format)}"
+    try:
+        ok = manager.export_courses(job.track(courses), format, filename, view_type, target_date, **options)
+        job.report(1, 1)
+    except JobCancelled:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    if not ok:
+        raise RuntimeError("导出失败，详情见app.log")
+    return os.path.abspath(path)
@@ -0,0 +1,138 @@
+import os
+import threading
+from logger_config import logger
+
+# 项目自带字体目录
+PROJECT_FONT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'fonts')
+
+# 常见中文字体文件名，按优先级排列
+CJK_FONT_FILES = [
+    "simsun.ttc", "msyh.ttc", "msyh.ttf", "simhei.ttf",           # Windows
+    "NotoSansCJK-Regular.ttc", "NotoSerifCJK-Regular.ttc",        # Linux (Noto)
+    "wqy-microhei.ttc", "wqy-zenhei.ttc",                         # Linux (文泉驿)
+    "DroidSansFallbackFull.ttf", "DroidSansFallback.ttf",
+    "PingFang.ttc", "STHeiti Light.ttc", "Hiragino Sans GB.ttc",  # macOS
+]
+
+# 默认搜索目录，目录中按CJK_FONT_FILES查找
+DEFAULT_FONT_DIRS = [
+    PROJECT_FONT_DIR,
+    "C:/Windows/Fonts",
+    "/usr/share/fonts/opentype/noto",
+    "/usr/share/fonts/noto-cjk",
+    "/usr/share/fonts/google-noto-cjk",
+    "/usr/share/fonts/truetype/wqy",
+    "/usr/share/fonts/wqy-microhei",
+    "/usr/share/fonts/wqy-zenhei",
+    "/usr/share/fonts/truetype/droid",
+    "/System/Library/Fonts",
+    "/Library/Fonts",
+    os.path.expanduser("~/.fonts"),
+    os.path.expanduser("~/.local/share/fonts"),
+]
+
+# 环境变量，可指定额外的字体文件或目录（用系统路径分隔符分隔），优先于默认目录
+FONT_PATH_ENV = "COURSE_SCHEDULE_FONTS"
+
+PDF_FONT_NAME = "CJKFont"
+
+
+class ExportResources:
+    """导出用的字体和样式资源
+
+    每个进程只查找一次中文字体，解析后的PIL字体按字号缓存，
+    ReportLab字体只注册一次，样式表也只创建一次，重复导出时直接复用。
+    """
+
+    def __init__(self, search_paths=None):
+        self._lock = threading.RLock()
+        self.configure(search_paths)
+
+    def configure(self, search_paths=None):
+        """设置字体搜索路径（文件或目录），并清空已缓存的资源"""
+        with self._lock:
+            env_paths = [p for p in os.environ.get(FONT_PATH_ENV, "").split(os.pathsep) if p]
+            self.search_paths = list(search_paths or []) + env_paths + DEFAULT_FONT_DIRS
+            self._font_paths = None
+            self._pil_fonts = {}
+            self._pdf_font = None
+            self._pdf_styles = None
+
+    def font_paths(self) -> list:
+        """按优先级列出找到的中文字体文件，只查找一次"""
+        with self._lock:
+            if self._font_paths is None:
+                found = []
+                for path in self.search_paths:
+                    if os.path.isfile(path):
+                        found.append(path)
+                    elif os.path.isdir(path):
+                        found.extend(os.path.join(path, name) for name in CJK_FONT_FILES
+                                     if os.path.isfile(os.path.join(path, name)))
+                self._font_paths = list(dict.fromkeys(found))
+                if self._font_paths:
+                    logger.info(f"找到中文字体: {self._font_paths[0]}")
+                else:
+                    logger.warning("未找到中文字体，导出将使用默认字体")
+            return self._font_paths
+
+    def pil_font(self, size: int):
+        """获取指定字号的PIL字体，找不到中文字体时使用默认字体"""
+        with self._lock:
+            font = self._pil_fonts.get(size)
+            if font is None:
+                from PIL import ImageFont
+
+                for path in self.font_paths():
+                    try:
+                        font = ImageFont.truetype(path, size)
+                        break
+                    except OSError as e:
+                        logger.warning(f"加载字体{path}失败: {str(e)}")
+                if font is None:
+                    font = ImageFont.load_default()
+                self._pil_fonts[size] = font
+            return font
+
+    def pdf_font(self) -> str:
+        """注册ReportLab中文字体并返回字体名，找不到时返回Helvetica"""
+        with self._lock:
+            if self._pdf_font is None:
+                from reportlab.pdfbase import pdfmetrics
+                from reportlab.pdfbase.ttfonts import TTFont
+
+                self._pdf_font = 'Helvetica'
+                for path in self.font_paths():
+                    # ReportLab只支持TrueType轮廓的字体
+                    if not path.lower().endswith((".ttf", ".ttc")):
+                        continue
+                    try:
+                        pdfmetrics.registerFont(TTFont(PDF_FONT_NAME, path))
+                        self._pdf_font = PDF_FONT_NAME
+                        break
+                    except Exception as e:
+                        logger.warning(f"注册PDF字体{path}失败: {str(e)}")
+            return self._pdf_font
+
+    def pdf_styles(self):
+        """获取带中文字体样式的ReportLab样式表"""
+        with self._lock:
+            if self._pdf_styles is None:
+                from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+
+                font_name = self.pdf_font()
+                styles = getSampleStyleSheet()
+                styles.add(ParagraphStyle(name='ChineseTitle',
+                                          parent=styles['Title'],
+                                          fontName=font_name,
+                                          fontSize=16))
+                styles.add(ParagraphStyle(name='ChineseNormal',
+                                          parent=styles['Normal'],
+                                          fontName=font_name,
+                                          fontSize=10))
+                self._pdf_styles = styles
+            return self._pdf_styles
+
+
+# 进程内共享的资源
+resources = ExportResources()
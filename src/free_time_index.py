@@ -0,0 +1,107 @@
+from collections import Counter
+from models import Course, TIME_SLOTS, time_to_minutes, duration_hours
+
+# 固定时间段对应的(开始分钟, 结束分钟)
+SLOT_MINUTES = [(time_to_minutes(start), time_to_minutes(end)) for start, end in TIME_SLOTS]
+FULL_MASK = (1 << len(TIME_SLOTS)) - 1
+WEEK_MASK = (1 << 7) - 1
+
+
+def _build_tables():
+    """按占用掩码预先计算空闲时间段和空闲时长（0.1小时）"""
+    free_slots, free_tenths = [], []
+    for mask in range(FULL_MASK + 1):
+        slots = [index for index in range(len(TIME_SLOTS)) if not mask >> index & 1]
+        free_slots.append([TIME_SLOTS[index] for index in slots])
+        free_tenths.append(sum(int(round(duration_hours(*TIME_SLOTS[i]) * 10)) for i in slots))
+    return free_slots, free_tenths
+
+
+# 掩码 -> 空闲时间段列表 / 空闲时长
+FREE_SLOTS, FREE_TENTHS = _build_tables()
+# 星期掩码 -> 有课天数
+POPCOUNT = [bin(mask).count("1") for mask in range(WEEK_MASK + 1)]
+
+
+def slot_mask(start_minute: int, end_minute: int) -> int:
+    """课程时间与固定时间段有重叠的位掩码"""
+    mask = 0
+    for index, (slot_start, slot_end) in enumerate(SLOT_MINUTES):
+        if start_minute < slot_end and slot_start < end_minute:
+            mask |= 1 << index
+    return mask
+
+
+class FreeTimeIndex:
+    """学期空闲时间位图索引
+
+    每个(周, 星期)保存一个固定时间段占用掩码，第i位表示TIME_SLOTS[i]有课；
+    每周另存一个星期掩码，第d位表示星期d+1有课。
+    掩码由每个时间段的课次计数维护，课程增删时只更新其覆盖的格子，
+    空闲时间和空闲天数查询都变成掩码查表。
+    """
+
+    def __init__(self):
+        self._slot_counts = Counter()   # (周, 星期, 时间段下标) -> 课次
+        self._day_counts = Counter()    # (周, 星期) -> 课次
+        self._masks = {}                # (周, 星期) -> 时间段占用掩码
+        self._week_masks = {}           # 周 -> 星期占用掩码
+
+    def apply(self, course: Course, sign: int = 1):
+        """加上(sign=1)或减去(sign=-1)一门课程的占用"""
+        day = course.day_of_week
+        bits = slot_mask(course.start_minute, course.end_minute)
+        indexes = [index for index in range(len(TIME_SLOTS)) if bits >> index & 1]
+        for week in range(course.start_week, course.end_week + 1):
+            cell = (week, day)
+            mask = self._masks.get(cell, 0)
+            for index in indexes:
+                key = (week, day, index)
+                self._slot_counts[key] += sign
+                if self._slot_counts[key] > 0:
+                    mask |= 1 << index
+                else:
+                    mask &= ~(1 << index)
+                    del self._slot_counts[key]
+            self._set(self._masks, cell, mask)
+
+            self._day_counts[cell] += sign
+            week_mask = self._week_masks.get(week, 0)
+            if self._day_counts[cell] > 0:
+                week_mask |= 1 << (day - 1)
+            else:
+                week_mask &= ~(1 << (day - 1))
+                del self._day_counts[cell]
+            self._set(self._week_masks, week, week_mask)
+
+    @staticmethod
+    def _set(masks: dict, key, mask: int):
+        """保存掩码，全空时删除"""
+        if mask:
+            masks[key] = mask
+        else:
+            masks.pop(key, None)
+
+    def mask(self, week: int, day: int) -> int:
+        """指定周、星期的时间段占用掩码"""
+        return self._masks.get((week, day), 0)
+
+    def free_slots(self, week: int, day: int) -> list:
+        """指定周、星期的空闲时间段"""
+        return list(FREE_SLOTS[self._masks.get((week, day), 0)])
+
+    def free_hours(self, week: int, day: int) -> float:
+        """指定周、星期的空闲时长（小时）"""
+        return FREE_TENTHS[self._masks.get((week, day), 0)] / 10
+
+    def week_free_hours(self, week: int) -> float:
+        """指定周的空闲时长（小时）"""
+        return sum(FREE_TENTHS[self._masks.get((week, day), 0)] for day in range(1, 8)) / 10
+
+    def has_courses(self, week: int, day: int) -> bool:
+        """指定周、星期是否有课"""
+        return bool(self._week_masks.get(week, 0) >> (day - 1) & 1)
+
+    def free_days(self, week: int) -> int:
+        """指定周没有任何课程的天数"""
+        return 7 - POPCOUNT[self._week_masks.get(week, 0)]
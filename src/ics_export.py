@@ -0,0 +1,86 @@
+from datetime import datetime, timezone
+from models import minutes_to_time
+
+PRODID = "-//Class-schedule//小梦课程表//CN"
+
+
+def escape_text(text) -> str:
+    """转义iCalendar文本值中的特殊字符"""
+    return (str(text).replace("\\", "\\\\").replace(";", "\\;")
+            .replace(",", "\\,").replace("\r\n", "\\n").replace("\n", "\\n"))
+
+
+def fold_line(line: str) -> str:
+    """按RFC 5545把超过75字节的内容行折行，不拆开多字节字符"""
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line + "\r\n"
+    parts, current, size, limit = [], [], 0, 75
+    for char in line:
+        width = len(char.encode("utf-8"))
+        if size + width > limit:
+            parts.append("".join(current))
+            current, size, limit = [], 0, 74  # 续行以一个空格开头
+        current.append(char)
+        size += width
+    parts.append("".join(current))
+    return "\r\n ".join(parts) + "\r\n"
+
+
+class IcsWriter:
+    """流式写出iCalendar日历
+
+    每门课程写一个VEVENT，用每周重复的RRULE表示起止周，
+    而不是把每次上课展开成单独的事件；开启提醒的课程附带VALARM。
+    时间使用不带时区的本地时间，导入手机日历后按设备所在时区显示。
+    """
+
+    def __init__(self, stream, calendar_name: str = "课程表"):
+        self.stream = stream
+        self.calendar_name = calendar_name
+        self.dtstamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        self.count = 0
+
+    def _line(self, name: str, value: str):
+        """写出一行属性"""
+        self.stream.write(fold_line(f"{name}:{value}"))
+
+    def begin(self):
+        """写出日历头"""
+        self._line("BEGIN", "VCALENDAR")
+        self._line("VERSION", "2.0")
+        self._line("PRODID", PRODID)
+        self._line("CALSCALE", "GREGORIAN")
+        self._line("X-WR-CALNAME", escape_text(self.calendar_name))
+
+    def write_course(self, course, calendar):
+        """写出一门课程，calendar为课程所在学期的SemesterCalendar"""
+        first_day = calendar.date_of(course.start_week, course.day_of_week)
+        day_text = first_day.strftime("%Y%m%d")
+        weeks = course.end_week - course.start_week + 1
+
+        self._line("BEGIN", "VEVENT")
+        self._line("UID", f"course-{course.id}-{course.semester_id}@class-schedule")
+        self._line("DTSTAMP", self.dtstamp)
+        self._line("DTSTART", f"{day_text}T{minutes_to_time(course.start_minute).replace(':', '')}00")
+        self._line("DTEND", f"{day_text}T{minutes_to_time(course.end_minute).replace(':', '')}00")
+        if weeks > 1:
+            self._line("RRULE", f"FREQ=WEEKLY;COUNT={weeks}")
+        self._line("SUMMARY", escape_text(course.name))
+        self._line("LOCATION", escape_text(course.location))
+        self._line("DESCRIPTION", escape_text(
+            f"任课老师: {course.teacher}\n课程类型: {course.course_type}\n"
+            f"第{course.start_week}-{course.end_week}周"))
+        self._line("CATEGORIES", escape_text(course.course_type))
+        if course.reminder_enabled:
+            self._line("BEGIN", "VALARM")
+            self._line("ACTION", "DISPLAY")
+            self._line("TRIGGER", f"-PT{int(course.reminder_minutes)}M")
+            self._line("DESCRIPTION", escape_text(f"{course.name} 即将开始"))
+            self._line("END", "VALARM")
+        self._line("END", "VEVENT")
+        self.count += 1
+
+    def end(self):
+        """写出日历尾"""
+        self._line("END", "VCALENDAR")
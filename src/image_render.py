@@ -0,0 +1,191 @@
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+from models import TIME_SLOTS, WEEKDAY_NAMES
+
+WIDTH, HEIGHT = 1200, 800
+WEEK_HEADERS = ["时间"] + WEEKDAY_NAMES
+
+# 周视图布局
+WEEK_START_Y = 80
+WEEK_HEADER_HEIGHT = 40
+WEEK_CELL_WIDTH = 150
+WEEK_CELL_HEIGHT = 100
+
+# 日视图布局
+DAY_START_Y = 80
+DAY_ROW_HEIGHT = 80
+DAY_MARGIN = 50
+
+# 图片配色，name参与缓存键
+DEFAULT_THEME = {"name": "default", "background": "white", "line": "black", "text": "black"}
+
+
+def week_cells(courses) -> dict:
+    """一次遍历建立(时间段下标, 星期) -> 课程的映射，同一格有多门课时取第一门"""
+    slot_index = {slot: index for index, slot in enumerate(TIME_SLOTS)}
+    cells = {}
+    for course in courses:
+        index = slot_index.get((course.start_time, course.end_time))
+        if index is not None and 1 <= course.day_of_week <= 7:
+            cells.setdefault((index, course.day_of_week), course)
+    return cells
+
+
+def _digest(parts) -> str:
+    """图片内容的哈希"""
+    return hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()
+
+
+class TimetableImageRenderer:
+    """课程表图片渲染和缓存
+
+    整张图片按(视图类型, 日期, 内容哈希, 配色, 字体)缓存PNG字节，内容未变时直接返回；
+    周视图的空表格底图只绘制一次，每个有课的格子按其文字缓存为小图块，
+    重新生成时只有内容变化的格子需要重新绘制，其余格子直接贴上缓存的图块。
+    """
+
+    def __init__(self, max_images: int = 64, max_tiles: int = 1024):
+        self.max_images = max_images
+        self.max_tiles = max_tiles
+        self._images = OrderedDict()
+        self._tiles = OrderedDict()
+        self._bases = {}
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, courses, view_type: str = "week", target_date=None, theme: dict = None) -> bytes:
+        """渲染课程表，返回PNG字节"""
+        from export_resources import resources
+
+        theme = theme or DEFAULT_THEME
+        font_key = tuple(resources.font_paths()[:1])
+        if view_type == "week":
+            cells = week_cells(courses)
+            content = sorted((index, day, self._cell_text(course)) for (index, day), course in cells.items())
+            period = None
+        else:
+            current_day = target_date.weekday() + 1
+            content = [self._row_text(c) for c in courses if c.day_of_week == current_day]
+            period = target_date.strftime("%Y-%m-%d")
+        key = (view_type, period, _digest(content), theme["name"], font_key)
+
+        with self._lock:
+            data = self._images.get(key)
+            if data is not None:
+                self._images.move_to_end(key)
+                self.hits += 1
+                return data
+            self.misses += 1
+
+        if view_type == "week":
+            image = self._render_week(content, theme)
+        else:
+            image = self._render_day(content, target_date, theme)
+        buffer = io.BytesIO()
+        image.save(buffer, "PNG")
+        data = buffer.getvalue()
+
+        with self._lock:
+            self._images[key] = data
+            while len(self._images) > self.max_images:
+                self._images.popitem(last=False)
+        return data
+
+    @staticmethod
+    def _cell_text(course) -> str:
+        """周视图格子中的文字"""
+        return f"{course.name}\n{course.location}\n{course.teacher}"
+
+    @staticmethod
+    def _row_text(course) -> str:
+        """日视图每行的文字"""
+        return f"{course.name} - {course.teacher}\n地点：{course.location}\n时间：{course.time_range}"
+
+    def _draw_title(self, draw, title: str, theme: dict):
+        """绘制标题"""
+        from export_resources import resources
+
+        draw.text((WIDTH // 2 - 100, 20), title, fill=theme["text"], font=resources.pil_font(24))
+
+    def _week_base(self, theme: dict):
+        """周视图空表格底图，每种配色只绘制一次"""
+        from PIL import Image, ImageDraw
+        from export_resources import resources
+
+        with self._lock:
+            base = self._bases.get(theme["name"])
+            if base is not None:
+                return base
+            font = resources.pil_font(16)
+            base = Image.new('RGB', (WIDTH, HEIGHT), color=theme["background"])
+            draw = ImageDraw.Draw(base)
+            self._draw_title(draw, "课程表", theme)
+            for i, header in enumerate(WEEK_HEADERS):
+                x = i * WEEK_CELL_WIDTH
+                draw.rectangle([x, WEEK_START_Y, x + WEEK_CELL_WIDTH, WEEK_START_Y + WEEK_HEADER_HEIGHT],
+                               outline=theme["line"])
+                draw.text((x + 10, WEEK_START_Y + 10), header, fill=theme["text"], font=font)
+            for i, (start, end) in enumerate(TIME_SLOTS):
+                y = WEEK_START_Y + WEEK_HEADER_HEIGHT + i * WEEK_CELL_HEIGHT
+                draw.rectangle([0, y, WEEK_CELL_WIDTH, y + WEEK_CELL_HEIGHT], outline=theme["line"])
+                draw.text((10, y + 40), f"{start}\n{end}", fill=theme["text"], font=font)
+                for j in range(7):
+                    x = (j + 1) * WEEK_CELL_WIDTH
+                    draw.rectangle([x, y, x + WEEK_CELL_WIDTH, y + WEEK_CELL_HEIGHT], outline=theme["line"])
+            self._bases[theme["name"]] = base
+            return base
+
+    def _tile(self, text: str, width: int, height: int, theme: dict):
+        """带边框和文字的格子图块，按内容缓存"""
+        from PIL import Image, ImageDraw
+        from export_resources import resources
+
+        key = (text, width, height, theme["name"])
+        with self._lock:
+            tile = self._tiles.get(key)
+            if tile is not None:
+                self._tiles.move_to_end(key)
+                return tile
+        tile = Image.new('RGB', (width + 1, height + 1), color=theme["background"])
+        draw = ImageDraw.Draw(tile)
+        draw.rectangle([0, 0, width, height], outline=theme["line"])
+        draw.text((10, 10), text, fill=theme["text"], font=resources.pil_font(16))
+        with self._lock:
+            self._tiles[key] = tile
+            while len(self._tiles) > self.max_tiles:
+                self._tiles.popitem(last=False)
+        return tile
+
+    def _render_week(self, content, theme: dict):
+        """在底图上贴上各个有课格子的图块"""
+        image = self._week_base(theme).copy()
+        for index, day, text in content:
+            x = day * WEEK_CELL_WIDTH
+            y = WEEK_START_Y + WEEK_HEADER_HEIGHT + index * WEEK_CELL_HEIGHT
+            image.paste(self._tile(text, WEEK_CELL_WIDTH, WEEK_CELL_HEIGHT, theme), (x, y))
+        return image
+
+    def _render_day(self, content, target_date, theme: dict):
+        """日视图：逐行贴上课程图块"""
+        from PIL import Image, ImageDraw
+
+        image = Image.new('RGB', (WIDTH, HEIGHT), color=theme["background"])
+        self._draw_title(ImageDraw.Draw(image), f"{target_date.strftime('%Y年%m月%d日')}课程安排", theme)
+        row_width = WIDTH - 2 * DAY_MARGIN
+        for i, text in enumerate(content):
+            y = DAY_START_Y + i * DAY_ROW_HEIGHT
+            image.paste(self._tile(text, row_width, DAY_ROW_HEIGHT, theme), (DAY_MARGIN, y))
+        return image
+
+    def stats(self) -> dict:
+        """缓存命中统计"""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "images": len(self._images), "tiles": len(self._tiles)}
+
+
+# 进程内共享的渲染器
+renderer = TimetableImageRenderer()
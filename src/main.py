@@ -1,18 +1,27 @@
+import argparse
+import sqlite3
 import ttkbootstrap as tb
 from tkinter import ttk, messagebox
 from ttkbootstrap.constants import LEFT, BOTH
 
-from course_manager import CourseManager
+from database import DB_PATH
+from db_worker import DBWorker
+from export_jobs import ExportJobManager, run_export
+from profiles import ProfileRegistry, DEFAULT_PROFILE
 from reminder_service import ReminderService
-from ui_components import TopBar, StatsPanel
+from ui_components import TopBar, StatsPanel, ExportJobPanel, notify_job_result
 from views import WeekView, DayView, MonthView
 from dialogs import AddCourseDialog
+from models import TIME_SLOTS
 
 from datetime import datetime
 from logger_config import logger
 
 class ModernCourseScheduleApp:
-    def __init__(self):
+    def __init__(self, in_memory=False, db_path=DB_PATH, profile=DEFAULT_PROFILE):
+        # 每个档案一个数据库，打开的档案各自持有连接和查询缓存
+        self.profiles = ProfileRegistry(db_path, in_memory=in_memory)
+        self.current_profile = profile
         self.root = tb.Window(themename="flatly")
         self.style = tb.Style(theme="flatly")
         self.root.title("小梦课程表")
@@ -34,16 +43,26 @@ class ModernCourseScheduleApp:
 
     def _init_basic_variables(self):
         """初始化基本变量"""
-        self.course_manager = CourseManager()
+        try:
+            self.course_manager = self.profiles.acquire(self.current_profile)
+        except ValueError as e:
+            logger.error(f"打开档案失败: {str(e)}")
+            messagebox.showerror("错误", f"{str(e)}\n\n将打开默认档案")
+            self.current_profile = DEFAULT_PROFILE
+            self.course_manager = self.profiles.acquire(DEFAULT_PROFILE)
+        # 界面的数据库请求交给后台线程执行，结果在主线程回调
+        self.db_worker = DBWorker(self.root, on_exit=self.profiles.close_thread_connections)
+        self.db_worker.start()
+        # 导出在后台线程中执行，多个导出任务可同时进行
+        self.export_jobs = ExportJobManager(self.root, on_exit=self.profiles.close_thread_connections)
         self.current_view = "week"
         self.current_theme = "flatly"
         self.themes = ["flatly", "darkly", "solar", "superhero", "cyborg"]
-        self.time_slots = [
-            ("07:35", "07:45"), ("08:00", "09:40"), ("10:00", "11:40"),
-            ("14:00", "15:40"), ("16:00", "17:40"), ("19:00", "20:40")
-        ]
+        self.time_slots = list(TIME_SLOTS)
         self.days_of_week = ["周一", "周二", "周三", "周四", "周五", "周六", "周日"]
         self.courses = []
+        # 当前课程列表对应的搜索关键词，显示整个学期时为None
+        self.search_query = None
         self.current_week = 1
         self._update_timer = None
 
@@ -51,28 +70,36 @@ class ModernCourseScheduleApp:
         """UI初始化后的设置"""
         self.current_week = self.get_current_week()
         self.top_bar.time_var.set(self.current_week)
-        self.load_courses()
-        self.update_display()
+        self.load_courses(self.update_display)
 
     def init_semesters(self):
         """初始化学期"""
-        self.semesters = self.course_manager.get_semesters()
-        logger.info(f"获取到的学期列表: {self.semesters}")
-        
-        if not self.semesters:
-            logger.warning("没有找到学期数据，请先创建学期")
-            self.current_semester = None
-            messagebox.showwarning("提示", "请先创建学期")
-            return
-        
-        current_semester = self.course_manager.get_current_semester()
+        self._apply_semesters(*self._load_semesters(self.course_manager))
+
+    @staticmethod
+    def _load_semesters(course_manager):
+        """读取学期列表和当前学期，没有当前学期时使用第一个学期"""
+        semesters = course_manager.get_semesters()
+        logger.info(f"获取到的学期列表: {semesters}")
+        if not semesters:
+            return semesters, None
+
+        current_semester = course_manager.get_current_semester()
         if current_semester:
-            self.current_semester = current_semester
-            logger.info(f"使用数据库中的当前学期: {self.current_semester}")
+            logger.info(f"使用数据库中的当前学期: {current_semester}")
         else:
-            self.current_semester = self.semesters[0]
-            self.course_manager.set_current_semester(self.current_semester[0])
-            logger.info(f"使用第一个学期作为当前学期: {self.current_semester}")
+            current_semester = semesters[0]
+            course_manager.set_current_semester(current_semester[0])
+            logger.info(f"使用第一个学期作为当前学期: {current_semester}")
+        return semesters, current_semester
+
+    def _apply_semesters(self, semesters, current_semester):
+        """使用读取到的学期数据"""
+        self.semesters = semesters
+        self.current_semester = current_semester
+        if not semesters:
+            logger.warning("没有找到学期数据，请先创建学期")
+            messagebox.showwarning("提示", "请先创建学期")
 
     def setup_ui(self):
         """设置用户界面"""
@@ -83,6 +110,9 @@ class ModernCourseScheduleApp:
         # 顶部控制栏
         self.top_bar = TopBar(main_frame, self)
 
+        # 底部导出进度栏
+        self.job_panel = ExportJobPanel(main_frame, self)
+
         # 内容区域
         content_frame = tb.Frame(main_frame)
         content_frame.pack(fill=BOTH, expand=True, pady=(10, 0))
@@ -103,11 +133,84 @@ class ModernCourseScheduleApp:
         """显示添加课程对话框"""
         AddCourseDialog(self.root, self)
 
+    def submit_export(self, title, courses, format, filename=None, view_type="week", target_date=None,
+                      **options):
+        """在后台导出课程，完成后以通知提示，返回导出任务"""
+        # 导出结束前档案保持打开，期间切换档案不会关闭正在导出的数据库
+        profile = self.current_profile
+        self.profiles.acquire(profile)
+
+        def on_done(job):
+            self.profiles.release(profile)
+            notify_job_result(job)
+
+        return self.export_jobs.submit(title, run_export, self.course_manager, courses, format, filename,
+                                       view_type, target_date, on_done=on_done, **options)
+
+    def switch_profile(self, name):
+        """切换课程表档案，无需重启应用
+
+        档案数据库在后台线程中打开并读取学期，完成后在主线程切换；
+        连续切换时只切换到最后选择的档案。
+        """
+        if name == self.current_profile:
+            return
+
+        def open_profile():
+            course_manager = self.profiles.get(name)
+            return self._load_semesters(course_manager)
+
+        self.db_worker.submit(open_profile, channel="profile",
+                              callback=lambda semesters: self._on_profile_opened(name, *semesters),
+                              error_callback=self._on_profile_failed)
+
+    def _on_profile_failed(self, e):
+        """打开档案失败时提示并恢复档案选择"""
+        logger.error(f"切换档案失败: {str(e)}")
+        messagebox.showerror("错误", f"切换档案失败: {str(e)}")
+        self.top_bar.refresh_profiles()
+
+    def _on_profile_opened(self, name, semesters, current_semester):
+        """档案在后台打开后切换界面"""
+        if name == self.current_profile:
+            return
+        try:
+            # 档案已由后台线程打开，这里只是标记为使用中
+            course_manager = self.profiles.acquire(name)
+        except (ValueError, sqlite3.Error) as e:
+            self._on_profile_failed(e)
+            return
+
+        # 旧档案在已提交的后台请求执行完后才释放，工作线程按提交顺序执行
+        self.db_worker.submit(self.profiles.release, self.current_profile)
+        self.course_manager = course_manager
+        self.current_profile = name
+        self.reminder_service.course_manager = course_manager
+        logger.info(f"已切换到档案: {name}")
+
+        self._apply_semesters(semesters, current_semester)
+        self.current_week = self.get_current_week()
+        self.top_bar.refresh_profiles()
+        self.top_bar.refresh_semester_selector()
+        self.refresh_week_range()
+        self.load_courses(self.update_display)
+
+    def create_profile(self, name):
+        """新建课程表档案并切换过去"""
+        def on_error(e):
+            logger.error(f"新建档案失败: {str(e)}")
+            messagebox.showerror("错误", f"新建档案失败: {str(e)}")
+
+        # 在后台新建档案数据库，完成后切换过去
+        self.db_worker.submit(self.profiles.create, name,
+                              callback=lambda manager: self.switch_profile(name.strip()),
+                              error_callback=on_error)
+
     def search_courses(self):
         """处理课程搜索"""
         keyword = self.top_bar.search_var.get().strip()
         if not keyword:
-            self.load_courses()
+            self.load_courses(self.update_display)
             return
 
         search_type_map = {
@@ -117,23 +220,71 @@ class ModernCourseScheduleApp:
         }
         search_type = search_type_map.get(self.top_bar.search_type.get(), "name")
         
-        self.courses = self.course_manager.search_courses(keyword, search_type)
-        self.courses = [c for c in self.courses if str(c[12]) == str(self.app.current_semester[0])]
-        self.update_display()
+        semester_id = self.current_semester[0] if self.current_semester else None
+
+        def on_found(courses):
+            self.courses = courses
+            self.search_query = keyword
+            self.update_display()
+
+        # 与课程加载共用channel，连续输入时只显示最后一次搜索的结果
+        self.db_worker.submit(self.course_manager.search_courses, keyword, search_type, semester_id,
+                              channel="courses", callback=on_found)
+
+    def load_courses(self, callback=None):
+        """加载课程数据
 
-    def load_courses(self):
-        """加载课程数据"""
+        未指定callback时同步加载；指定时在后台加载，完成后在主线程调用callback。
+        """
         if not self.current_semester:
             logger.warning("没有选择当前学期")
             self.courses = []
+            self.search_query = None
+            if callback:
+                callback()
             return
 
-        self.courses = self.course_manager.get_courses()
-        self.courses = [c for c in self.courses if str(c[12]) == str(self.current_semester[0])]
+        semester_id = self.current_semester[0]
+        if callback is None:
+            self._set_courses(self.course_manager.get_courses(semester_id))
+            return
+
+        def on_loaded(courses):
+            self._set_courses(courses)
+            callback()
+
+        self.db_worker.submit(self.course_manager.get_courses, semester_id,
+                              channel="courses", callback=on_loaded)
+
+    def _set_courses(self, courses):
+        """更新当前课程列表"""
+        self.courses = courses
+        self.search_query = None
         logger.info(f"当前学期ID: {self.current_semester[0]}")
         logger.info(f"加载的课程列表: {self.courses}")
         logger.info(f"当前周数: {self.current_week}")
 
+    def add_courses(self, courses_data, allow_conflicts=False, callback=None, error_callback=None):
+        """在后台批量添加课程，全部写入后只刷新一次界面"""
+        return self._write_courses(self.course_manager.add_courses_bulk, courses_data,
+                                   allow_conflicts, callback, error_callback)
+
+    def update_courses(self, updates, allow_conflicts=False, callback=None, error_callback=None):
+        """在后台批量更新课程，全部写入后只刷新一次界面"""
+        return self._write_courses(self.course_manager.update_courses_bulk, updates,
+                                   allow_conflicts, callback, error_callback)
+
+    def _write_courses(self, write, items, allow_conflicts, callback, error_callback):
+        """提交课程写操作，成功后重新加载课程并刷新界面"""
+        def on_written(count):
+            if count:
+                self.load_courses(self.update_display)
+            if callback:
+                callback(count)
+
+        return self.db_worker.submit(write, items, allow_conflicts,
+                                     callback=on_written, error_callback=error_callback)
+
     def update_display(self):
         """更新显示"""
         # 获取当前日期用于日视图和月视图
@@ -142,7 +293,8 @@ class ModernCourseScheduleApp:
             current_date = self.month_view.current_date
         
         self.stats_panel.update_stats(self.courses, self.current_week, 
-                                    self.course_manager, self.current_view, current_date)
+                                    self.course_manager, self.current_view, current_date,
+                                    search_query=self.search_query)
 
         # 隐藏所有视图
         self.week_view.frame.pack_forget()
@@ -169,8 +321,7 @@ class ModernCourseScheduleApp:
     def on_time_change(self):
         """时间改变事件"""
         self.current_time = self.top_bar.time_var.get()
-        self.load_courses()
-        self._schedule_update()
+        self.load_courses(self._schedule_update)
 
     def on_theme_change(self, event):
         """主题切换事件"""
@@ -187,23 +338,35 @@ class ModernCourseScheduleApp:
         if self.current_view == "week":
             self.week_view.show()
 
+    @property
+    def calendar(self):
+        """获取当前学期日历，没有学期时返回None"""
+        return self.course_manager.get_calendar(self.current_semester)
+
+    @property
+    def total_weeks(self):
+        """当前学期总周数"""
+        calendar = self.calendar
+        return calendar.total_weeks if calendar else 20
+
     def get_current_week(self):
         """获取当前周数"""
-        if not self.current_semester:
+        calendar = self.calendar
+        if not calendar:
             return 1  # 如果没有学期，默认返回第1周
-            
-        today = datetime.now()
-        start_date = datetime.strptime(self.current_semester[2], "%Y-%m-%d")
-        week_diff = (today - start_date).days // 7 + 1
-        current_week = max(1, min(week_diff, 20))
-        
-        logger.info(f"当前日期: {today}")
-        logger.info(f"学期开始日期: {start_date}")
-        logger.info(f"计算出的周数: {week_diff}")
-        logger.info(f"实际使用的周数: {current_week}")
-        
+
+        current_week = calendar.current_week()
+        logger.info(f"学期开始日期: {calendar.start_date}，当前周数: {current_week}")
         return current_week
 
+    def refresh_week_range(self):
+        """按当前学期的周数更新周选择范围，超出范围的周数调整到最后一周"""
+        self.current_week = max(1, min(self.current_week, self.total_weeks))
+        if self.current_view == "week":
+            self.top_bar.time_spinbox.config(from_=1, to=self.total_weeks)
+            self.top_bar.time_var.set(self.current_week)
+            self.current_time = self.current_week
+
     def switch_view(self, view):
         """切换视图"""
         if self.current_view == view:
@@ -214,7 +377,7 @@ class ModernCourseScheduleApp:
         
         # 根据视图类型设置时间控制范围和初始值
         if view == "week":
-            self.top_bar.time_spinbox.config(from_=1, to=20)
+            self.top_bar.time_spinbox.config(from_=1, to=self.total_weeks)
             self.top_bar.time_var.set(self.current_week)
         elif view == "day":
             self.top_bar.time_spinbox.config(from_=1, to=31)
@@ -250,7 +413,16 @@ class ModernCourseScheduleApp:
         finally:
             # 确保在退出时停止提醒服务
             self.reminder_service.stop()
+            self.db_worker.stop()
+            self.export_jobs.shutdown()
+            self.profiles.close()
 
 if __name__ == "__main__":
-    app = ModernCourseScheduleApp()
+    parser = argparse.ArgumentParser(description="小梦课程表")
+    parser.add_argument("--db", default=DB_PATH, help="默认档案的数据库路径")
+    parser.add_argument("--profile", default=DEFAULT_PROFILE, help="启动时打开的档案")
+    parser.add_argument("--memory", action="store_true",
+                        help="将数据库载入内存，读取不再访问磁盘，写操作在后台批量写回")
+    args = parser.parse_args()
+    app = ModernCourseScheduleApp(in_memory=args.memory, db_path=args.db, profile=args.profile)
     app.run()
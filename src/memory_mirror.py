@@ -0,0 +1,156 @@
+import atexit
+import itertools
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from database import ConnectionManager, DB_PATH
+from migrations import migrate
+from logger_config import logger
+
+
+class _JournalingConnection:
+    """事务内使用的连接代理，记录执行过的写语句"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+        self.statements = []  # [(sql, 参数或参数列表, 是否executemany)]
+
+    def execute(self, sql: str, params=()) -> sqlite3.Cursor:
+        cursor = self._conn.execute(sql, params)
+        if not sql.lstrip().upper().startswith("SELECT"):
+            self.statements.append((sql, tuple(params), False))
+        return cursor
+
+    def executemany(self, sql: str, seq_of_params) -> sqlite3.Cursor:
+        seq_of_params = [tuple(params) for params in seq_of_params]
+        cursor = self._conn.executemany(sql, seq_of_params)
+        self.statements.append((sql, seq_of_params, True))
+        return cursor
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+class MemoryMirror(ConnectionManager):
+    """courses.db的内存镜像
+
+    启动时先在磁盘库上执行结构迁移，再用backup()整体载入共享缓存的内存数据库，
+    之后所有读取都只访问内存。写事务提交到内存后按提交顺序记入日志，
+    由后台线程每隔flush_interval秒或日志达到batch_size个事务时，
+    在一个磁盘事务中批量重放；关闭或进程退出时保证把剩余日志写回磁盘。
+    重放顺序与内存中的提交顺序一致，自增ID在两边保持相同。
+    """
+
+    _ids = itertools.count(1)
+
+    def __init__(self, db_path: str = DB_PATH, flush_interval: float = 2.0, batch_size: int = 100,
+                 busy_timeout: float = 5.0, max_retries: int = 5, cached_statements: int = 256):
+        super().__init__(db_path, busy_timeout, max_retries, cached_statements)
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.memory_uri = f"file:courses_mirror_{os.getpid()}_{next(self._ids)}?mode=memory&cache=shared"
+        self._journal = []  # 已在内存提交、尚未写回磁盘的事务
+        self._journal_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+
+        self._disk = super()._connect()
+        migrate(self._disk)
+        # 至少保留一个连接，共享缓存的内存数据库才不会被释放
+        self._anchor = self._connect()
+        self._disk.backup(self._anchor)
+        logger.info(f"已将数据库载入内存镜像: {self.db_path}")
+
+        self._flusher = threading.Thread(target=self._flush_loop, name="MemoryMirrorFlusher", daemon=True)
+        self._flusher.start()
+        atexit.register(self.close_all)
+
+    def _connect(self) -> sqlite3.Connection:
+        """创建到内存数据库的连接"""
+        conn = sqlite3.connect(self.memory_uri, uri=True,
+                               timeout=self.busy_timeout,
+                               cached_statements=self.cached_statements,
+                               check_same_thread=False)
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout * 1000)}")
+        return conn
+
+    @property
+    def pending(self) -> int:
+        """尚未写回磁盘的事务数"""
+        return len(self._journal)
+
+    @contextmanager
+    def transaction(self):
+        """事务上下文，提交到内存后记入待写回日志"""
+        conn = self.get_connection()
+        self._retry(conn.execute, "BEGIN IMMEDIATE")
+        journaling = _JournalingConnection(conn)
+        try:
+            yield journaling
+            # 提交和记日志在同一把锁内完成，保证日志顺序就是提交顺序
+            with self._journal_lock:
+                self._retry(conn.commit)
+                if journaling.statements:
+                    self._journal.append(journaling.statements)
+                pending = len(self._journal)
+        except BaseException:
+            # 提交失败时同样回滚，不让连接停留在未结束的事务中
+            conn.rollback()
+            raise
+        if pending >= self.batch_size:
+            self._wakeup.set()
+
+    def flush(self) -> int:
+        """把日志中的事务批量写回磁盘，返回写回的事务数"""
+        with self._flush_lock:
+            with self._journal_lock:
+                batch, self._journal = self._journal, []
+            if not batch or self._disk is None:
+                return 0
+            try:
+                self._retry(self._disk.execute, "BEGIN IMMEDIATE")
+                try:
+                    for statements in batch:
+                        for sql, params, many in statements:
+                            if many:
+                                self._disk.executemany(sql, params)
+                            else:
+                                self._disk.execute(sql, params)
+                    self._retry(self._disk.commit)
+                except Exception:
+                    self._disk.rollback()
+                    raise
+            except sqlite3.Error as e:
+                # 放回日志队首，下次写回时重试
+                with self._journal_lock:
+                    self._journal[:0] = batch
+                logger.error(f"内存镜像写回磁盘失败: {str(e)}")
+                return 0
+            logger.info(f"内存镜像已写回{len(batch)}个事务")
+            return len(batch)
+
+    def _flush_loop(self):
+        """后台定期写回"""
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def close_all(self):
+        """写回全部日志后关闭内存数据库和磁盘连接"""
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        self._flusher.join()
+        self.flush()
+        if self.pending:
+            logger.error(f"关闭时仍有{self.pending}个事务未能写回磁盘")
+        super().close_all()
+        self._anchor.close()
+        self._disk.close()
+        self._disk = None
+        atexit.unregister(self.close_all)
+        logger.info("内存镜像已关闭")
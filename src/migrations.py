@@ -0,0 +1,114 @@
+import sqlite3
+from logger_config import logger
+
+
+def _create_base_schema(conn: sqlite3.Connection):
+    """创建学期表和课程表（兼容未记录版本号的旧数据库）"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS semesters (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            start_date TEXT NOT NULL,
+            end_date TEXT NOT NULL,
+            current INTEGER DEFAULT 0
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS courses (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            teacher TEXT NOT NULL,
+            location TEXT NOT NULL,
+            start_week INTEGER NOT NULL,
+            end_week INTEGER NOT NULL,
+            day_of_week INTEGER NOT NULL,
+            start_time TEXT NOT NULL,
+            end_time TEXT NOT NULL,
+            color TEXT NOT NULL,
+            course_type TEXT NOT NULL,
+            is_special INTEGER NOT NULL,
+            semester_id INTEGER NOT NULL,
+            reminder_enabled INTEGER DEFAULT 0,
+            reminder_minutes INTEGER DEFAULT 15,
+            reminder_type TEXT DEFAULT 'popup',
+            FOREIGN KEY (semester_id) REFERENCES semesters (id)
+        )
+    ''')
+
+
+def _create_query_indexes(conn: sqlite3.Connection):
+    """创建按学期/星期/周查询课程的复合索引"""
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_courses_semester_day_week
+            ON courses (semester_id, day_of_week, start_week, end_week)
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_courses_semester_week
+            ON courses (semester_id, start_week, end_week)
+    ''')
+
+
+def _sql_minutes(column: str) -> str:
+    """生成将HH:MM文本列转换为当天分钟数的SQL表达式"""
+    return (f"(CAST(substr({column}, 1, instr({column}, ':') - 1) AS INTEGER) * 60"
+            f" + CAST(substr({column}, instr({column}, ':') + 1) AS INTEGER))")
+
+
+def _add_minute_columns(conn: sqlite3.Connection):
+    """添加整数分钟时间列和预计算时长列，并回填已有数据"""
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(courses)")}
+    for column in ("start_minute", "end_minute", "duration_minutes"):
+        if column not in existing:
+            conn.execute(f"ALTER TABLE courses ADD COLUMN {column} INTEGER")
+    conn.execute(f'''
+        UPDATE courses SET
+            start_minute = {_sql_minutes("start_time")},
+            end_minute = {_sql_minutes("end_time")}
+    ''')
+    conn.execute("UPDATE courses SET duration_minutes = end_minute - start_minute")
+
+
+# 按版本号排序的迁移列表: (版本号, 说明, 迁移函数)
+# 新迁移只能追加到末尾，已发布的迁移不得修改
+MIGRATIONS = [
+    (1, "创建学期表和课程表", _create_base_schema),
+    (2, "添加课程查询复合索引", _create_query_indexes),
+    (3, "添加整数分钟时间列和时长列", _add_minute_columns),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """读取数据库结构版本号"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """将数据库升级到最新版本，返回升级后的版本号
+
+    每个迁移在独立事务中执行并同时写入user_version，
+    失败时回滚该迁移，已完成的迁移不受影响。
+    """
+    current = get_schema_version(conn)
+    if current >= LATEST_VERSION:
+        # 快速路径：结构已是最新，无需任何操作
+        return current
+
+    for version, description, step in MIGRATIONS:
+        if version <= current:
+            continue
+        logger.info(f"执行数据库迁移 v{version}: {description}")
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            step(conn)
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"数据库迁移 v{version} 失败: {str(e)}")
+            raise
+        current = version
+
+    logger.info(f"数据库结构已升级到 v{current}")
+    return current
@@ -0,0 +1,117 @@
+from functools import lru_cache
+from typing import NamedTuple
+
+WEEKDAY_NAMES = ["周一", "周二", "周三", "周四", "周五", "周六", "周日"]
+
+# 每天固定的上课时间段
+TIME_SLOTS = [
+    ("07:35", "07:45"), ("08:00", "09:40"), ("10:00", "11:40"),
+    ("14:00", "15:40"), ("16:00", "17:40"), ("19:00", "20:40")
+]
+
+
+def time_to_minutes(time_str: str) -> int:
+    """将HH:MM转换为当天的分钟数"""
+    hour, minute = time_str.split(":")
+    return int(hour) * 60 + int(minute)
+
+
+def minutes_to_time(minutes: int) -> str:
+    """将当天的分钟数转换为HH:MM"""
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def minutes_to_hours(minutes: int) -> float:
+    """分钟数转换为小时，保留一位小数"""
+    return round(minutes / 60, 1)
+
+
+@lru_cache(maxsize=256)
+def duration_hours(start_time: str, end_time: str) -> float:
+    """计算时间段长度（小时），同一时间段只解析一次"""
+    return minutes_to_hours(time_to_minutes(end_time) - time_to_minutes(start_time))
+
+
+def time_period(minute_of_day: int) -> str:
+    """根据当天分钟数获取时间段分类"""
+    if minute_of_day < 12 * 60:
+        return "上午"
+    elif minute_of_day < 14 * 60:
+        return "中午"
+    elif minute_of_day < 18 * 60:
+        return "下午"
+    return "晚上"
+
+
+class Course(NamedTuple):
+    """课程记录
+
+    字段顺序与courses表一致，仍可按下标访问；
+    类型转换只在从数据库加载时进行一次。
+    start_minute/end_minute为当天分钟数，duration_minutes为单次课时长。
+    """
+    id: int
+    name: str
+    teacher: str
+    location: str
+    start_week: int
+    end_week: int
+    day_of_week: int
+    start_time: str
+    end_time: str
+    color: str
+    course_type: str
+    is_special: bool
+    semester_id: int
+    reminder_enabled: bool
+    reminder_minutes: int
+    reminder_type: str
+    start_minute: int
+    end_minute: int
+    duration_minutes: int
+
+    @classmethod
+    def from_row(cls, row) -> "Course":
+        """从数据库行创建课程记录"""
+        if len(row) > 18 and None not in (row[16], row[17], row[18]):
+            start_minute, end_minute, duration = int(row[16]), int(row[17]), int(row[18])
+        else:
+            # 缺少分钟列的数据行，从文本时间计算
+            start_minute, end_minute = time_to_minutes(row[7]), time_to_minutes(row[8])
+            duration = end_minute - start_minute
+        return cls(
+            int(row[0]), row[1], row[2], row[3],
+            int(row[4]), int(row[5]), int(row[6]),
+            row[7], row[8], row[9], row[10],
+            bool(int(row[11] or 0)),
+            int(row[12]),
+            bool(int(row[13] or 0)),
+            int(row[14] if row[14] is not None else 15),
+            row[15] or "popup",
+            start_minute,
+            end_minute,
+            duration,
+        )
+
+    def in_week(self, week: int) -> bool:
+        """课程是否在指定周上课"""
+        return self.start_week <= week <= self.end_week
+
+    def occurs_on(self, day: int, week: int) -> bool:
+        """课程是否在指定周的指定星期上课"""
+        return self.day_of_week == day and self.start_week <= week <= self.end_week
+
+    @property
+    def time_range(self) -> str:
+        """上课时间段文本，如 08:00-09:40"""
+        return f"{self.start_time}-{self.end_time}"
+
+    @property
+    def duration_hours(self) -> float:
+        """单次课时长（小时），保留一位小数"""
+        return minutes_to_hours(self.duration_minutes)
+
+    @property
+    def weekday_name(self) -> str:
+        """星期文字"""
+        return WEEKDAY_NAMES[self.day_of_week - 1] if 1 <= self.day_of_week <= 7 else "未知"
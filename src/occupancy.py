@@ -0,0 +1,99 @@
+from typing import List
+import numpy as np
+from models import Course, time_period
+
+
+class OccupancyTensor:
+    """学期课程占用张量
+
+    一次性把学期内所有课程展开为 (周 × 星期 × 时间段) 的课次数组和学时数组，
+    各类统计都由数组归约得到，不再逐门课程、逐周循环。
+    时间段为学期内出现过的不同上课时间（按开始、结束时间排序）。
+    """
+
+    def __init__(self, courses: List[Course], total_weeks: int = 0):
+        count = len(courses)
+        start_week = np.fromiter((c.start_week for c in courses), dtype=np.int64, count=count)
+        end_week = np.fromiter((c.end_week for c in courses), dtype=np.int64, count=count)
+        day = np.fromiter((c.day_of_week - 1 for c in courses), dtype=np.int64, count=count)
+        times = np.fromiter((c.start_minute * 1440 + c.end_minute for c in courses),
+                            dtype=np.int64, count=count)
+        # 单次课时长直接取Course.duration_hours，np.round的舍入规则与其不同
+        duration = np.fromiter((c.duration_hours for c in courses), dtype=np.float64, count=count)
+
+        self.weeks = int(max(total_weeks, end_week.max() if count else 0, 1))
+        slot_keys, slot = np.unique(times, return_inverse=True)
+        self.slot_minutes = [(int(key) // 1440, int(key) % 1440) for key in slot_keys]
+
+        types, type_index = np.unique(
+            np.array([c.course_type for c in courses], dtype=object), return_inverse=True)
+        self.course_types = [str(t) for t in types]
+        week_count = end_week - start_week + 1
+        self.type_counts = np.bincount(type_index, minlength=len(types))
+        self.type_hours = np.bincount(type_index, weights=duration * week_count, minlength=len(types))
+
+        # 差分数组：在开始周+1、结束周后-1，沿周轴累加即得到每周的占用
+        shape = (self.weeks + 1, 7, len(slot_keys))
+        count_diff = np.zeros(shape, dtype=np.int64)
+        hours_diff = np.zeros(shape, dtype=np.float64)
+        start_index = start_week - 1
+        np.add.at(count_diff, (start_index, day, slot), 1)
+        np.add.at(count_diff, (end_week, day, slot), -1)
+        np.add.at(hours_diff, (start_index, day, slot), duration)
+        np.add.at(hours_diff, (end_week, day, slot), -duration)
+        self.counts = np.cumsum(count_diff, axis=0)[:self.weeks]
+        self.hours = np.cumsum(hours_diff, axis=0)[:self.weeks]
+        self.course_count = count
+
+    @property
+    def slot_labels(self) -> List[str]:
+        """时间段文本，如 08:00-09:40"""
+        return [f"{s // 60:02d}:{s % 60:02d}-{e // 60:02d}:{e % 60:02d}" for s, e in self.slot_minutes]
+
+    def weekly_hours(self) -> np.ndarray:
+        """每周学时"""
+        return self.hours.sum(axis=(1, 2))
+
+    def daily_hours(self) -> np.ndarray:
+        """星期一到星期日的学期总学时"""
+        return self.hours.sum(axis=(0, 2))
+
+    def slot_hours(self) -> np.ndarray:
+        """每个时间段的学期总学时"""
+        return self.hours.sum(axis=(0, 1))
+
+    def density(self) -> np.ndarray:
+        """课程密度矩阵 (星期 × 周)，值为当天的课次数"""
+        return self.counts.sum(axis=2).T
+
+    def statistics(self) -> dict:
+        """汇总为学习统计数据"""
+        weekly = self.weekly_hours()
+        active_weeks = np.flatnonzero(self.counts.sum(axis=(1, 2)))
+        months = active_weeks // 4 + 1  # 假设每月4周
+        monthly = np.bincount(months, weights=weekly[active_weeks]) if len(active_weeks) else np.zeros(0)
+
+        daily = self.daily_hours()
+        day_counts = self.counts.sum(axis=(0, 2))
+        slot_hours = self.slot_hours()
+
+        study_patterns = {}
+        for (start_minute, _), hours in zip(self.slot_minutes, slot_hours):
+            period = time_period(start_minute)
+            study_patterns[period] = study_patterns.get(period, 0.0) + float(hours)
+
+        return {
+            'total_courses': self.course_count,
+            'total_hours': float(self.type_hours.sum()),
+            'total_weeks': self.weeks,
+            'course_types': {
+                course_type: {'count': int(count), 'hours': float(hours)}
+                for course_type, count, hours in zip(self.course_types, self.type_counts, self.type_hours)
+            },
+            'weekly_hours': {int(w) + 1: float(weekly[w]) for w in active_weeks},
+            'daily_hours': {int(d) + 1: float(daily[d]) for d in np.flatnonzero(day_counts)},
+            'time_distribution': dict(zip(self.slot_labels, map(float, slot_hours))),
+            'monthly_hours': {int(m): float(monthly[m]) for m in np.unique(months)},
+            'course_density': self.density().tolist(),
+            'study_patterns': study_patterns,
+        }
@@ -0,0 +1,128 @@
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+from database import DB_PATH
+from course_manager import CourseManager
+from logger_config import logger
+
+DEFAULT_PROFILE = "默认"
+PROFILES_DIR = "profiles"
+
+
+class ProfileRegistry:
+    """课程表档案管理
+
+    每个档案是一个独立的数据库文件：默认档案沿用courses.db，其他档案保存在
+    profiles_dir（默认为courses.db所在目录下的profiles）中的<档案名>.db。
+    每个打开的档案持有自己的CourseManager（独立连接和查询缓存），
+    切换档案只是取出对应的管理器；打开的档案超过max_open个时关闭最久未用的。
+    通过acquire取得的档案在release之前处于使用中，不会被关闭，
+    全部档案都在使用中时暂时允许超过上限。
+    """
+
+    NAME_PATTERN = re.compile(r"^[^\\/:*?\"<>|]{1,40}$")
+
+    def __init__(self, default_path: str = DB_PATH, profiles_dir: str = None,
+                 in_memory: bool = False, max_open: int = 8):
+        self.default_path = default_path
+        self.profiles_dir = profiles_dir or os.path.join(os.path.dirname(default_path), PROFILES_DIR)
+        self.in_memory = in_memory
+        self.max_open = max_open
+        self._managers = OrderedDict()
+        self._pins = Counter()
+        self._lock = threading.RLock()
+
+    def path_of(self, name: str) -> str:
+        """档案对应的数据库路径"""
+        if name == DEFAULT_PROFILE:
+            return self.default_path
+        return os.path.join(self.profiles_dir, f"{name}.db")
+
+    def list_profiles(self) -> list:
+        """所有档案名，默认档案在最前"""
+        names = []
+        if os.path.isdir(self.profiles_dir):
+            names = sorted(os.path.splitext(f)[0] for f in os.listdir(self.profiles_dir)
+                           if f.endswith(".db") and os.path.splitext(f)[0] != DEFAULT_PROFILE)
+        return [DEFAULT_PROFILE] + names
+
+    def validate_name(self, name: str) -> str:
+        """校验档案名，无效时抛出ValueError"""
+        name = name.strip()
+        if not self.NAME_PATTERN.match(name) or name.startswith("."):
+            raise ValueError("档案名不能为空，且不能包含 \\ / : * ? \" < > | 等字符")
+        return name
+
+    def create(self, name: str):
+        """新建档案并打开，返回其CourseManager"""
+        name = self.validate_name(name)
+        if name in self.list_profiles():
+            raise ValueError(f"档案“{name}”已存在")
+        os.makedirs(self.profiles_dir, exist_ok=True)
+        logger.info(f"新建档案: {name}")
+        return self._open(name)
+
+    def get(self, name: str):
+        """获取已有档案的CourseManager，未打开时打开；档案不存在时抛出ValueError
+
+        只有create会新建档案，档案名写错不会悄悄生成一个空的课程表。
+        """
+        with self._lock:
+            manager = self._managers.get(name)
+            if manager is not None:
+                self._managers.move_to_end(name)
+                return manager
+            if name != DEFAULT_PROFILE:
+                name = self.validate_name(name)
+                if not os.path.exists(self.path_of(name)):
+                    raise ValueError(f"档案“{name}”不存在，可用档案: {'、'.join(self.list_profiles())}")
+            return self._open(name)
+
+    def acquire(self, name: str):
+        """获取档案并标记为使用中，用完后调用release(name)"""
+        if name != DEFAULT_PROFILE:
+            name = self.validate_name(name)
+        with self._lock:
+            manager = self.get(name)
+            self._pins[name] += 1
+            return manager
+
+    def release(self, name: str):
+        """结束一次acquire的使用，档案超过上限时关闭不再使用的档案"""
+        with self._lock:
+            self._pins[name] -= 1
+            if self._pins[name] <= 0:
+                del self._pins[name]
+            self._evict()
+
+    def _open(self, name: str):
+        """打开档案数据库（不存在时创建），超过上限时关闭最久未用的档案"""
+        with self._lock:
+            manager = CourseManager(self.path_of(name), in_memory=self.in_memory)
+            self._managers[name] = manager
+            logger.info(f"已打开档案: {name}")
+            self._evict()
+            return manager
+
+    def _evict(self):
+        """超过上限时按最久未用的顺序关闭未在使用中的档案，最近一次取用的档案保留"""
+        idle = [name for name in list(self._managers)[:-1] if not self._pins[name]]
+        while len(self._managers) > self.max_open and idle:
+            old_name = idle.pop(0)
+            self._managers.pop(old_name).close()
+            logger.info(f"已关闭最久未使用的档案: {old_name}")
+
+    def close_thread_connections(self):
+        """关闭当前线程在各档案上的连接"""
+        with self._lock:
+            managers = list(self._managers.values())
+        for manager in managers:
+            manager.db.close_thread_connection()
+
+    def close(self):
+        """关闭所有打开的档案"""
+        with self._lock:
+            managers, self._managers = list(self._managers.values()), OrderedDict()
+        for manager in managers:
+            manager.close()
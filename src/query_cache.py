@@ -0,0 +1,115 @@
+import threading
+from collections import OrderedDict
+
+# 跨学期查询（semester_id为空）使用的分区
+ALL_SEMESTERS = "*"
+
+
+class QueryCache:
+    """带数据版本号的LRU查询缓存
+
+    缓存按学期分区，每个条目记录写入时的(全局代数, 分区版本号)。
+    任何写操作都会递增对应分区的版本号，全部失效时递增全局代数，
+    旧版本条目在读取时视为失效，查询期间版本变化的结果不会写入，
+    因此不需要过期时间也不会返回陈旧数据。
+    """
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._generation = 0
+        self._data_version = 0
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.stale = 0
+
+    @property
+    def data_version(self) -> int:
+        """全局数据版本号，每次写操作递增"""
+        return self._data_version
+
+    def partition_version(self, partition) -> tuple:
+        """获取分区版本号，包含全局代数，查询前读取并在写入缓存时传回"""
+        with self._lock:
+            return self._generation, self._versions.get(partition, 0)
+
+    def get(self, partition, key, default=None):
+        """读取缓存，未命中或版本过期时返回default"""
+        cache_key = (partition, key)
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is None:
+                self.misses += 1
+                return default
+            version, value = entry
+            if version != (self._generation, self._versions.get(partition, 0)):
+                # 分区已被写操作更新，丢弃旧条目
+                del self._entries[cache_key]
+                self.stale += 1
+                self.misses += 1
+                return default
+            self._entries.move_to_end(cache_key)
+            self.hits += 1
+            return value
+
+    def set(self, partition, key, value, version=None):
+        """写入缓存，超出容量时淘汰最久未使用的条目
+
+        version为开始查询前由partition_version读取的版本号，查询期间该分区
+        或全部缓存已失效时不写入，避免把旧数据存为新版本。
+        """
+        cache_key = (partition, key)
+        with self._lock:
+            current = (self._generation, self._versions.get(partition, 0))
+            if version is None:
+                version = current
+            elif version != current:
+                self.stale += 1
+                return
+            self._entries[cache_key] = (version, value)
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, partition=None):
+        """递增分区版本号使其缓存失效，partition为空时使全部分区失效"""
+        with self._lock:
+            self._data_version += 1
+            if partition is None:
+                # 递增全局代数，尚未出现过的分区的查询结果同样失效
+                self._generation += 1
+                self._entries.clear()
+                return
+            self._versions[partition] = self._versions.get(partition, 0) + 1
+            # 跨学期查询结果同样依赖该分区数据
+            self._versions[ALL_SEMESTERS] = self._versions.get(ALL_SEMESTERS, 0) + 1
+
+    def touch(self):
+        """只递增全局数据版本号，不影响已缓存的查询结果"""
+        with self._lock:
+            self._data_version += 1
+
+    def clear(self):
+        """清空缓存并重置统计"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = self.stale = 0
+
+    def stats(self) -> dict:
+        """获取缓存命中统计"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'stale': self.stale,
+                'hit_rate': round(self.hits / total, 3) if total else 0.0,
+                'data_version': self._data_version,
+            }
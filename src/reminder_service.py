@@ -1,6 +1,6 @@
 import threading
 import time
-from datetime import datetime, timedelta
+from datetime import datetime
 from logger_config import logger
 import tkinter as tk
 from tkinter import messagebox
@@ -41,11 +41,13 @@ class ReminderService:
 
                 self._last_check = current_time
                 now = datetime.now()
-                current_week = self._get_current_week()
+                current_semester = self.course_manager.get_current_semester()
+                current_week = self._get_current_week(current_semester)
                 current_day = now.weekday() + 1  # 转换为1-7
+                semester_id = current_semester[0] if current_semester else None
                 
-                # 获取当前周的所有课程
-                courses = self.course_manager.get_courses_by_week(current_week)
+                # 获取当前学期今天的课程
+                courses = self.course_manager.get_courses_by_day(current_day, current_week, semester_id)
                 
                 for course in courses:
                     if self._should_remind(course, now, current_day):
@@ -55,6 +57,9 @@ class ReminderService:
                 logger.error(f"检查提醒时出错: {str(e)}")
                 time.sleep(60)  # 出错时等待1分钟再继续
 
+        # 线程退出前释放本线程的数据库连接
+        self.course_manager.db.close_thread_connection()
+
     def _should_remind(self, course, now, current_day):
         """判断是否应该触发提醒"""
         try:
@@ -64,23 +69,19 @@ class ReminderService:
                 return False
                 
             # 检查是否是今天的课程
-            if int(course[6]) != current_day:
+            if course.day_of_week != current_day:
                 return False
                 
             # 检查是否启用了提醒
-            if not course[13]:  # reminder_enabled
+            if not course.reminder_enabled:
                 return False
                 
-            # 解析课程开始时间
-            course_time = datetime.strptime(course[7], "%H:%M").time()
-            course_datetime = datetime.combine(now.date(), course_time)
-            
-            # 计算提醒时间
-            reminder_minutes = int(course[14])  # reminder_minutes
-            reminder_time = course_datetime - timedelta(minutes=reminder_minutes)
+            # 计算提醒时间（当天秒数）
+            reminder_seconds = (course.start_minute - course.reminder_minutes) * 60
+            now_seconds = now.hour * 3600 + now.minute * 60 + now.second
             
             # 检查是否到了提醒时间
-            time_diff = (now - reminder_time).total_seconds()
+            time_diff = now_seconds - reminder_seconds
             return 0 <= time_diff < 60  # 在一分钟内的误差范围内
             
         except Exception as e:
@@ -90,7 +91,7 @@ class ReminderService:
     def _trigger_reminder(self, course):
         """触发提醒"""
         try:
-            reminder_type = course[15]  # reminder_type
+            reminder_type = course.reminder_type
             
             if reminder_type in ["popup", "both"]:
                 self._show_popup_reminder(course)
@@ -108,10 +109,10 @@ class ReminderService:
         messagebox.showinfo(
             "课程提醒",
             f"即将开始上课:\n\n"
-            f"课程: {course[1]}\n"
-            f"老师: {course[2]}\n"
-            f"地点: {course[3]}\n"
-            f"时间: {course[7]}-{course[8]}"
+            f"课程: {course.name}\n"
+            f"老师: {course.teacher}\n"
+            f"地点: {course.location}\n"
+            f"时间: {course.time_range}"
         )
         root.destroy()
 
@@ -123,13 +124,11 @@ class ReminderService:
         except Exception as e:
             logger.error(f"播放声音提醒失败: {str(e)}")
 
-    def _get_current_week(self):
+    def _get_current_week(self, current_semester=None):
         """获取当前周数"""
-        current_semester = self.course_manager.get_current_semester()
+        if current_semester is None:
+            current_semester = self.course_manager.get_current_semester()
         if not current_semester:
             return 1
             
-        today = datetime.now()
-        start_date = datetime.strptime(current_semester[2], "%Y-%m-%d")
-        week_diff = (today - start_date).days // 7 + 1
-        return max(1, min(week_diff, 20))
\ No newline at end of file
+        return self.course_manager.get_calendar(current_semester).current_week()
\ No newline at end of file
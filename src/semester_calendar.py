@@ -0,0 +1,76 @@
+from calendar import monthrange
+from datetime import date, datetime, timedelta
+
+DATE_FORMAT = "%Y-%m-%d"
+
+
+class SemesterCalendar:
+    """学期日历
+
+    每个学期只解析一次起止日期，之后日期与周数的相互换算都是O(1)的整数运算。
+    周数从1开始，以学期开始日期所在日为第1周第一天。
+    """
+
+    def __init__(self, semester_id, start_date: date, end_date: date):
+        self.semester_id = semester_id
+        self.start_date = start_date
+        self.end_date = end_date
+        self._start_ordinal = start_date.toordinal()
+        # 学期实际周数，至少为1周
+        self.total_weeks = max(1, (end_date.toordinal() - self._start_ordinal) // 7 + 1)
+
+    @classmethod
+    def from_semester(cls, semester) -> "SemesterCalendar":
+        """从学期记录(id, name, start_date, end_date, current)创建"""
+        start = datetime.strptime(semester[2], DATE_FORMAT).date()
+        end = datetime.strptime(semester[3], DATE_FORMAT).date()
+        return cls(semester[0], start, end)
+
+    @staticmethod
+    def _to_date(value) -> date:
+        """datetime统一转换为date"""
+        return value.date() if isinstance(value, datetime) else value
+
+    def week_of(self, value) -> int:
+        """获取日期对应的周数（不截断，学期开始前为0或负数）"""
+        return (self._to_date(value).toordinal() - self._start_ordinal) // 7 + 1
+
+    def clamp_week(self, week: int) -> int:
+        """将周数限制在学期范围内"""
+        return max(1, min(week, self.total_weeks))
+
+    def current_week(self, today=None) -> int:
+        """获取今天所在的教学周，超出范围时截断到学期首尾"""
+        return self.clamp_week(self.week_of(today or date.today()))
+
+    def week_start(self, week: int) -> date:
+        """获取指定周第一天的日期"""
+        return date.fromordinal(self._start_ordinal + (week - 1) * 7)
+
+    def date_of(self, week: int, day: int) -> date:
+        """获取指定周、指定星期(1-7，周一为1)的日期"""
+        start = self.week_start(week)
+        return start + timedelta(days=(day - 1 - start.weekday()) % 7)
+
+    def month_bounds(self, year: int, month: int):
+        """获取月份的第一天和最后一天"""
+        return date(year, month, 1), date(year, month, monthrange(year, month)[1])
+
+    def month_weeks(self, year: int, month: int) -> range:
+        """获取月份涉及的周数范围（未截断）"""
+        first_day, last_day = self.month_bounds(year, month)
+        return range(self.week_of(first_day), self.week_of(last_day) + 1)
+
+    def month_days(self, year: int, month: int):
+        """逐日生成(日期, 星期1-7, 周数)"""
+        first_day, last_day = self.month_bounds(year, month)
+        week_day = first_day.weekday()
+        offset = first_day.toordinal() - self._start_ordinal
+        for day_index in range(last_day.day):
+            yield (first_day + timedelta(days=day_index),
+                   (week_day + day_index) % 7 + 1,
+                   (offset + day_index) // 7 + 1)
+
+    def contains(self, value) -> bool:
+        """日期是否在学期内"""
+        return self.start_date <= self._to_date(value) <= self.end_date
@@ -0,0 +1,251 @@
+import hashlib
+import json
+import os
+from collections import defaultdict
+from datetime import timedelta
+from html import escape
+from string import Template
+from logger_config import logger
+from models import TIME_SLOTS, WEEKDAY_NAMES
+
+# 记录已生成文件内容哈希的清单，放在站点目录中
+MANIFEST_NAME = ".site-manifest.json"
+
+STYLE = """body { font-family: "Microsoft YaHei", "PingFang SC", sans-serif; margin: 0; color: #212529; background: #f8f9fa; }
+header { background: #2c3e50; color: #fff; padding: 12px 24px; }
+header a { color: #fff; margin-right: 16px; text-decoration: none; }
+main { padding: 16px 24px; }
+nav.pager { display: flex; justify-content: space-between; margin-bottom: 12px; }
+table { border-collapse: collapse; width: 100%; background: #fff; table-layout: fixed; }
+th, td { border: 1px solid #dee2e6; padding: 6px; vertical-align: top; font-size: 13px; }
+th { background: #e9ecef; }
+td.time { width: 90px; text-align: center; color: #6c757d; }
+.course { border-left: 4px solid #4a90e2; background: #f1f5fb; padding: 4px 6px; margin-bottom: 4px; }
+.course small { display: block; color: #6c757d; }
+.outside { background: #f1f3f5; color: #adb5bd; }
+.count { color: #6c757d; font-size: 12px; }
+ul.links { columns: 4; }
+"""
+
+PAGE = Template("""<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>$title - $semester</title>
+<link rel="stylesheet" href="${root}assets/style.css">
+</head>
+<body>
+<header><strong>$semester</strong> <a href="${root}index.html">首页</a> <a href="${root}data.json">数据</a></header>
+<main>
+<h1>$title</h1>
+$body
+</main>
+</body>
+</html>
+""")
+
+PAGER = Template("""<nav class="pager"><span>$prev</span><span>$next</span></nav>""")
+
+COURSE = Template("""<div class="course" style="border-left-color: $color">$name<small>$time $location</small><small>$teacher</small></div>""")
+
+
+def _link(href: str, text: str) -> str:
+    """生成链接，href为空时只输出文字"""
+    return f'<a href="{escape(href)}">{escape(text)}</a>' if href else ""
+
+
+def _course_html(course) -> str:
+    """课程块"""
+    return COURSE.substitute(color=escape(course.color or "#4a90e2"), name=escape(course.name),
+                             time=escape(course.time_range), location=escape(course.location),
+                             teacher=escape(course.teacher))
+
+
+class SiteGenerator:
+    """把一个学期的课程表生成为静态网站
+
+    只遍历一次学期课程，按(周, 星期)分桶后生成每周、每天、每月的页面和一个data.json；
+    页面模板在模块加载时编译一次，所有页面共用。
+    每个文件的内容哈希记录在清单中，重新生成时只写入内容变化的文件，
+    并删除学期缩短后不再需要的旧页面。
+    """
+
+    def __init__(self, manager, output_dir: str = "site"):
+        self.manager = manager
+        self.output_dir = output_dir
+
+    def generate(self, semester_id: int = None) -> dict:
+        """生成站点，返回写入、未变化和删除的文件数"""
+        if semester_id is None:
+            semester = self.manager.get_current_semester() or (self.manager.get_semesters() or [None])[0]
+        else:
+            semester = self.manager.get_semester(semester_id)
+        if semester is None:
+            raise ValueError("学期不存在，请先创建学期")
+        calendar = self.manager.get_calendar(semester)
+
+        # 唯一一次遍历课程：按(周, 星期)分桶
+        courses = []
+        buckets = defaultdict(list)
+        for course in self.manager.iter_courses(semester[0]):
+            courses.append(course)
+            for week in range(max(course.start_week, 1), min(course.end_week, calendar.total_weeks) + 1):
+                buckets[(week, course.day_of_week)].append(course)
+        for bucket in buckets.values():
+            bucket.sort(key=lambda c: (c.start_minute, c.name))
+
+        files = {"assets/style.css": STYLE, "data.json": self._data_json(semester, calendar, courses, buckets)}
+        files["index.html"] = self._index_page(semester, calendar)
+        for week in range(1, calendar.total_weeks + 1):
+            files[f"week/{week:02d}.html"] = self._week_page(semester, calendar, buckets, week)
+        day = calendar.start_date
+        while day <= calendar.end_date:
+            files[f"day/{day.isoformat()}.html"] = self._day_page(semester, calendar, buckets, day)
+            day += timedelta(days=1)
+        for year, month in self._months(calendar):
+            files[f"month/{year}-{month:02d}.html"] = self._month_page(semester, calendar, buckets, year, month)
+
+        result = self._write(files)
+        logger.info(f"静态站点已生成: {self.output_dir}，写入{result['written']}个文件，"
+                    f"未变化{result['unchanged']}个，删除{result['removed']}个")
+        return result
+
+    @staticmethod
+    def _months(calendar):
+        """学期涉及的(年, 月)"""
+        year, month = calendar.start_date.year, calendar.start_date.month
+        while (year, month) <= (calendar.end_date.year, calendar.end_date.month):
+            yield year, month
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+    def _data_json(self, semester, calendar, courses, buckets) -> str:
+        """预先计算好的站点数据：课程列表和每周每天的课程id"""
+        weeks = defaultdict(dict)
+        for (week, day), bucket in sorted(buckets.items()):
+            weeks[str(week)][str(day)] = [course.id for course in bucket]
+        data = {
+            "semester": {"id": semester[0], "name": semester[1], "start_date": semester[2],
+                         "end_date": semester[3], "total_weeks": calendar.total_weeks},
+            "courses": [{"id": c.id, "name": c.name, "teacher": c.teacher, "location": c.location,
+                         "start_week": c.start_week, "end_week": c.end_week, "day_of_week": c.day_of_week,
+                         "start_time": c.start_time, "end_time": c.end_time, "color": c.color,
+                         "course_type": c.course_type} for c in sorted(courses, key=lambda c: c.id)],
+            "weeks": weeks,
+        }
+        return json.dumps(data, ensure_ascii=False, indent=1)
+
+    def _page(self, semester, title: str, body: str, root: str = "../") -> str:
+        """套用页面模板"""
+        return PAGE.substitute(title=escape(title), semester=escape(semester[1]), root=root, body=body)
+
+    def _index_page(self, semester, calendar) -> str:
+        """首页：各周和各月的链接"""
+        weeks = "".join(f"<li>{_link(f'week/{w:02d}.html', f'第{w}周')}</li>"
+                        for w in range(1, calendar.total_weeks + 1))
+        months = "".join(f"<li>{_link(f'month/{y}-{m:02d}.html', f'{y}年{m}月')}</li>"
+                         for y, m in self._months(calendar))
+        body = (f"<p>{escape(semester[2])} ~ {escape(semester[3])}，共{calendar.total_weeks}周</p>"
+                f"<h2>周课表</h2><ul class=\"links\">{weeks}</ul><h2>月历</h2><ul class=\"links\">{months}</ul>")
+        return self._page(semester, "课程表", body, root="")
+
+    def _week_page(self, semester, calendar, buckets, week: int) -> str:
+        """周课表：标准节次为行，星期为列，非标准时间的课程追加为单独的行"""
+        cells_by_slot = defaultdict(list)
+        for day in range(1, 8):
+            for course in buckets.get((week, day), ()):
+                cells_by_slot[(course.start_time, course.end_time, day)].append(course)
+        slots = set(TIME_SLOTS) | {(start, end) for start, end, _ in cells_by_slot}
+        dates = [calendar.date_of(week, day) for day in range(1, 8)]
+        header = "".join(f"<th>{_link(f'../day/{d.isoformat()}.html', f'{name} {d.month}/{d.day}')}</th>"
+                         if calendar.contains(d) else f"<th>{name} {d.month}/{d.day}</th>"
+                         for name, d in zip(WEEKDAY_NAMES, dates))
+        rows = []
+        for start, end in sorted(slots):
+            cells = []
+            for day in range(1, 8):
+                cell = cells_by_slot.get((start, end, day), ())
+                cells.append(f"<td>{''.join(_course_html(c) for c in cell)}</td>")
+            rows.append(f"<tr><td class=\"time\">{escape(start)}<br>{escape(end)}</td>{''.join(cells)}</tr>")
+        pager = PAGER.substitute(
+            prev=_link(f"{week - 1:02d}.html" if week > 1 else "", f"« 第{week - 1}周"),
+            next=_link(f"{week + 1:02d}.html" if week < calendar.total_weeks else "", f"第{week + 1}周 »"))
+        body = f"{pager}<table><tr><th class=\"time\">时间</th>{header}</tr>{''.join(rows)}</table>"
+        return self._page(semester, f"第{week}周", body)
+
+    def _day_page(self, semester, calendar, buckets, day) -> str:
+        """日课表：当天课程按开始时间排列"""
+        week = calendar.week_of(day)
+        courses = buckets.get((week, day.weekday() + 1), ())
+        previous, following = day - timedelta(days=1), day + timedelta(days=1)
+        pager = PAGER.substitute(
+            prev=_link(f"{previous.isoformat()}.html" if calendar.contains(previous) else "", "« 前一天"),
+            next=_link(f"{following.isoformat()}.html" if calendar.contains(following) else "", "后一天 »"))
+        items = "".join(_course_html(c) for c in courses) or "<p class=\"count\">今天没有课程</p>"
+        body = f"{pager}<p>{_link(f'../week/{week:02d}.html', f'第{week}周')}</p>{items}"
+        return self._page(semester, f"{day.year}年{day.month}月{day.day}日 {WEEKDAY_NAMES[day.weekday()]}", body)
+
+    def _month_page(self, semester, calendar, buckets, year: int, month: int) -> str:
+        """月历：每天显示课程数和课程名，学期外的日期置灰"""
+        rows, cells = [], []
+        days = list(calendar.month_days(year, month))
+        cells.extend("<td class=\"outside\"></td>" for _ in range(days[0][1] - 1))
+        for current, weekday, week in days:
+            if calendar.contains(current):
+                courses = buckets.get((week, weekday), ())
+                names = "".join(f"<div>{escape(c.name)}</div>" for c in courses)
+                cells.append(f"<td>{_link(f'../day/{current.isoformat()}.html', str(current.day))} "
+                             f"<span class=\"count\">{len(courses)}节</span>{names}</td>")
+            else:
+                cells.append(f"<td class=\"outside\">{current.day}</td>")
+            if weekday == 7:
+                rows.append(f"<tr>{''.join(cells)}</tr>")
+                cells = []
+        if cells:
+            cells.extend("<td class=\"outside\"></td>" for _ in range(7 - len(cells)))
+            rows.append(f"<tr>{''.join(cells)}</tr>")
+        header = "".join(f"<th>{name}</th>" for name in WEEKDAY_NAMES)
+        body = f"<table><tr>{header}</tr>{''.join(rows)}</table>"
+        return self._page(semester, f"{year}年{month}月", body)
+
+    def _write(self, files: dict) -> dict:
+        """只写入内容哈希变化的文件，删除清单中已不再生成的文件"""
+        manifest_path = os.path.join(self.output_dir, MANIFEST_NAME)
+        try:
+            with open(manifest_path, encoding="utf-8") as f:
+                old = json.load(f).get("files", {})
+        except (OSError, ValueError):
+            old = {}
+
+        hashes, written, unchanged = {}, 0, 0
+        for name, content in files.items():
+            data = content.encode("utf-8")
+            digest = hashlib.sha1(data).hexdigest()
+            hashes[name] = digest
+            path = os.path.join(self.output_dir, *name.split("/"))
+            if old.get(name) == digest and os.path.exists(path):
+                unchanged += 1
+                continue
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+            written += 1
+
+        removed = 0
+        for name in set(old) - set(hashes):
+            path = os.path.join(self.output_dir, *name.split("/"))
+            if os.path.exists(path):
+                os.remove(path)
+                removed += 1
+
+        if hashes != old:
+            with open(manifest_path, "w", encoding="utf-8") as f:
+                json.dump({"files": hashes}, f, ensure_ascii=False, indent=1, sort_keys=True)
+        return {"written": written, "unchanged": unchanged, "removed": removed, "total": len(files)}
+
+
+def generate_site(manager, output_dir: str = "site", semester_id: int = None) -> dict:
+    """生成学期课程表静态站点"""
+    return SiteGenerator(manager, output_dir).generate(semester_id)
@@ -0,0 +1,193 @@
+import math
+import threading
+from collections import Counter
+from models import Course, minutes_to_time, time_period
+from free_time_index import FreeTimeIndex
+from conflicts import ConflictIndex
+
+
+def _tenths(course: Course) -> int:
+    """单次课时长，单位为0.1小时（与Course.duration_hours一致）"""
+    return int(round(course.duration_hours * 10))
+
+
+def _hours(tenths: int) -> float:
+    """0.1小时单位转换为小时"""
+    return tenths / 10
+
+
+class SemesterStats:
+    """单个学期的统计聚合
+
+    每门课程对各项统计和索引的贡献可以单独加上或减去，
+    添加、修改、删除课程时只需按差量更新，读取统计为O(1)。
+    学时以0.1小时为单位的整数累计，反复增减不会产生浮点误差。
+    """
+
+    def __init__(self, semester_id, total_weeks: int = 0):
+        self.semester_id = semester_id
+        self.total_weeks = total_weeks
+        self.course_count = 0
+        self.normal_count = 0
+        self.name_counts = Counter()      # 正常课程名称 -> 门数
+        self.type_counts = Counter()      # 课程类型 -> 门数
+        self.type_tenths = Counter()      # 课程类型 -> 学期学时
+        self.week_counts = Counter()      # 周 -> 课次
+        self.week_tenths = Counter()      # 周 -> 学时
+        self.day_counts = Counter()       # 星期 -> 门数
+        self.day_tenths = Counter()       # 星期 -> 学期学时
+        self.time_counts = Counter()      # (开始分钟, 结束分钟) -> 门数
+        self.time_tenths = Counter()      # (开始分钟, 结束分钟) -> 学期学时
+        self.density = Counter()          # (周, 星期) -> 课次
+        self.free_time = FreeTimeIndex()  # 空闲时间位图索引
+        self.conflicts = ConflictIndex()  # 时间冲突区间索引
+        self.changes = 0                  # 上次一致性检查后的差量更新次数
+
+    @classmethod
+    def from_courses(cls, semester_id, courses, total_weeks: int = 0) -> "SemesterStats":
+        """根据课程列表完整构建"""
+        stats = cls(semester_id, total_weeks)
+        for course in courses:
+            stats.apply(course)
+        stats.changes = 0
+        return stats
+
+    def apply(self, course: Course, sign: int = 1):
+        """加上(sign=1)或减去(sign=-1)一门课程的贡献"""
+        tenths = _tenths(course)
+        weeks = range(course.start_week, course.end_week + 1)
+        total = tenths * len(weeks)
+        time_key = (course.start_minute, course.end_minute)
+
+        self.course_count += sign
+        if not course.is_special:
+            self.normal_count += sign
+            self.name_counts[course.name] += sign
+        self.type_counts[course.course_type] += sign
+        self.type_tenths[course.course_type] += sign * total
+        self.day_counts[course.day_of_week] += sign
+        self.day_tenths[course.day_of_week] += sign * total
+        self.time_counts[time_key] += sign
+        self.time_tenths[time_key] += sign * total
+        for week in weeks:
+            self.week_counts[week] += sign
+            self.week_tenths[week] += sign * tenths
+            self.density[(week, course.day_of_week)] += sign
+        self.free_time.apply(course, sign)
+        self.conflicts.apply(course, sign)
+        self.changes += 1
+
+    def add(self, course: Course):
+        """加上一门课程的贡献"""
+        self.apply(course, 1)
+
+    def remove(self, course: Course):
+        """减去一门课程的贡献"""
+        self.apply(course, -1)
+
+    def overview(self) -> dict:
+        """总体课程数量统计"""
+        return {
+            'total': self.course_count,
+            'normal': self.normal_count,
+            'kinds': sum(1 for count in self.name_counts.values() if count > 0),
+            'types': {t: count for t, count in self.type_counts.items() if count > 0},
+        }
+
+    def statistics(self) -> dict:
+        """汇总为学习统计数据，格式与OccupancyTensor.statistics一致"""
+        active_weeks = sorted(w for w, count in self.week_counts.items() if count > 0)
+        weeks = max([self.total_weeks, 1] + active_weeks[-1:])
+
+        monthly = Counter()
+        for week in active_weeks:
+            monthly[(week - 1) // 4 + 1] += self.week_tenths[week]  # 假设每月4周
+
+        times = sorted(key for key, count in self.time_counts.items() if count > 0)
+        study_patterns = {}
+        for start_minute, end_minute in times:
+            period = time_period(start_minute)
+            study_patterns[period] = study_patterns.get(period, 0.0) + _hours(
+                self.time_tenths[(start_minute, end_minute)])
+
+        types = sorted(t for t, count in self.type_counts.items() if count > 0)
+        return {
+            'total_courses': self.course_count,
+            'total_hours': _hours(sum(self.type_tenths[t] for t in types)),
+            'total_weeks': weeks,
+            'course_types': {
+                t: {'count': self.type_counts[t], 'hours': _hours(self.type_tenths[t])} for t in types
+            },
+            'weekly_hours': {w: _hours(self.week_tenths[w]) for w in active_weeks},
+            'daily_hours': {d: _hours(self.day_tenths[d])
+                            for d in sorted(self.day_counts) if self.day_counts[d] > 0},
+            'time_distribution': {
+                f"{minutes_to_time(s)}-{minutes_to_time(e)}": _hours(self.time_tenths[(s, e)])
+                for s, e in times
+            },
+            'monthly_hours': {m: _hours(monthly[m]) for m in sorted(monthly)},
+            'course_density': [[self.density.get((w, d), 0) for w in range(1, weeks + 1)]
+                               for d in range(1, 8)],
+            'study_patterns': study_patterns,
+        }
+
+
+def statistics_equal(left, right) -> bool:
+    """比较两份统计数据，学时允许浮点误差"""
+    if isinstance(left, dict) and isinstance(right, dict):
+        return left.keys() == right.keys() and all(statistics_equal(left[k], right[k]) for k in left)
+    if isinstance(left, list) and isinstance(right, list):
+        return len(left) == len(right) and all(statistics_equal(a, b) for a, b in zip(left, right))
+    if isinstance(left, float) or isinstance(right, float):
+        return math.isclose(left, right, rel_tol=1e-9, abs_tol=1e-6)
+    return left == right
+
+
+class StatsStore:
+    """按学期保存统计聚合
+
+    聚合在首次读取时构建，之后由写操作按差量维护；
+    差量更新累计达到verify_every次后，下次读取前做一次完整重算校验。
+    """
+
+    def __init__(self, verify_every: int = 200):
+        self.verify_every = verify_every
+        self._stats = {}
+        # 写数据库和更新聚合需在同一把锁内完成，避免并发构建时重复计入
+        self.lock = threading.RLock()
+
+    def get(self, semester_id, loader) -> SemesterStats:
+        """获取学期统计聚合，不存在时调用loader构建"""
+        with self.lock:
+            stats = self._stats.get(semester_id)
+            if stats is None:
+                stats = loader()
+                self._stats[semester_id] = stats
+            return stats
+
+    def needs_verify(self, semester_id) -> bool:
+        """学期统计聚合是否需要做一致性检查"""
+        stats = self._stats.get(semester_id)
+        return stats is not None and stats.changes >= self.verify_every
+
+    def add(self, course: Course):
+        """课程写入后加上其贡献，对应学期未构建时跳过"""
+        with self.lock:
+            stats = self._stats.get(course.semester_id)
+            if stats is not None:
+                stats.add(course)
+
+    def remove(self, course: Course):
+        """课程删除或修改前减去其贡献，对应学期未构建时跳过"""
+        with self.lock:
+            stats = self._stats.get(course.semester_id)
+            if stats is not None:
+                stats.remove(course)
+
+    def drop(self, semester_id=None):
+        """丢弃学期统计聚合，semester_id为空时全部丢弃"""
+        with self.lock:
+            if semester_id is None:
+                self._stats.clear()
+            else:
+                self._stats.pop(semester_id, None)
@@ -0,0 +1,72 @@
+import csv
+import json
+from typing import Iterable
+from models import Course
+
+# CSV表头，与课程字段一一对应
+CSV_HEADERS = ["课程名称", "任课老师", "上课地点", "开始周数", "结束周数",
+               "星期", "上课时间", "课程类型", "学期"]
+
+
+def course_to_row(course: Course) -> list:
+    """课程转换为CSV行"""
+    return [course.name, course.teacher, course.location, course.start_week, course.end_week,
+            course.weekday_name, course.time_range, course.course_type, course.semester_id]
+
+
+def course_to_dict(course: Course) -> dict:
+    """课程转换为JSON对象"""
+    return {
+        "name": course.name,
+        "teacher": course.teacher,
+        "location": course.location,
+        "start_week": course.start_week,
+        "end_week": course.end_week,
+        "day_of_week": course.weekday_name,
+        "time": course.time_range,
+        "course_type": course.course_type,
+        "semester": course.semester_id
+    }
+
+
+def write_csv(courses: Iterable[Course], stream) -> int:
+    """逐行写出CSV，返回写出的课程数"""
+    writer = csv.writer(stream)
+    writer.writerow(CSV_HEADERS)
+    count = 0
+    for course in courses:
+        writer.writerow(course_to_row(course))
+        count += 1
+    return count
+
+
+def write_json(courses: Iterable[Course], stream) -> int:
+    """逐个写出JSON数组元素，格式与json.dump(indent=2)相同，返回写出的课程数"""
+    count = 0
+    for course in courses:
+        item = json.dumps(course_to_dict(course), ensure_ascii=False, indent=2)
+        stream.write(("[\n  " if count == 0 else ",\n  ") + item.replace("\n", "\n  "))
+        count += 1
+    stream.write("\n]" if count else "[]")
+    return count
+
+
+def write_ndjson(courses: Iterable[Course], stream) -> int:
+    """每行写出一个JSON对象，返回写出的课程数"""
+    count = 0
+    for course in courses:
+        stream.write(json.dumps(course_to_dict(course), ensure_ascii=False))
+        stream.write("\n")
+        count += 1
+    return count
+
+
+WRITERS = {"csv": write_csv, "json": write_json, "ndjson": write_ndjson}
+
+
+def write_courses(courses: Iterable[Course], format: str, stream) -> int:
+    """按格式把课程流式写入任意文本流，返回写出的课程数"""
+    writer = WRITERS.get(format)
+    if writer is None:
+        raise ValueError(f"不支持流式导出的格式: {format}")
+    return writer(courses, stream)
@@ -1,9 +1,9 @@
 import ttkbootstrap as tb
 from ttkbootstrap.constants import *
-from tkinter import messagebox
+from tkinter import messagebox, simpledialog
 from logger_config import logger
 from course_manager import SpecialCourse
-from datetime import datetime, timedelta
+from collections import Counter
 
 class TopBar:
     def __init__(self, parent, app):
@@ -55,11 +55,26 @@ class TopBar:
         tb.Label(time_frame, text="当前时间", 
                 font=("Helvetica", 10)).pack(side=LEFT, padx=(0, 5))
         self.time_var = tb.IntVar(value=1)
-        self.time_spinbox = tb.Spinbox(time_frame, from_=1, to=20, width=5,
+        self.time_spinbox = tb.Spinbox(time_frame, from_=1, to=self.app.total_weeks, width=5,
                                     textvariable=self.time_var, 
                                     command=self.app.on_time_change)
         self.time_spinbox.pack(side=LEFT, padx=5)
 
+        # 档案切换区域
+        profile_frame = tb.Frame(basic_frame)
+        profile_frame.pack(side=LEFT, padx=10)
+
+        tb.Label(profile_frame, text="档案",
+                font=("Helvetica", 10)).pack(side=LEFT, padx=(0, 5))
+        self.profile_combo = tb.Combobox(profile_frame, state="readonly", width=12)
+        self.profile_combo.pack(side=LEFT, padx=5)
+        self.profile_combo.bind('<<ComboboxSelected>>',
+                                lambda e: self.app.switch_profile(self.profile_combo.get()))
+        tb.Button(profile_frame, text="➕", width=3,
+                command=self.show_add_profile_dialog,
+                bootstyle=(SUCCESS, OUTLINE)).pack(side=LEFT)
+        self.refresh_profiles()
+
         # 视图切换区域
         view_frame = tb.Frame(basic_frame)
         view_frame.pack(side=RIGHT, padx=10)
@@ -123,7 +138,7 @@ class TopBar:
                     width=12).pack(side=LEFT, padx=5)
 
         # 学期管理标签页
-        semester_frame = tb.Frame(control_notebook, padding=10)
+        semester_frame = self.semester_tab = tb.Frame(control_notebook, padding=10)
         control_notebook.add(semester_frame, text="📚 学期管理")
 
         # 学期管理按钮区域
@@ -173,23 +188,48 @@ class TopBar:
         
         tb.Label(semester_frame, text="学期:").pack(side=LEFT)
         self.semester_var = tb.StringVar()
-        semester_combo = tb.Combobox(semester_frame, textvariable=self.semester_var,
+        semester_combo = self.semester_combo = tb.Combobox(
+                                semester_frame, textvariable=self.semester_var,
                                 values=[s[1] for s in self.app.semesters],
                                 state="readonly", width=15)
         semester_combo.pack(side=LEFT, padx=5)
         semester_combo.set(self.app.current_semester[1])
         semester_combo.bind('<<ComboboxSelected>>', self.on_semester_change)
 
+    def refresh_profiles(self):
+        """刷新档案列表并选中当前档案"""
+        self.profile_combo['values'] = self.app.profiles.list_profiles()
+        self.profile_combo.set(self.app.current_profile)
+
+    def show_add_profile_dialog(self):
+        """新建档案"""
+        name = simpledialog.askstring("新建档案", "请输入档案名称（如班级或学生姓名）:",
+                                      parent=self.parent)
+        if name and name.strip():
+            self.app.create_profile(name)
+
+    def refresh_semester_selector(self):
+        """切换档案后刷新学期选择器"""
+        if not hasattr(self, 'semester_combo'):
+            if self.app.current_semester:
+                self._create_semester_selector(self.semester_tab)
+            return
+        self.semester_combo['values'] = [s[1] for s in self.app.semesters]
+        self.semester_combo.set(self.app.current_semester[1] if self.app.current_semester else '')
+
     def on_semester_change(self, event):
         """学期切换事件"""
         selected_name = event.widget.get()
         try:
             for semester in self.app.semesters:
                 if semester[1] == selected_name:
-                    self.app.course_manager.set_current_semester(semester[0])
+                    # 工作线程按提交顺序执行，课程加载在当前学期写入之后进行
+                    self.app.db_worker.submit(
+                        self.app.course_manager.set_current_semester, semester[0],
+                        error_callback=lambda e: messagebox.showerror("错误", f"切换学期失败: {str(e)}"))
                     self.app.current_semester = semester
-                    self.app.load_courses()
-                    self.app.update_display()
+                    self.app.refresh_week_range()
+                    self.app.load_courses(self.app.update_display)
                     logger.info(f"已切换到学期: {selected_name}")
                     break
         except Exception as e:
@@ -202,8 +242,7 @@ class TopBar:
         dialog = AddSemesterDialog(self.parent, self.app)
         # 等待对话框关闭
         self.parent.wait_window(dialog.dialog)
-        # 刷新学期列表
-        self.app.semesters = self.app.course_manager.get_semesters()
+        # 学期列表已由对话框在保存完成后刷新
         if hasattr(self, 'semester_var'):
             self.semester_var.set('')
             # 获取 Combobox 组件的正确方式
@@ -218,8 +257,7 @@ class TopBar:
             self._create_semester_selector(self.parent.winfo_children()[0])
 
     def _refresh_semester_list(self):
-        """刷新学期列表"""
-        self.app.semesters = self.app.course_manager.get_semesters()
+        """用对话框保存后更新的学期列表刷新选择器"""
         if hasattr(self, 'semester_var'):
             self.semester_var.set('')
             # 获取 Combobox 组件的正确方式
@@ -241,7 +279,7 @@ class TopBar:
         """显示导出对话框"""
         dialog = tb.Toplevel(self.parent)
         dialog.title("导出课程")
-        dialog.geometry("400x420")
+        dialog.geometry("400x450")
         dialog.transient(self.parent)
         dialog.grab_set()
 
@@ -257,7 +295,8 @@ class TopBar:
             ("Excel表格 (.xlsx)", "excel"),
             ("CSV文件 (.csv)", "csv"),
             ("JSON文件 (.json)", "json"),
-            ("PDF文件 (.pdf)", "pdf")
+            ("PDF文件 (.pdf)", "pdf"),
+            ("日历文件 (.ics)", "ics")
         ]
         
         for text, value in formats:
@@ -281,7 +320,7 @@ class TopBar:
                 bootstyle=SUCCESS).pack(side=RIGHT, padx=5)
 
     def do_export(self, dialog):
-        """执行导出操作"""
+        """在后台执行导出，导出期间界面保持可用"""
         try:
             format = self.export_format.get()
             filename = self.filename_entry.get().strip()
@@ -292,12 +331,9 @@ class TopBar:
                 messagebox.showwarning("提示", "没有可导出的课程")
                 return
                 
-            # 执行导出
-            if self.app.course_manager.export_courses(courses, format, filename):
-                messagebox.showinfo("成功", "课程导出成功！")
-                dialog.destroy()
-            else:
-                messagebox.showerror("错误", "课程导出失败")
+            # 提交导出任务，进度显示在窗口底部，完成后弹出通知
+            self.app.submit_export(f"导出{format}", list(courses), format, filename)
+            dialog.destroy()
         except Exception as e:
             logger.error(f"导出课程失败: {str(e)}")
             messagebox.showerror("错误", f"导出失败: {str(e)}")
@@ -311,6 +347,63 @@ class TopBar:
         """显示学习报告对话框"""
         from dialogs import StudyReportDialog
         StudyReportDialog(self.parent, self.app)
+def show_toast(title, message, bootstyle=SUCCESS, duration=5000):
+    """在屏幕角落显示不阻塞界面的通知"""
+    from ttkbootstrap.toast import ToastNotification
+    ToastNotification(title=title, message=message, duration=duration,
+                      bootstyle=bootstyle).show_toast()
+
+
+def notify_job_result(job):
+    """导出任务结束后弹出通知"""
+    from export_jobs import DONE, CANCELLED
+    if job.status == DONE:
+        show_toast(f"{job.title}完成", f"已保存到: {job.result}\n用时{job.seconds:.1f}秒")
+    elif job.status == CANCELLED:
+        show_toast(f"{job.title}已取消", "未完成的文件已删除", bootstyle=SECONDARY)
+    else:
+        show_toast(f"{job.title}失败", job.message, bootstyle=DANGER)
+
+
+class ExportJobPanel:
+    """导出任务进度栏：每个进行中的任务一行，显示进度并可取消"""
+
+    def __init__(self, parent, app):
+        self.parent = parent
+        self.app = app
+        self.rows = {}
+        self.frame = tb.Frame(parent)
+        self.frame.pack(side=BOTTOM, fill=X)
+        app.export_jobs.add_listener(self.update_jobs)
+
+    def _create_row(self, job):
+        """创建任务进度行"""
+        row = tb.Frame(self.frame, padding=(0, 5, 0, 0))
+        row.pack(fill=X)
+        label = tb.Label(row, width=40, anchor="w")
+        label.pack(side=LEFT)
+        bar = tb.Progressbar(row, maximum=100, bootstyle=(SUCCESS, STRIPED))
+        bar.pack(side=LEFT, fill=X, expand=True, padx=10)
+        button = tb.Button(row, text="取消", command=lambda: self.app.export_jobs.cancel(job.id),
+                           bootstyle=(DANGER, OUTLINE))
+        button.pack(side=RIGHT)
+        self.rows[job.id] = {"frame": row, "label": label, "bar": bar, "button": button}
+        return self.rows[job.id]
+
+    def update_jobs(self, jobs):
+        """按任务列表刷新进度行，已结束的任务移除"""
+        current = {job.id for job in jobs}
+        for job_id in list(self.rows):
+            if job_id not in current:
+                self.rows.pop(job_id)["frame"].destroy()
+        for job in jobs:
+            row = self.rows.get(job.id) or self._create_row(job)
+            row["label"].config(text=f"{job.title}: {job.message}")
+            row["bar"]["value"] = job.progress * 100
+            if job.cancelled or not job.active:
+                row["button"].config(state=DISABLED)
+
+
 class StatsPanel:
     def __init__(self, parent, app):
         self.parent = parent
@@ -328,72 +421,102 @@ class StatsPanel:
         style.configure("Stats.TLabelframe", background="#f8f9fa", relief="flat")
         style.configure("Stats.TLabelframe.Label", font=("Helvetica", 12, "bold"))
 
-    def update_stats(self, courses, current_week, course_manager, view_type="week", current_date=None):
-        """更新统计信息"""
+    def update_stats(self, courses, current_week, course_manager, view_type="week", current_date=None,
+                     search_query=None):
+        """更新统计信息，统计数据在后台线程中查询，完成后再渲染
+
+        search_query为当前搜索关键词，courses是搜索结果时总体信息按courses统计。
+        """
+        semester_id = self.app.current_semester[0] if self.app.current_semester else None
+        # 同一时间只渲染最新一次请求的统计，切换视图或翻页后旧的结果会被丢弃
+        self.app.db_worker.submit(self._load_stats, courses, current_week, course_manager, semester_id,
+                                  self.app.calendar, view_type, current_date, search_query,
+                                  channel="stats_panel", callback=self._render_stats)
+
+    def _load_stats(self, courses, current_week, course_manager, semester_id, calendar, view_type, current_date,
+                    search_query=None):
+        """在数据库工作线程中查询统计数据"""
+        if not courses or semester_id is None:
+            return None
+
+        # 根据视图类型获取对应的课程和空闲时间
+        if view_type == "day":
+            # 获取当天课程时需要同时考虑星期和周数
+            day = current_date.weekday() + 1
+            view_courses = [c for c in courses if c.occurs_on(day, current_week)]
+            title = "当日信息"
+            free = {"free_time": course_manager.get_free_hours(current_week, semester_id, day),
+                    "free_slots": course_manager.get_free_time_slots(day, current_week, semester_id)}
+        elif view_type == "month":
+            year, month = current_date.year, current_date.month
+            # 获取该月份的所有课程
+            view_courses = []
+            for week in calendar.month_weeks(year, month):
+                view_courses.extend(course_manager.get_courses_by_week(week, semester_id))
+            title = f"{month}月信息"
+            free = course_manager.get_month_free_time_slots(year, month, semester_id)
+        else:  # week
+            view_courses = course_manager.get_courses_by_week(current_week, semester_id)
+            title = "本周信息"
+            # 只有当天完全没课才算空闲
+            free = {"free_time": course_manager.get_free_hours(current_week, semester_id),
+                    "free_days": course_manager.get_free_days(current_week, semester_id)}
+
+        # 课程列表是整个学期时直接使用学期聚合；搜索时总体信息按搜索结果统计
+        if search_query is None:
+            overview = course_manager.get_stats_overview(semester_id)
+        else:
+            overview = {
+                'total': len(courses),
+                'normal': sum(1 for c in courses if not c.is_special),
+                'kinds': len(set(c.name for c in courses if not c.is_special)),
+                'types': dict(Counter(c.course_type for c in courses)),
+            }
+
+        return {"view_type": view_type, "title": title, "view_courses": view_courses, "free": free,
+                "overview": overview}
+
+    def _render_stats(self, data):
+        """用查询完成的统计数据渲染统计面板"""
         try:
             # 清空现有统计信息
             for widget in self.stats_frame.winfo_children():
                 widget.destroy()
 
-            if not courses:
+            if data is None:
                 tb.Label(self.stats_frame, text="暂无课程数据", 
                         font=("Helvetica", 12),
                         bootstyle=SECONDARY).pack(expand=True)
                 return
 
-            # 根据视图类型获取对应的课程
-            if view_type == "day":
-                # 获取当天课程时需要同时考虑星期和周数
-                view_courses = [c for c in courses 
-                            if int(c[6]) == current_date.weekday() + 1 and
-                            int(c[4]) <= current_week <= int(c[5])]
-                title = "当日信息"
-            elif view_type == "month":
-                year, month = current_date.year, current_date.month
-                # 获取月份的第一天和最后一天
-                first_day = datetime(year, month, 1)
-                last_day = datetime(year, month + 1, 1) - timedelta(days=1) if month < 12 else datetime(year, 12, 31)
-                
-                # 计算月份的第一天和最后一天对应的周数
-                start_week = ((first_day - datetime.strptime(self.app.current_semester[2], "%Y-%m-%d")).days // 7) + 1
-                end_week = ((last_day - datetime.strptime(self.app.current_semester[2], "%Y-%m-%d")).days // 7) + 1
-                
-                # 获取该月份的所有课程
-                view_courses = []
-                for week in range(start_week, end_week + 1):
-                    week_courses = course_manager.get_courses_by_week(week)
-                    view_courses.extend([c for c in week_courses if str(c[12]) == str(self.app.current_semester[0])])
-                
-                title = f"{month}月信息"
-            else:  # week
-                view_courses = course_manager.get_courses_by_week(current_week)
-                title = "本周信息"
+            view_type, title, view_courses = data["view_type"], data["title"], data["view_courses"]
 
             # 计算总体统计
             overall_frame = tb.LabelFrame(self.stats_frame, text="总体信息", padding=10)
             overall_frame.pack(fill=X, pady=5)
             
+            overview = data["overview"]
             overall_stats = {
                 "total": {
                     "text": "总课程数",
-                    "value": len(courses),
+                    "value": overview['total'],
                     "style": "primary"
                 },
                 "normal": {
                     "text": "正常课程",
-                    "value": len([c for c in courses if not c[11]]),
+                    "value": overview['normal'],
                     "style": "info"
                 },
                 "types": {
                     "text": "课程种类",
-                    "value": len(set(c[1] for c in courses if not c[11])),
+                    "value": overview['kinds'],
                     "style": "success"
                 }
             }
 
             # 添加特殊课程统计
             for course_type in SpecialCourse.TYPES:
-                overall_count = len([c for c in courses if c[10] == course_type])
+                overall_count = overview['types'].get(course_type, 0)
                 if overall_count > 0:
                     overall_stats[course_type] = {
                         "text": course_type,
@@ -418,19 +541,19 @@ class StatsPanel:
                 },
                 "normal": {
                     "text": "正常课程",
-                    "value": len([c for c in view_courses if not c[11]]),
+                    "value": len([c for c in view_courses if not c.is_special]),
                     "style": "info"
                 },
                 "types": {
                     "text": "课程种类",
-                    "value": len(set(c[1] for c in view_courses if not c[11])),
+                    "value": len(set(c.name for c in view_courses if not c.is_special)),
                     "style": "success"
                 }
             }
 
             # 添加特殊课程统计
             for course_type in SpecialCourse.TYPES:
-                view_count = len([c for c in view_courses if c[10] == course_type])
+                view_count = len([c for c in view_courses if c.course_type == course_type])
                 if view_count > 0:
                     view_stats[course_type] = {
                         "text": course_type,
@@ -447,9 +570,9 @@ class StatsPanel:
             separator.pack(fill=X, pady=5)
 
             if view_type == "day":
-                # 获取当天的空闲时间
-                free_slots = course_manager.get_free_time_slots(current_date.weekday() + 1, current_week)
-                free_time = sum(self._calculate_duration(start, end) for start, end in free_slots)
+                # 当天的空闲时间
+                free_slots = data["free"]["free_slots"]
+                free_time = data["free"]["free_time"]
                 
                 # 第一行：空闲时长
                 time_frame = tb.Frame(view_frame)
@@ -475,23 +598,9 @@ class StatsPanel:
                             bootstyle=WARNING).pack()
                     
             elif view_type == "week":
-                # 获取一周的空闲时间统计
-                week_free_slots = course_manager.get_week_free_time_slots(current_week)
-                total_free_time = 0
-                free_days = 0
-                
-                for day, slots in week_free_slots.items():
-                    # 只有当天完全没课才算空闲
-                    day_courses = [c for c in courses 
-                                if int(c[6]) == day and 
-                                int(c[4]) <= current_week <= int(c[5])]
-                    
-                    if not day_courses:  # 如果当天没有任何课程
-                        free_days += 1
-                    
-                    # 计算当天的空闲时间（所有空闲时间段）
-                    day_free_time = sum(self._calculate_duration(start, end) for start, end in slots)
-                    total_free_time = round(total_free_time + day_free_time, 1)  # 确保每次累加都进行精度处理
+                # 一周的空闲时间统计
+                total_free_time = data["free"]["free_time"]
+                free_days = data["free"]["free_days"]
                 
                 # 第一行：空闲时长
                 time_frame = tb.Frame(view_frame)
@@ -509,8 +618,8 @@ class StatsPanel:
                         font=("Helvetica", 9),
                         bootstyle=INFO).pack()
             else:  # month
-                # 获取月份的空闲时间统计
-                month_stats = course_manager.get_month_free_time_slots(current_date.year, current_date.month)
+                # 月份的空闲时间统计
+                month_stats = data["free"]
                 
                 # 第一行：空闲时长
                 time_frame = tb.Frame(view_frame)
@@ -533,103 +642,6 @@ class StatsPanel:
         except Exception as e:
             logger.error(f"更新统计信息失败: {str(e)}")
             raise
-    def _calculate_duration(self, start_time: str, end_time: str) -> float:
-        """计算时间段长度（小时）"""
-        try:
-            start = datetime.strptime(start_time, "%H:%M")
-            end = datetime.strptime(end_time, "%H:%M")
-            # 先计算分钟数，再转换为小时，避免浮点数精度问题
-            minutes = int((end - start).total_seconds() / 60)
-            hours = minutes / 60
-            return round(hours, 1)  # 转换为小时并保留一位小数
-        except Exception as e:
-            logger.error(f"计算时间段长度失败: {str(e)}")
-            return 0.0
-    def _is_course_in_month(self, course, year, month, current_date):
-        """判断课程是否在指定月份内"""
-        try:
-            # 获取月份第一天和最后一天
-            first_day = datetime(year, month, 1)
-            last_day = datetime(year, month + 1, 1) - timedelta(days=1) if month < 12 else datetime(year, 12, 31)
-            
-            # 计算当前日期对应的周数
-            course_week = ((current_date - datetime.strptime(self.app.current_semester[2], "%Y-%m-%d")).days // 7) + 1
-            
-            # 检查课程是否在月份范围内
-            return (int(course[4]) <= course_week <= int(course[5]) and 
-                    first_day <= current_date <= last_day)
-        except Exception as e:
-            logger.error(f"判断课程月份失败: {str(e)}")
-            return False
-
-    def _calculate_stats(self, courses, current_week, course_manager):
-        """计算统计信息"""
-        # 获取本周课程
-        week_courses = course_manager.get_courses_by_week(current_week)
-        
-        # 计算总体统计
-        overall_stats = {
-            "total": {
-                "text": "总课程数",
-                "value": len(courses),
-                "style": "primary"
-            },
-            "normal": {
-                "text": "正常课程",
-                "value": len([c for c in courses if not c[11]]),
-                "style": "info"
-            },
-            "types": {
-                "text": "课程种类",
-                "value": len(set(c[1] for c in courses if not c[11])),
-                "style": "success"
-            }
-        }
-        
-        # 计算本周统计
-        weekly_stats = {
-            "total": {
-                "text": "本周课程",
-                "value": len(week_courses),
-                "style": "primary"
-            },
-            "normal": {
-                "text": "正常课程",
-                "value": len([c for c in week_courses if not c[11]]),
-                "style": "info"
-            },
-            "types": {
-                "text": "课程种类",
-                "value": len(set(c[1] for c in week_courses if not c[11])),
-                "style": "success"
-            }
-        }
-        
-        # 添加特殊课程统计
-        for course_type in SpecialCourse.TYPES:
-            # 总体特殊课程统计
-            overall_count = len([c for c in courses if c[10] == course_type])
-            if overall_count > 0:
-                overall_stats[course_type] = {
-                    "text": course_type,
-                    "value": overall_count,
-                    "style": SpecialCourse.TYPES[course_type]["color"]
-                }
-            
-            # 本周特殊课程统计
-            week_count = len([c for c in week_courses if c[10] == course_type])
-            if week_count > 0:
-                weekly_stats[course_type] = {
-                    "text": course_type,
-                    "value": week_count,
-                    "style": SpecialCourse.TYPES[course_type]["color"]
-                }
-        
-        return {
-            "overall": overall_stats,
-            "weekly": weekly_stats
-        }
-
     def _create_stat_widget(self, parent, stat_type, stats_dict):
         """创建统计信息组件"""
         frame = tb.Frame(parent)
@@ -645,9 +657,15 @@ class StatsPanel:
         stats_frame = tb.LabelFrame(parent, text="学习统计", padding=10)
         stats_frame.pack(fill=X, pady=5)
         
-        # 获取统计数据
-        stats = self.app.course_manager.get_study_statistics(self.app.current_semester[0])
-        
+        # 统计数据在后台查询，完成后填充
+        self.app.db_worker.submit(self.app.course_manager.get_study_statistics, self.app.current_semester[0],
+                                  channel="study_stats",
+                                  callback=lambda stats: self._render_study_stats(stats_frame, stats))
+
+    def _render_study_stats(self, stats_frame, stats):
+        """用查询完成的学习统计填充学习统计部分"""
+        if not stats_frame.winfo_exists():
+            return
         if not stats:
             tb.Label(stats_frame, text="暂无统计数据", 
                     font=("Helvetica", 10),
@@ -9,6 +9,7 @@ class WeekView:
         self.parent = parent
         self.app = app
         self._render_timer = None
+        self._week_courses = []
         self.create_widgets()
 
     def create_widgets(self):
@@ -17,25 +18,41 @@ class WeekView:
         self.show()
 
     def show(self):
-        """显示周视图"""
+        """显示周视图，本周课程在后台加载，加载完成前保留上一次的画面"""
         self.app.current_week = self.app.current_time
 
         if self._render_timer:
             self.parent.after_cancel(self._render_timer)
             self._render_timer = None
 
+        if not self.app.current_semester:
+            for widget in self.frame.winfo_children():
+                widget.destroy()
+            logger.warning("没有选择当前学期")
+            tb.Label(self.frame, text="请先创建或选择学期", 
+                    font=("Helvetica", 16),
+                    bootstyle=WARNING).pack(expand=True)
+            return
+
+        # 确保周数在有效范围内
+        self.app.current_week = max(1, min(self.app.current_week, self.app.total_weeks))
+        week = self.app.current_week
+
+        # 同一时间只渲染最新一次请求的周，翻过的周的结果会被丢弃
+        self.app.db_worker.submit(self.app.course_manager.get_courses_by_week,
+                                  week, self.app.current_semester[0],
+                                  channel="week_view",
+                                  callback=lambda week_courses: self._render(week, week_courses))
+
+    def _render(self, week, week_courses):
+        """用加载完成的课程渲染周视图"""
+        # 双击课程时直接在已渲染的课程中查找，不再查询数据库
+        self._week_courses = week_courses
         try:
             # 清空现有内容
             for widget in self.frame.winfo_children():
                 widget.destroy()
 
-            if not self.app.current_semester:
-                logger.warning("没有选择当前学期")
-                tb.Label(self.frame, text="请先创建或选择学期", 
-                        font=("Helvetica", 16),
-                        bootstyle=WARNING).pack(expand=True)
-                return
-
             # 添加周导航栏
             nav_frame = tb.Frame(self.frame)
             nav_frame.pack(fill=X, pady=(0, 10))
@@ -43,22 +60,14 @@ class WeekView:
             tb.Button(nav_frame, text="◀", width=3,
                     command=self.previous_week).pack(side=LEFT, padx=5)
             
-            week_label = tb.Label(nav_frame, text=f"第{self.app.current_week}周",
+            week_label = tb.Label(nav_frame, text=f"第{week}周",
                                 font=("Helvetica", 16, "bold"))
             week_label.pack(side=LEFT, expand=True)
             
             tb.Button(nav_frame, text="▶", width=3,
                     command=self.next_week).pack(side=LEFT, padx=5)
 
-            # 确保周数在有效范围内
-            self.app.current_week = max(1, min(self.app.current_week, 20))
-            
-            # 获取本周课程
-            week_courses = [c for c in self.app.course_manager.get_courses()
-                        if str(c[12]) == str(self.app.current_semester[0]) 
-                        and int(c[4]) <= self.app.current_week <= int(c[5])]
-            
-            logger.info(f"当前周数: {self.app.current_week}")
+            logger.info(f"当前周数: {week}")
             logger.info(f"当前学期ID: {self.app.current_semester[0]}")
             logger.info(f"本周课程列表: {week_courses}")
 
@@ -102,12 +111,12 @@ class WeekView:
 
             # 添加课程到表格
             for course in week_courses:
-                day_index = course[6]  # 星期几 (1-7)
+                day_index = course.day_of_week  # 星期几 (1-7)
                 time_index = None
 
                 # 找到对应的时间段
                 for i, (start, end) in enumerate(self.app.time_slots):
-                    if course[7] == start and course[8] == end:
+                    if course.start_time == start and course.end_time == end:
                         time_index = i
                         break
 
@@ -117,14 +126,14 @@ class WeekView:
 
                     # 获取当前值并更新
                     current_values = list(tree.item(item_id, "values"))
-                    course_text = f"{course[1]}\n{course[3]}\n{course[2]}\n{course[4]}-{course[5]}周"
+                    course_text = f"{course.name}\n{course.location}\n{course.teacher}\n{course.start_week}-{course.end_week}周"
                     current_values[day_index] = course_text
 
                     # 更新值和样式
                     tree.item(item_id, values=current_values)
                     
                     # 设置单元格颜色
-                    color = course[9]  # 直接使用十六进制颜色代码
+                    color = course.color  # 直接使用十六进制颜色代码
                     if color:  # 确保颜色值存在
                         # 创建唯一的标签名称
                         tag_name = f"course_{color}_{day_index}"
@@ -149,8 +158,9 @@ class WeekView:
             tree.pack(fill=BOTH, expand=True)
 
             # 更新统计信息
-            self.app.stats_panel.update_stats(self.app.courses, self.app.current_week,
-                                            self.app.course_manager, "week")
+            self.app.stats_panel.update_stats(self.app.courses, week,
+                                            self.app.course_manager, "week",
+                                            search_query=self.app.search_query)
         except Exception as e:
             logger.error(f"显示周视图失败: {str(e)}")
             raise
@@ -173,7 +183,7 @@ class WeekView:
     def next_week(self):
         """切换到下一周"""
         try:
-            self.app.current_week = min(20, self.app.current_week + 1)
+            self.app.current_week = min(self.app.total_weeks, self.app.current_week + 1)
             self.app.top_bar.week_var.set(self.app.current_week)
             self._schedule_render()
         except Exception as e:
@@ -215,9 +225,8 @@ class WeekView:
                 return
             start_time, end_time = time_parts
             
-            # 查找对应的课程
-            week_courses = [c for c in self.app.course_manager.get_courses()
-                        if str(c[12]) == str(self.app.current_semester[0])]
+            # 在当前显示的本周课程中查找
+            week_courses = [c for c in self._week_courses if c.day_of_week == day_index + 1]
             
             # 添加调试信息
             logger.info(f"查找条件: 星期={day_index+1}, 时间={start_time}-{end_time}")
@@ -225,17 +234,17 @@ class WeekView:
             
             course = None
             for c in week_courses:
-                logger.info(f"检查课程: {c[1]}, 星期={c[6]}, 时间={c[7]}-{c[8]}")
-                if c[6] == day_index + 1 and c[7] == start_time and c[8] == end_time:
+                logger.info(f"检查课程: {c.name}, 星期={c.day_of_week}, 时间={c.time_range}")
+                if c.day_of_week == day_index + 1 and c.start_time == start_time and c.end_time == end_time:
                     course = c
-                    logger.info(f"找到匹配课程: {c[1]}")
+                    logger.info(f"找到匹配课程: {c.name}")
                     break
                     
             if course:
                 # 打开编辑对话框
                 from dialogs import EditCourseDialog
                 EditCourseDialog(self.parent, self.app, course)
-                logger.info(f"打开编辑对话框: {course[1]}")
+                logger.info(f"打开编辑对话框: {course.name}")
             else:
                 logger.warning("未找到匹配的课程")
         except Exception as e:
@@ -254,14 +263,13 @@ class DayView:
         self.show()
 
     def show(self, target_date=None):
-        """显示日视图"""
+        """显示日视图，当天课程在后台加载，加载完成前保留上一次的画面"""
         if target_date is None:
             target_date = datetime.now().replace(day=self.app.current_time)
-        # 清空现有内容
-        for widget in self.frame.winfo_children():
-            widget.destroy()
 
         if not self.app.current_semester:
+            for widget in self.frame.winfo_children():
+                widget.destroy()
             logger.warning("没有选择当前学期")
             tb.Label(self.frame, text="请先创建或选择学期", 
                     font=("Helvetica", 16),
@@ -270,7 +278,20 @@ class DayView:
 
         # 使用目标日期或当前日期
         self.current_date = target_date if target_date else self.current_date
-        
+        current_date = self.current_date
+        current_day = current_date.weekday() + 1
+        current_week = self.app.calendar.week_of(current_date)
+        self.app.db_worker.submit(self.app.course_manager.get_courses_by_day,
+                                  current_day, current_week, self.app.current_semester[0],
+                                  channel="day_view",
+                                  callback=lambda day_courses: self._render(current_date, current_week, day_courses))
+
+    def _render(self, current_date, current_week, day_courses):
+        """用加载完成的课程渲染日视图"""
+        # 清空现有内容
+        for widget in self.frame.winfo_children():
+            widget.destroy()
+
         try:
             # 创建日视图内容
             content = tb.Frame(self.frame)
@@ -283,20 +304,14 @@ class DayView:
             tb.Button(nav_frame, text="◀", width=3,
                     command=self.previous_day).pack(side=LEFT, padx=5)
             
-            date_label = tb.Label(nav_frame, text=f"{self.current_date.strftime('%Y年%m月%d日')} 日视图",
+            date_label = tb.Label(nav_frame, text=f"{current_date.strftime('%Y年%m月%d日')} 日视图",
                                 font=("Helvetica", 16, "bold"))
             date_label.pack(side=LEFT, expand=True)
             
             tb.Button(nav_frame, text="▶", width=3,
                     command=self.next_day).pack(side=LEFT, padx=5)
 
-            # 创建当天的课程列表
-            current_day = self.current_date.weekday() + 1
-            current_week = ((self.current_date - datetime.strptime(self.app.current_semester[2], "%Y-%m-%d")).days // 7) + 1
-            day_courses = [c for c in self.app.course_manager.get_courses_by_day(current_day, current_week)
-                        if str(c[12]) == str(self.app.current_semester[0])]
-
-            logger.info(f"显示日期: {self.current_date.strftime('%Y年%m月%d日')}")
+            logger.info(f"显示日期: {current_date.strftime('%Y年%m月%d日')}")
             logger.info(f"对应周数: {current_week}")
             logger.info(f"显示当天课程，共 {len(day_courses)} 门")
 
@@ -305,7 +320,7 @@ class DayView:
                     frame = tb.Frame(content, padding=10, relief="raised", borderwidth=1)
                     frame.pack(fill=X, pady=5)
                     # 创建一个带颜色的Label作为背景
-                    color_label = tb.Label(frame, background=course[9])
+                    color_label = tb.Label(frame, background=course.color)
                     color_label.place(x=0, y=0, relwidth=1, relheight=1)
                     frame.lower(color_label)  # 确保颜色标签在最底层
                     
@@ -322,17 +337,17 @@ class DayView:
                     left_frame.pack(side=LEFT, fill=X, expand=True)
                     left_frame.bind("<Double-Button-1>", lambda e, c=course: self.on_course_double_click(e, c))
                     
-                    course_name_label = tb.Label(left_frame, text=f"{course[1]}",
+                    course_name_label = tb.Label(left_frame, text=f"{course.name}",
                             font=("Helvetica", 14))
                     course_name_label.pack(anchor="w")
                     course_name_label.bind("<Double-Button-1>", lambda e, c=course: self.on_course_double_click(e, c))
                     
-                    tb.Label(left_frame, text=f"📍 {course[3]}",
+                    tb.Label(left_frame, text=f"📍 {course.location}",
                             font=("Helvetica", 10),
                             bootstyle=SECONDARY).pack(anchor="w")
                     
                     # 右侧显示时间
-                    time_label = tb.Label(course_container, text=f"{course[7]}-{course[8]}",
+                    time_label = tb.Label(course_container, text=course.time_range,
                             bootstyle=INFO)
                     time_label.pack(side=RIGHT)
                     time_label.bind("<Double-Button-1>", lambda e, c=course: self.on_course_double_click(e, c))
@@ -343,20 +358,21 @@ class DayView:
 
             # 更新统计信息
             self.app.stats_panel.update_stats(self.app.courses, current_week, 
-                                            self.app.course_manager, "day", self.current_date)
+                                            self.app.course_manager, "day", current_date,
+                                            search_query=self.app.search_query)
         except Exception as e:
             logger.error(f"显示日视图失败: {str(e)}")
             raise
     def on_course_double_click(self, event, course):
         """处理课程双击事件"""
         try:
-            logger.info(f"双击课程: {course[1]}")
+            logger.info(f"双击课程: {course.name}")
             logger.info(f"课程详细信息: {course}")
             
             # 打开编辑对话框
             from dialogs import EditCourseDialog
             dialog = EditCourseDialog(self.parent, self.app, course)
-            logger.info(f"打开编辑对话框: {course[1]}")
+            logger.info(f"打开编辑对话框: {course.name}")
         except Exception as e:
             logger.error(f"处理双击事件失败: {str(e)}")
             import traceback
@@ -445,7 +461,8 @@ class MonthView:
 
             # 更新统计信息
             self.app.stats_panel.update_stats(self.app.courses, self.app.current_week,
-                                            self.app.course_manager, "month", self.current_date)
+                                            self.app.course_manager, "month", self.current_date,
+                                            search_query=self.app.search_query)
             
             logger.info(f"月视图更新完成，{self.current_date.year}年{self.current_date.month}月")
         except Exception as e:
@@ -475,6 +492,7 @@ class MonthView:
         month = self.current_date.month
         first_day = datetime(year, month, 1)
         last_day = datetime(year, month + 1, 1) - timedelta(days=1) if month < 12 else datetime(year, 12, 31)
+        calendar = self.app.calendar
 
         # 添加空白格子
         first_weekday = first_day.weekday()
@@ -507,18 +525,10 @@ class MonthView:
                                 padding=3)
             date_label.pack(anchor="nw")
 
-            # 获取当前月份的周数范围
-            month_start = datetime(year, month, 1)
-            month_end = datetime(year, month + 1, 1) - timedelta(days=1) if month < 12 else datetime(year, 12, 31)
-            start_week = ((month_start - datetime.strptime(self.app.current_semester[2], "%Y-%m-%d")).days // 7) + 1
-            end_week = ((month_end - datetime.strptime(self.app.current_semester[2], "%Y-%m-%d")).days // 7) + 1
-
             # 计算当前日期对应的周数
-            current_week = ((current_date - datetime.strptime(self.app.current_semester[2], "%Y-%m-%d")).days // 7) + 1
+            current_week = calendar.week_of(current_date)
             day_courses = [c for c in self.app.courses
-                        if int(c[6]) == current_date.weekday() + 1 and 
-                        int(c[4]) <= current_week <= int(c[5]) and
-                        str(c[12]) == str(self.app.current_semester[0])]
+                        if c.occurs_on(current_date.weekday() + 1, current_week)]
             
             month_courses.extend(day_courses)
 
@@ -531,11 +541,11 @@ class MonthView:
                 # 最多显示3门课程，统一显示格式
                 for i, course in enumerate(day_courses[:3]):
                     # 限制课程名称长度为6个字符，使用固定宽度字体
-                    course_name = course[1][:6] + ".." if len(course[1]) > 6 else course[1]
+                    course_name = course.name[:6] + ".." if len(course.name) > 6 else course.name
                     course_label = tb.Label(course_frame, 
                                         text=course_name,
                                         font=("Courier", 8),  # 使用固定宽度字体
-                                        background=SpecialCourse.TYPES.get(course[10], {}).get("color", course[9]),
+                                        background=SpecialCourse.TYPES.get(course.course_type, {}).get("color", course.color),
                                         width=12)  # 固定标签宽度
                     course_label.pack(fill=X, pady=1, ipady=2)  # 使用 ipady 控制内部垂直边距
                 
@@ -564,7 +574,7 @@ class MonthView:
 
     def _update_month_stats(self, month_courses):
         try:
-            special_count = len([c for c in month_courses if c[11]])  # 修正索引
+            special_count = len([c for c in month_courses if c.is_special])  # 修正索引
             self.total_courses.config(text=f"总课程数: {len(month_courses)}")
             self.special_courses.config(text=f"特殊课程: {special_count}")
         except Exception as e:
@@ -595,7 +605,7 @@ class MonthView:
         """处理日期双击事件，跳转到日视图"""
         try:
             # 计算目标日期对应的周数
-            target_week = ((date - datetime.strptime(self.app.current_semester[2], "%Y-%m-%d")).days // 7) + 1
+            target_week = self.app.calendar.week_of(date)
             
             # 切换到日视图
             self.app.switch_view("day")
@@ -0,0 +1,81 @@
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from query_cache import QueryCache
+
+
+class QueryCacheInvalidateTest(unittest.TestCase):
+    """查询期间缓存失效时，旧结果不能以新版本写入"""
+
+    def _load_concurrently(self, cache, partition, invalidate):
+        """加载线程读取版本后等待，主线程使缓存失效，再让加载线程写入旧结果"""
+        sampled, release = threading.Event(), threading.Event()
+
+        def loader():
+            version = cache.partition_version(partition)
+            sampled.set()
+            release.wait(5)
+            cache.set(partition, "key", "stale", version)
+
+        thread = threading.Thread(target=loader)
+        thread.start()
+        sampled.wait(5)
+        invalidate()
+        release.set()
+        thread.join(5)
+
+    def test_global_invalidate_rejects_unseen_partition(self):
+        cache = QueryCache()
+        self._load_concurrently(cache, 1, cache.invalidate)
+        self.assertIsNone(cache.get(1, "key"))
+
+    def test_global_invalidate_rejects_known_partition(self):
+        cache = QueryCache()
+        cache.invalidate(1)
+        self._load_concurrently(cache, 1, cache.invalidate)
+        self.assertIsNone(cache.get(1, "key"))
+
+    def test_partition_invalidate_rejects_load(self):
+        cache = QueryCache()
+        self._load_concurrently(cache, 1, lambda: cache.invalidate(1))
+        self.assertIsNone(cache.get(1, "key"))
+
+    def test_loaders_racing_invalidate_never_return_stale(self):
+        cache = QueryCache()
+        state = {"value": 0}
+        stop = threading.Event()
+        errors = []
+
+        def loader():
+            while not stop.is_set():
+                partition = state["value"] % 3
+                version = cache.partition_version(partition)
+                value = state["value"]
+                cache.set(partition, "key", value, version)
+                cached = cache.get(partition, "key")
+                if cached is not None and cached < state["value"] and cache.partition_version(partition) == version:
+                    errors.append((cached, state["value"]))
+
+        threads = [threading.Thread(target=loader) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for _ in range(2000):
+            with cache._lock:
+                state["value"] += 1
+                cache.invalidate()
+        stop.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(errors, [])
+        # 失效之后不应残留任何旧条目
+        cache.invalidate()
+        for partition in range(3):
+            self.assertIsNone(cache.get(partition, "key"))
+
+
+if __name__ == "__main__":
+    unittest.main()